@@ -0,0 +1,469 @@
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from engine import GameEngine
+from items import (ADRENALINE, BEER, CIGARETTES, EXPIRED_MEDICINE, HAND_SAW, HANDCUFFS, INVERTER, ITEM_COUNT,
+                   MAGNIFYING_GLASS)
+from rules import DEFAULT_RULES, Rules
+from streams import GAME, round_keys, shell_bits, to_unit, values
+
+PLAYER = 0
+DEALER = 1
+
+# Коды результатов предметов в пакетном режиме, см. effects.ItemResult.
+NO_RESULT = 0
+SKIP_TURN = 1
+DOUBLE_DAMAGE = 2
+END_ROUND = 3
+
+class BatchState:
+    """
+    Состояние N независимых игр одного этапа в массивах NumPy.
+
+    Правила повторяют GameEngine.play_stage с безголовым игроком (AutoInput):
+    игрок стреляет в случайную цель, дилер использует случайный предмет и
+    стреляет наугад, если не знает следующий патрон.
+
+    Attributes:
+        stage (int): Номер этапа.
+        rules (Rules): Балансные константы.
+        lives (np.ndarray): Жизни игрока и дилера, форма (2, N).
+        items (np.ndarray): Количества предметов, форма (2, N, ITEM_COUNT).
+        totals (np.ndarray): Общее количество предметов, форма (2, N).
+        bits (np.ndarray): Битовые маски магазинов.
+        size (np.ndarray): Количество оставшихся патронов.
+        last (np.ndarray): Последний патрон, который запомнил дилер.
+        turn (np.ndarray): Чей ход: PLAYER или DEALER.
+        done (np.ndarray): Завершена ли игра.
+        hits (np.ndarray): Количество боевых попаданий по игроку и дилеру, форма (2, N).
+        rounds (np.ndarray): Количество зарядок дробовика.
+        key (Optional[int]): Зерно счетчиковых потоков, None - выборки из rng.
+        ids (Optional[np.ndarray]): Номера игр в счетчиковых потоках.
+        round_key (Optional[np.ndarray]): Ключи текущих раундов, см. streams.round_key.
+        draws (Optional[np.ndarray]): Номера следующих выборок в раундах.
+    """
+
+    __slots__ = ("stage", "rules", "box", "rng", "lives", "items", "totals", "bits", "size", "last", "turn", "done",
+                 "hits", "rounds", "key", "ids", "round_key", "draws")
+    _ARRAYS = ("bits", "size", "last", "turn", "done", "rounds", "ids", "round_key", "draws")
+    _SIDE_ARRAYS = ("lives", "items", "totals", "hits")
+
+    def __init__(self, games: int, stage: int = 1, rng: Optional[np.random.Generator] = None,
+                 rules: Optional[Rules] = None, key: Optional[int] = None, first_game: int = 0):
+        self.stage = stage
+        self.rules = rules or DEFAULT_RULES
+        self.box = np.array(self.rules.box_pool, dtype=np.int64)
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.lives = np.full((2, games), self.rules.lives(stage), dtype=np.int16)
+        self.items = np.zeros((2, games, ITEM_COUNT), dtype=np.uint8)
+        self.totals = np.zeros((2, games), dtype=np.int16)
+        self.bits = np.zeros(games, dtype=np.uint8)
+        self.size = np.zeros(games, dtype=np.int8)
+        self.last = np.zeros(games, dtype=np.uint8)
+        self.turn = np.full(games, PLAYER, dtype=np.int8)
+        self.done = np.zeros(games, dtype=bool)
+        self.hits = np.zeros((2, games), dtype=np.int16)
+        self.rounds = np.zeros(games, dtype=np.int32)
+        self.key = key
+        if key is None:
+            self.ids = self.round_key = self.draws = None
+        else:
+            self.ids = np.arange(first_game, first_game + games, dtype=np.uint64)
+            self.round_key = round_keys(key, GAME, self.ids, self.rounds)
+            self.draws = np.zeros(games, dtype=np.uint64)
+
+    @classmethod
+    def new_stage(cls, games: int, stage: int = 1, rng: Optional[np.random.Generator] = None,
+                  rules: Optional[Rules] = None, key: Optional[int] = None, first_game: int = 0) -> "BatchState":
+        """
+        Создает N игр в начале этапа с заряженным дробовиком.
+
+        Args:
+            games (int): Количество игр.
+            stage (int): Номер этапа.
+            rng (Optional[np.random.Generator]): Генератор случайных чисел.
+            rules (Optional[Rules]): Балансные константы.
+            key (Optional[int]): Зерно счетчиковых потоков вместо rng.
+            first_game (int): Номер первой игры в счетчиковых потоках.
+
+        Returns:
+            BatchState: Состояние пачки игр.
+        """
+        state = cls(games, stage, rng, rules, key, first_game)
+        state.reload(np.ones(games, dtype=bool))
+        return state
+
+    @classmethod
+    def from_engine(cls, engine: GameEngine, games: int, rng: Optional[np.random.Generator] = None,
+                    key: Optional[int] = None, first_game: int = 0) -> "BatchState":
+        """
+        Размножает текущее состояние движка на N игр.
+
+        Args:
+            engine (GameEngine): Движок с текущим состоянием игры.
+            games (int): Количество игр.
+            rng (Optional[np.random.Generator]): Генератор случайных чисел.
+            key (Optional[int]): Зерно счетчиковых потоков вместо rng.
+            first_game (int): Номер первой игры в счетчиковых потоках.
+
+        Returns:
+            BatchState: Состояние пачки игр.
+        """
+        state = cls(games, engine.stage, rng, engine.rules, key, first_game)
+        state.lives[PLAYER] = engine.player.lives
+        state.lives[DEALER] = engine.dealer.lives
+        state.items[PLAYER] = np.frombuffer(bytes(engine.player.items.counts), dtype=np.uint8)
+        state.items[DEALER] = np.frombuffer(bytes(engine.dealer.items.counts), dtype=np.uint8)
+        state.totals[PLAYER] = engine.player.items.total
+        state.totals[DEALER] = engine.dealer.items.total
+        state.bits[:] = engine.shotgun.bits
+        state.size[:] = engine.shotgun.size
+        state.last[:] = engine.dealer_last_bullet or 0
+        state.rounds[:] = engine.round
+        if key is not None:
+            state.round_key[:] = round_keys(key, GAME, state.ids, state.rounds)
+        return state
+
+    def uniform(self, idx: np.ndarray, width: int = 1) -> np.ndarray:
+        """
+        Случайные числа из [0, 1) для игр idx.
+
+        В счетчиковом режиме это следующие выборки раунда каждой игры, поэтому
+        числа игры не зависят от того, какие еще игры в пачке.
+
+        Args:
+            idx (np.ndarray): Индексы игр.
+            width (int): Чисел на игру.
+
+        Returns:
+            np.ndarray: Числа формы (len(idx), width).
+        """
+        if self.key is None:
+            return self.rng.random((idx.size, width))
+        draws = self.draws[idx]
+        self.draws[idx] = draws + np.uint64(width)
+        return to_unit(values(self.round_key[idx, None], draws[:, None] + np.arange(width, dtype=np.uint64)))
+
+    def below(self, idx: np.ndarray, high: np.ndarray) -> np.ndarray:
+        """Случайные целые из [0, high) для игр idx."""
+        if self.key is None:
+            return self.rng.integers(0, high)
+        return np.minimum((self.uniform(idx)[:, 0] * high).astype(np.int64), np.asarray(high) - 1)
+
+    def reload(self, mask: np.ndarray) -> None:
+        """
+        Начинает новый раунд в отмеченных играх, как GameEngine.start_new_round.
+
+        Args:
+            mask (np.ndarray): Маска игр.
+        """
+        idx = np.flatnonzero(mask)
+        if not idx.size:
+            return
+        shells = self.rules.shells
+        live_chance = self.rules.live_chance
+        self.rounds[idx] += 1
+        if self.key is not None:
+            # Те же патроны, что зарядит GameEngine с streams.CounterRandom этой игры.
+            self.round_key[idx] = round_keys(self.key, GAME, self.ids[idx], self.rounds[idx])
+            self.draws[idx] = 1 if live_chance == 0.5 else shells
+            bits = shell_bits(self.key, self.ids[idx], self.rounds[idx], shells, live_chance)
+        elif live_chance == 0.5:
+            bits = self.rng.integers(0, 1 << shells, size=idx.size, dtype=np.uint8)
+        else:
+            live = self.rng.random((idx.size, shells)) < live_chance
+            bits = np.packbits(live, axis=1, bitorder="little")[:, 0]
+        self.bits[idx] = bits
+        self.size[idx] = shells
+        self.last[idx] = bits >> (shells - 1)
+        if self.rules.box_size(self.stage):
+            self.deal_box(PLAYER, idx)
+
+    def deal_box(self, side: int, idx: np.ndarray) -> None:
+        """
+        Выдает стороне side коробочку этапа в играх idx, как GameEngine.offer_new_items.
+
+        Args:
+            side (int): PLAYER или DEALER.
+            idx (np.ndarray): Индексы игр.
+        """
+        box = self.rules.box_size(self.stage)
+        order = np.argsort(self.uniform(idx, self.box.size), axis=1)[:, :box]
+        for column in range(box):
+            room = self.totals[side, idx] < self.rules.max_items
+            taker = idx[room]
+            self.items[side, taker, self.box[order[room, column]]] += 1
+            self.totals[side, taker] += 1
+
+    def pick_items(self, side: int, idx: np.ndarray) -> np.ndarray:
+        """
+        Выбирает и убирает случайный предмет с учетом количества.
+
+        Args:
+            side (int): PLAYER или DEALER.
+            idx (np.ndarray): Индексы игр с непустым инвентарем.
+
+        Returns:
+            np.ndarray: Идентификаторы выбранных предметов.
+        """
+        counts = self.items[side, idx].astype(np.int64)
+        cumulative = counts.cumsum(axis=1)
+        draw = self.below(idx, cumulative[:, -1])
+        item = (cumulative <= draw[:, None]).sum(axis=1)
+        self.items[side, idx, item] -= 1
+        self.totals[side, idx] -= 1
+        return item
+
+    def use_items(self, side: int, idx: np.ndarray, item: np.ndarray) -> np.ndarray:
+        """
+        Применяет предметы стороны side в играх idx.
+
+        Args:
+            side (int): Кто использует предметы.
+            idx (np.ndarray): Индексы игр.
+            item (np.ndarray): Идентификаторы предметов по играм.
+
+        Returns:
+            np.ndarray: Коды результатов по играм.
+        """
+        result = np.zeros(idx.size, dtype=np.int8)
+        for item_id in np.unique(item):
+            effect = BATCH_EFFECTS.get(int(item_id))
+            if effect is not None:
+                chosen = item == item_id
+                result[chosen] = effect(self, side, idx[chosen])
+        return result
+
+    def step(self) -> None:
+        """Делает один ход во всех незавершенных играх."""
+        active = ~self.done
+        dealer = active & (self.turn == DEALER)
+        player = active & (self.turn == PLAYER)
+
+        # Игрок с пустым дробовиком перезаряжает дважды: player_turn и play_stage.
+        empty = player & (self.size == 0)
+        self.reload(empty)
+        self.reload(empty)
+        player &= ~empty
+
+        result = np.zeros(self.turn.size, dtype=np.int8)
+        users = np.flatnonzero(dealer & (self.totals[DEALER] > 0))
+        if users.size:
+            result[users] = self.use_items(DEALER, users, self.pick_items(DEALER, users))
+        # После SKIP_TURN дилер ходит снова, после остальных результатов ход у игрока.
+        self.turn[dealer & (result != NO_RESULT) & (result != SKIP_TURN)] = PLAYER
+        dealer &= result == NO_RESULT
+
+        # Дилер с пустым дробовиком тоже перезаряжает дважды и отдает ход игроку.
+        empty = dealer & (self.size == 0)
+        self.reload(empty)
+        self.reload(empty)
+        self.turn[empty] = PLAYER
+        dealer &= ~empty
+
+        shooters = player | dealer
+        shell = self.bits & 1
+        coin = self.uniform(np.arange(self.turn.size))[:, 0] < 0.5
+        knows = (shell == self.last) | (self.items[DEALER, :, MAGNIFYING_GLASS] > 0)
+        dealer_self = np.where(knows, shell == 0, coin)
+        # target_side: по кому стреляют.
+        target_side = np.where(dealer, np.where(dealer_self, DEALER, PLAYER), np.where(coin, PLAYER, DEALER))
+        idx = np.flatnonzero(shooters)
+        live = shell[idx].astype(np.int16)
+        self.lives[target_side[idx], idx] -= live
+        self.hits[target_side[idx], idx] += live
+        self.bits[idx] >>= 1
+        self.size[idx] -= 1
+        self.turn[idx] ^= 1
+        self.done |= (self.lives[PLAYER] <= 0) | (self.lives[DEALER] <= 0)
+
+    def take(self, idx: np.ndarray) -> "BatchState":
+        """
+        Копирует игры idx в новое состояние с тем же генератором.
+
+        Args:
+            idx (np.ndarray): Индексы игр.
+
+        Returns:
+            BatchState: Состояние выбранных игр.
+        """
+        subset = BatchState.__new__(BatchState)
+        subset.stage = self.stage
+        subset.rules = self.rules
+        subset.box = self.box
+        subset.rng = self.rng
+        subset.key = self.key
+        for name in self._ARRAYS:
+            array = getattr(self, name)
+            setattr(subset, name, array[idx] if array is not None else None)
+        for name in self._SIDE_ARRAYS:
+            setattr(subset, name, getattr(self, name)[:, idx])
+        return subset
+
+    def put(self, idx: np.ndarray, subset: "BatchState") -> None:
+        """
+        Записывает состояние subset обратно в игры idx.
+
+        Args:
+            idx (np.ndarray): Индексы игр.
+            subset (BatchState): Состояние, полученное через take.
+        """
+        for name in self._ARRAYS:
+            array = getattr(self, name)
+            if array is not None:
+                array[idx] = getattr(subset, name)
+        for name in self._SIDE_ARRAYS:
+            getattr(self, name)[:, idx] = getattr(subset, name)
+
+    def run(self, max_steps: int = 10000) -> "BatchResult":
+        """
+        Доигрывает все игры до конца.
+
+        Когда завершается больше половины игр, оставшиеся переносятся в
+        компактную копию, чтобы ходы не тратили время на законченные игры.
+
+        Args:
+            max_steps (int): Предел ходов на случай бесконечных игр.
+
+        Returns:
+            BatchResult: Итоги пачки игр.
+        """
+        work = self
+        where = None
+        for _ in range(max_steps):
+            active = np.flatnonzero(~work.done)
+            if not active.size:
+                break
+            if active.size * 2 < work.done.size:
+                if where is not None:
+                    self.put(where, work)
+                where = active if where is None else where[active]
+                work = self.take(where)
+            work.step()
+        if where is not None:
+            self.put(where, work)
+        return BatchResult(self)
+
+def _no_effect(state: BatchState, side: int, idx: np.ndarray) -> int:
+    return NO_RESULT
+
+def _beer(state: BatchState, side: int, idx: np.ndarray) -> np.ndarray:
+    loaded = state.size[idx] > 0
+    emptied = idx[loaded]
+    state.bits[emptied] >>= 1
+    state.size[emptied] -= 1
+    result = np.zeros(idx.size, dtype=np.int8)
+    result[loaded] = np.where(state.size[emptied] == 0, END_ROUND, NO_RESULT)
+    return result
+
+def _handcuffs(state: BatchState, side: int, idx: np.ndarray) -> int:
+    return SKIP_TURN
+
+def _cigarettes(state: BatchState, side: int, idx: np.ndarray) -> int:
+    state.lives[side, idx] += 1
+    return NO_RESULT
+
+def _hand_saw(state: BatchState, side: int, idx: np.ndarray) -> int:
+    return DOUBLE_DAMAGE
+
+def _adrenaline(state: BatchState, side: int, idx: np.ndarray) -> np.ndarray:
+    opponent = side ^ 1
+    result = np.zeros(idx.size, dtype=np.int8)
+    pending = np.arange(idx.size)
+    while pending.size:
+        pending = pending[state.totals[opponent, idx[pending]] > 0]
+        if not pending.size:
+            break
+        stolen = state.pick_items(opponent, idx[pending])
+        again = stolen == ADRENALINE
+        done = pending[~again]
+        if done.size:
+            result[done] = state.use_items(side, idx[done], stolen[~again])
+        pending = pending[again]
+    return result
+
+def _inverter(state: BatchState, side: int, idx: np.ndarray) -> int:
+    loaded = idx[state.size[idx] > 0]
+    state.bits[loaded] ^= 1
+    return NO_RESULT
+
+def _expired_medicine(state: BatchState, side: int, idx: np.ndarray) -> int:
+    positive = state.uniform(idx)[:, 0] < 0.5
+    state.lives[side, idx] += np.where(positive, 2, -1).astype(np.int16)
+    return NO_RESULT
+
+BatchEffect = Callable[[BatchState, int, np.ndarray], object]
+
+# Пакетные двойники эффектов из effects.ITEMS; предметы только с информацией о патронах
+# не меняют состояние и в таблицу не входят.
+BATCH_EFFECTS: Dict[int, BatchEffect] = {
+    BEER: _beer,
+    HANDCUFFS: _handcuffs,
+    CIGARETTES: _cigarettes,
+    HAND_SAW: _hand_saw,
+    ADRENALINE: _adrenaline,
+    INVERTER: _inverter,
+    EXPIRED_MEDICINE: _expired_medicine,
+}
+
+class BatchResult:
+    """
+    Итоги пачки игр.
+
+    Attributes:
+        games (int): Количество игр.
+        unfinished (int): Игры, не завершившиеся за max_steps.
+        player_win_rate (float): Доля побед игрока.
+        dealer_win_rate (float): Доля побед дилера.
+        player_life_loss (np.ndarray): Распределение числа потерянных игроком жизней.
+        dealer_life_loss (np.ndarray): Распределение числа потерянных дилером жизней.
+        mean_rounds (float): Среднее количество раундов.
+    """
+
+    __slots__ = ("games", "unfinished", "player_win_rate", "dealer_win_rate",
+                 "player_life_loss", "dealer_life_loss", "mean_rounds")
+
+    def __init__(self, state: BatchState):
+        games = state.done.size
+        player_lost = state.done & (state.lives[PLAYER] <= 0)
+        dealer_lost = state.done & ~player_lost
+        self.games = games
+        self.unfinished = int(games - state.done.sum())
+        self.player_win_rate = float(dealer_lost.sum()) / games
+        self.dealer_win_rate = float(player_lost.sum()) / games
+        self.player_life_loss = np.bincount(state.hits[PLAYER]) / games
+        self.dealer_life_loss = np.bincount(state.hits[DEALER]) / games
+        self.mean_rounds = float(state.rounds.mean())
+
+    def __repr__(self) -> str:
+        return (f"BatchResult(games={self.games}, player_win_rate={self.player_win_rate:.4f}, "
+                f"dealer_win_rate={self.dealer_win_rate:.4f}, unfinished={self.unfinished})")
+
+def simulate(games: int, stage: int = 1, engine: Optional[GameEngine] = None,
+             seed: Optional[int] = None, max_steps: int = 10000, rules: Optional[Rules] = None,
+             streams: bool = False, first_game: int = 0) -> BatchResult:
+    """
+    Оценивает исходы игр пачкой.
+
+    Args:
+        games (int): Количество игр.
+        stage (int): Номер этапа, если engine не задан.
+        engine (Optional[GameEngine]): Движок, с состояния которого начинать.
+        seed (Optional[int]): Зерно генератора.
+        max_steps (int): Предел ходов.
+        rules (Optional[Rules]): Балансные константы, если engine не задан.
+        streams (bool): Брать выборки из счетчиковых потоков seed: тогда пачку можно
+            делить на части с first_game в любых процессах, и исход каждой игры не изменится.
+        first_game (int): Номер первой игры пачки в счетчиковых потоках.
+
+    Returns:
+        BatchResult: Итоги пачки игр.
+    """
+    rng = np.random.default_rng(seed)
+    key = (seed if seed is not None else int(rng.integers(0, 1 << 63))) if streams else None
+    if engine is not None:
+        state = BatchState.from_engine(engine, games, rng, key, first_game)
+    else:
+        state = BatchState.new_stage(games, stage, rng, rules, key, first_game)
+    return state.run(max_steps)
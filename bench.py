@@ -0,0 +1,268 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from effects import ITEMS
+from engine import GameEngine
+from policies import Policy, RandomDealer, RandomPlayer
+from solver import SolverPolicy
+
+DEFAULT_BASELINE = "bench_baseline.json"
+SEED = 20240601
+
+# Бенчмарк: (подготовка состояния, одна операция над ним, операций в замере, операций в замере памяти
+# и, для операций в отдельном процессе, функция пиковой памяти вместо tracemalloc).
+Benchmark = Tuple
+
+# Замер повторяется, в итог идет самый быстрый повтор: так меньше влияют соседние процессы.
+REPEATS = 3
+
+class Result:
+    """
+    Итог одного бенчмарка.
+
+    Attributes:
+        name (str): Название.
+        ops (int): Операций в замере.
+        seconds (float): Суммарное время операций.
+        p50 (float): Медиана задержки операции в секундах.
+        p99 (float): 99-й процентиль задержки в секундах.
+        peak (int): Пиковая память за замер памяти в байтах.
+    """
+
+    __slots__ = ("name", "ops", "seconds", "p50", "p99", "peak")
+
+    def __init__(self, name: str, ops: int, seconds: float, p50: float, p99: float, peak: int):
+        self.name: str = name
+        self.ops: int = ops
+        self.seconds: float = seconds
+        self.p50: float = p50
+        self.p99: float = p99
+        self.peak: int = peak
+
+    @property
+    def ops_per_sec(self) -> float:
+        """Операций в секунду."""
+        return self.ops / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {"ops": self.ops, "seconds": self.seconds, "ops_per_sec": self.ops_per_sec,
+                "p50": self.p50, "p99": self.p99, "peak": self.peak}
+
+def _percentile(samples: List[float], q: float) -> float:
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+def measure(name: str, benchmark: Benchmark, scale: float = 1.0, repeats: int = REPEATS) -> Result:
+    """
+    Замеряет бенчмарк: сначала время каждой операции, затем отдельно память под tracemalloc.
+
+    Каждый повтор начинается с того же зерна и того же состояния.
+
+    Args:
+        name (str): Название.
+        benchmark (Benchmark): Подготовка, операция и количество операций.
+        scale (float): Множитель количества операций.
+        repeats (int): Количество повторов замера времени.
+
+    Returns:
+        Result: Итог самого быстрого повтора.
+    """
+    setup, operation, ops, memory_ops = benchmark[:4]
+    peak_of: Optional[Callable[[], int]] = benchmark[4] if len(benchmark) > 4 else None
+    ops = max(1, int(ops * scale))
+    perf_counter = time.perf_counter
+    best: List[float] = []
+    seconds = float("inf")
+    for _ in range(repeats):
+        random.seed(SEED)
+        state = setup()
+        for _ in range(max(1, ops // 20)):
+            operation(state)
+        samples = []
+        append = samples.append
+        for _ in range(ops):
+            start = perf_counter()
+            operation(state)
+            append(perf_counter() - start)
+        if sum(samples) < seconds:
+            seconds, best = sum(samples), samples
+    best.sort()
+    random.seed(SEED)
+    state = setup()
+    memory_ops = max(1, int(memory_ops * scale))
+    if peak_of is not None:
+        for _ in range(memory_ops):
+            operation(state)
+        peak = peak_of()
+    else:
+        tracemalloc.start()
+        try:
+            for _ in range(memory_ops):
+                operation(state)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return Result(name, ops, seconds, _percentile(best, 0.5), _percentile(best, 0.99), peak)
+
+def _engine(player_policy: Optional[Policy] = None, dealer_policy: Optional[Policy] = None) -> GameEngine:
+    engine = GameEngine.headless(player_policy=player_policy, dealer_policy=dealer_policy, seed=SEED)
+    engine.player.lives = engine.dealer.lives = 1 << 30
+    engine.load_shotgun()
+    return engine
+
+def _shoot(engine: GameEngine) -> None:
+    if not engine.shotgun:
+        engine.load_shotgun()
+    engine.shoot(engine.dealer)
+
+def _use_item_setup() -> Tuple[GameEngine, List[int], List[int]]:
+    return _engine(), [spec.id for spec in ITEMS], [0]
+
+def _use_item(state: Tuple[GameEngine, List[int], List[int]]) -> None:
+    engine, items, counter = state
+    if not engine.shotgun:
+        engine.load_shotgun()
+    item = items[counter[0] % len(items)]
+    counter[0] += 1
+    # Адреналину нужен предмет у дилера.
+    if not engine.dealer.items:
+        engine.dealer.items.add(items[counter[0] % len(items)])
+    engine.use_item(engine.player, item)
+
+def _play_stage(stage: int) -> Callable[[GameEngine], None]:
+    def operation(engine: GameEngine) -> None:
+        engine.stage = stage
+        engine.play_stage()
+    return operation
+
+def _dealer_turn(engine: GameEngine) -> None:
+    if not engine.shotgun or engine.player.lives <= 0 or engine.dealer.lives <= 0:
+        engine.player.lives = engine.dealer.lives = 4
+        engine.load_shotgun()
+    engine.dealer_turn()
+
+def _dealer_engine(policy: Callable[[], Policy]) -> Callable[[], GameEngine]:
+    def setup() -> GameEngine:
+        engine = _engine(dealer_policy=policy())
+        engine.player.lives = engine.dealer.lives = 4
+        return engine
+    return setup
+
+def _save_setup():
+    from main import RussianRoulette
+    from saves import SaveStore
+    global _directory
+    if _directory is None:
+        _directory = tempfile.TemporaryDirectory(prefix="bench-")
+    path = os.path.join(_directory.name, "game_progress.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    store = SaveStore(path, delay=0.0)
+    game = RussianRoulette(GameEngine.headless().io, saves=store)
+    game.player.items.add(0)
+    return game
+
+_directory: Optional[tempfile.TemporaryDirectory] = None
+
+def _save_load(game) -> None:
+    game.save_progress()
+    game.saves.flush()
+    game.load_progress()
+
+def _vecenv_setup():
+    import numpy as np
+    from vecenv import VecEnv
+    env = VecEnv(1024, 3, seed=SEED, dealer_box=True)
+    env.reset()
+    return env, np.random.default_rng(SEED)
+
+def _vecenv_step(state) -> None:
+    from vecenv import random_actions
+    env, rng = state
+    env.step(random_actions(env.action_mask(), rng))
+
+def _cold_start(_) -> None:
+    subprocess.run([sys.executable, "-c", "import main; main.RussianRoulette()"], check=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
+
+def _child_peak() -> int:
+    """Пиковый размер резидентной памяти дочерних процессов в байтах (0, если неизвестен)."""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    "shoot": (_engine, _shoot, 200000, 20000),
+    "use_item": (_use_item_setup, _use_item, 100000, 10000),
+    "play_stage_1": (lambda: _engine(RandomPlayer()), _play_stage(1), 20000, 2000),
+    "play_stage_2": (lambda: _engine(RandomPlayer()), _play_stage(2), 10000, 1000),
+    "play_stage_3": (lambda: _engine(RandomPlayer()), _play_stage(3), 5000, 500),
+    "dealer_turn_random": (_dealer_engine(RandomDealer), _dealer_turn, 100000, 10000),
+    "dealer_turn_solver": (_dealer_engine(SolverPolicy), _dealer_turn, 20000, 2000),
+    "save_load": (_save_setup, _save_load, 2000, 200),
+    "vecenv_step_1024": (_vecenv_setup, _vecenv_step, 2000, 200),
+    "cold_start": (lambda: None, _cold_start, 10, 1, _child_peak),
+}
+
+def run(names: Optional[List[str]] = None, scale: float = 1.0) -> Dict[str, Result]:
+    """Прогоняет выбранные бенчмарки, по умолчанию все."""
+    return {name: measure(name, BENCHMARKS[name], scale) for name in names or BENCHMARKS}
+
+def compare(results: Dict[str, Result], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """
+    Печатает таблицу итогов и отклонений от базовых значений.
+
+    Returns:
+        List[str]: Бенчмарки, скорость которых упала больше чем на tolerance.
+    """
+    regressions = []
+    print(f"{'бенчмарк':<20} {'оп/с':>12} {'p50, мкс':>10} {'p99, мкс':>10} {'память, КиБ':>12} {'к базе':>8}")
+    for name, result in results.items():
+        delta = ""
+        base = baseline.get(name)
+        if base and base["ops_per_sec"]:
+            change = result.ops_per_sec / base["ops_per_sec"] - 1
+            delta = f"{change:+.1%}"
+            if change < -tolerance:
+                regressions.append(name)
+                delta += " !"
+        print(f"{name:<20} {result.ops_per_sec:>12.1f} {result.p50 * 1e6:>10.1f} {result.p99 * 1e6:>10.1f} "
+              f"{result.peak / 1024:>12.1f} {delta:>8}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарки движка, стратегий и сохранений")
+    parser.add_argument("names", nargs="*", help=f"бенчмарки: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="файл базовых значений")
+    parser.add_argument("--save", action="store_true", help="записать итоги как базовые значения")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="допустимое падение скорости, доля")
+    parser.add_argument("--scale", type=float, default=1.0, help="множитель количества операций")
+    options = parser.parse_args()
+    unknown = [name for name in options.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"неизвестные бенчмарки: {', '.join(unknown)}")
+    baseline_data: Dict[str, dict] = {}
+    if os.path.exists(options.baseline):
+        with open(options.baseline, encoding="utf-8") as baseline_file:
+            baseline_data = json.load(baseline_file)
+    measured = run(options.names, options.scale)
+    slower = compare(measured, baseline_data, options.tolerance)
+    if options.save:
+        baseline_data.update({name: result.to_dict() for name, result in measured.items()})
+        with open(options.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(baseline_data, baseline_file, indent=2)
+        print(f"Базовые значения записаны в {options.baseline}")
+    elif slower:
+        print(f"Медленнее базы: {', '.join(slower)}")
+        sys.exit(1)
@@ -0,0 +1,148 @@
+from typing import Callable, List, Optional
+
+from engine import DEALER, ITEM, LIVES, PLAYER, RESULT, ROUND, SHOT, STAGE, TAKE, Event, Recorder
+from items import ITEM_NAMES
+from state import SHELL_NAMES
+
+DEFAULT_CAPACITY = 1024
+
+SIDE_NAMES = {PLAYER: "Игрок", DEALER: "Дилер"}
+
+class EventBus(Recorder):
+    """
+    Шина событий игры на кольцевом буфере.
+
+    Шина подключается как recorder движка. Получатели бывают двух видов.
+    Приемники (attach) вызываются прямо в record и не теряют событий: это
+    быстрые записи вроде истории партий и журнала повторов. Подписки
+    (subscribe) читают буфер сами, каждая со своей позиции, и получают те же
+    объекты событий без копирования. Публикация никогда не ждет подписчиков:
+    отставший больше чем на capacity событий подписчик пропускает самые
+    старые, а игра идет дальше.
+
+    Читать подписки можно из другого потока: события в буфер пишет только
+    поток игры, а потерю перезаписанных во время чтения событий подписка
+    замечает по счетчику.
+
+    Attributes:
+        capacity (int): Размер буфера, степень двойки.
+        published (int): Опубликованных событий.
+        sinks (List[Recorder]): Приемники без потерь.
+        wakers (List[Callable[[], None]]): Вызываются после каждого события, например чтобы разбудить подписчиков.
+    """
+
+    __slots__ = ("capacity", "mask", "ring", "published", "sinks", "wakers")
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity < 1 or capacity & (capacity - 1):
+            raise ValueError("размер буфера должен быть степенью двойки")
+        self.capacity: int = capacity
+        self.mask: int = capacity - 1
+        self.ring: List[Optional[Event]] = [None] * capacity
+        self.published: int = 0
+        self.sinks: List[Recorder] = []
+        self.wakers: List[Callable[[], None]] = []
+
+    def record(self, event: Event) -> None:
+        self.ring[self.published & self.mask] = event
+        self.published += 1
+        for sink in self.sinks:
+            sink.record(event)
+        for wake in self.wakers:
+            wake()
+
+    def attach(self, sink: Recorder) -> None:
+        """Подключает приемник, который получает каждое событие в потоке игры."""
+        self.sinks.append(sink)
+
+    def detach(self, sink: Recorder) -> None:
+        """Отключает приемник."""
+        self.sinks.remove(sink)
+
+    def subscribe(self, replay: bool = False) -> "Subscription":
+        """
+        Создает подписку.
+
+        Args:
+            replay (bool): Начать с самого старого события в буфере, а не со следующего.
+
+        Returns:
+            Subscription: Подписка.
+        """
+        return Subscription(self, max(0, self.published - self.capacity) if replay else self.published)
+
+class Subscription:
+    """
+    Позиция одного подписчика в EventBus.
+
+    Attributes:
+        bus (EventBus): Шина.
+        cursor (int): Номер следующего непрочитанного события.
+        dropped (int): События, пропущенные из-за отставания.
+    """
+
+    __slots__ = ("bus", "cursor", "dropped")
+
+    def __init__(self, bus: EventBus, cursor: int):
+        self.bus: EventBus = bus
+        self.cursor: int = cursor
+        self.dropped: int = 0
+
+    @property
+    def pending(self) -> int:
+        """Опубликованные, но еще не прочитанные события."""
+        return self.bus.published - self.cursor
+
+    def poll(self, limit: Optional[int] = None) -> List[Event]:
+        """
+        Забирает новые события, не дожидаясь следующих.
+
+        Args:
+            limit (Optional[int]): Наибольшее количество событий.
+
+        Returns:
+            List[Event]: События по порядку; пропущенные прибавляются к dropped.
+        """
+        bus = self.bus
+        start = max(self.cursor, bus.published - bus.capacity)
+        end = bus.published if limit is None else min(bus.published, start + limit)
+        ring, mask = bus.ring, bus.mask
+        events = [ring[index & mask] for index in range(start, end)]
+        # Пока шло копирование, игра могла записать поверх первых событий.
+        lost = min(bus.published - bus.capacity - start, len(events))
+        if lost > 0:
+            del events[:lost]
+            start += lost
+        self.dropped += start - self.cursor
+        self.cursor = end
+        return events
+
+def format_event(event: Event) -> str:
+    """
+    Описание события для зрителей.
+
+    Args:
+        event (Event): Событие игры.
+
+    Returns:
+        str: Строка на русском.
+    """
+    kind = event[0]
+    if kind == STAGE:
+        return f"Начинается этап {event[1]}"
+    if kind == ROUND:
+        live = bin(event[2]).count("1")
+        return f"Раунд {event[1]}: боевых {live}, холостых {event[3] - live}"
+    if kind == TAKE:
+        return f"Игрок берет из коробочки: {ITEM_NAMES[event[1]]}"
+    if kind == ITEM:
+        return f"{SIDE_NAMES[event[1]]} использует {ITEM_NAMES[event[2]]}"
+    if kind == SHOT:
+        return f"{SIDE_NAMES[event[1]]} получает выстрел. Заряд: {SHELL_NAMES[event[2]]}"
+    if kind == LIVES:
+        return f"Жизни игрока: {event[1]}, жизни дилера: {event[2]}"
+    if kind == RESULT:
+        if event[2] <= 0:
+            return f"Этап {event[1]}: игрок проиграл"
+        return f"Этап {event[1]}: дилер проиграл" if event[3] <= 0 else f"Этап {event[1]}: ничья"
+    return repr(event)
@@ -0,0 +1,151 @@
+from enum import Enum
+from typing import Callable, Optional, Tuple
+
+from items import (ADRENALINE, BEER, BURNER_PHONE, CIGARETTES, EXPIRED_MEDICINE, HAND_SAW, HANDCUFFS,
+                   INVERTER, ITEM_NAMES, MAGNIFYING_GLASS, PHONE, WAIVER)
+from state import SHELL_NAMES, Player
+
+class ItemResult(Enum):
+    """Результат предмета, влияющий на ход."""
+
+    SKIP_TURN = "skip_turn"
+    DOUBLE_DAMAGE = "double_damage"
+    END_ROUND = "end_round"
+
+Effect = Callable[..., Optional[ItemResult]]
+
+class ItemSpec:
+    """
+    Описание предмета в реестре.
+
+    Attributes:
+        id (int): Идентификатор предмета.
+        name (str): Название предмета.
+        effect (Effect): Эффект предмета: (game, user, opponent) -> Optional[ItemResult].
+        in_box (bool): Может ли предмет выпасть в коробочке.
+    """
+
+    __slots__ = ("id", "name", "effect", "in_box")
+
+    def __init__(self, item_id: int, effect: Effect, in_box: bool = False):
+        self.id: int = item_id
+        self.name: str = ITEM_NAMES[item_id]
+        self.effect: Effect = effect
+        self.in_box: bool = in_box
+
+def _phone(game, user: Player, opponent: Player) -> Optional[ItemResult]:
+    if game.shotgun:
+        random_index = game.rng.randrange(len(game.shotgun))
+        game.reveal(user, random_index)
+        game.say(f"Таинственный голос сообщает: {random_index + 1}-й патрон - {SHELL_NAMES[game.shotgun.peek(random_index)]}")
+    else:
+        game.say("Дробовик пуст. Нельзя использовать Телефон.")
+    return None
+
+def _beer(game, user: Player, opponent: Player) -> Optional[ItemResult]:
+    if game.shotgun:
+        removed_bullet = game.shotgun.pop()
+        game.say(f"{user.name} использует Банку пива. Удален заряд: {SHELL_NAMES[removed_bullet]}")
+        if not game.shotgun:
+            game.say("Это был последний заряд. Раунд завершен.")
+            return ItemResult.END_ROUND
+    else:
+        game.say("Дробовик пуст. Нельзя использовать Банку пива.")
+    return None
+
+def _magnifying_glass(game, user: Player, opponent: Player) -> Optional[ItemResult]:
+    if game.shotgun:
+        game.reveal(user, 0)
+        game.say(f"{user.name} использует Лупу. Следующий заряд: {SHELL_NAMES[game.shotgun.peek()]}")
+    else:
+        game.say("Дробовик пуст. Нельзя использовать Лупу.")
+    return None
+
+def _handcuffs(game, user: Player, opponent: Player) -> Optional[ItemResult]:
+    game.say(f"{user.name} использует Наручники. Оппонент пропускает ход.")
+    return ItemResult.SKIP_TURN
+
+def _cigarettes(game, user: Player, opponent: Player) -> Optional[ItemResult]:
+    user.lives += 1
+    game.say(f"{user.name} использует Пачку сигарет. Получена дополнительная жизнь. Жизней: {user.lives}")
+    return None
+
+def _hand_saw(game, user: Player, opponent: Player) -> Optional[ItemResult]:
+    game.say(f"{user.name} использует Складную ножовку. Урон дробовика удвоен на этот ход.")
+    return ItemResult.DOUBLE_DAMAGE
+
+def _waiver(game, user: Player, opponent: Player) -> Optional[ItemResult]:
+    game.say(f"{user.name} кладет 'Отказ от претензий, подписанный Богом' обратно в черный ящик.")
+    return None
+
+def _adrenaline(game, user: Player, opponent: Player) -> Optional[ItemResult]:
+    # Украденный Адреналин снова крадет, поэтому цикл вместо рекурсии.
+    item = ADRENALINE
+    while item == ADRENALINE:
+        if not opponent.items:
+            game.say(f"{user.name} не может использовать Адреналин, так как у оппонента нет предметов.")
+            return None
+        item = opponent.items.pick(game.rng)
+        opponent.items.remove(item)
+        game.say(f"{user.name} использует Адреналин и крадет у {'Дилера' if opponent is game.dealer else 'Игрока'} предмет: {ITEM_NAMES[item]}")
+    return ITEMS[item].effect(game, user, opponent)
+
+def _inverter(game, user: Player, opponent: Player) -> Optional[ItemResult]:
+    if game.shotgun:
+        game.shotgun.invert()
+        # Новые счетчики патронов выдают обеим сторонам, каким стал ближайший патрон.
+        game.reveal(user, 0, public=True)
+        game.say(f"{user.name} использует Инвертор. Следующий заряд изменен.")
+    else:
+        game.say("Дробовик пуст. Нельзя использовать Инвертор.")
+    return None
+
+def _burner_phone(game, user: Player, opponent: Player) -> Optional[ItemResult]:
+    if game.shotgun:
+        random_index = game.rng.randrange(len(game.shotgun))
+        game.reveal(user, random_index)
+        game.say(f"{user.name} использует Одноразовый телефон. {random_index + 1}-й заряд: {SHELL_NAMES[game.shotgun.peek(random_index)]}")
+    else:
+        game.say("Дробовик пуст. Нельзя использовать Одноразовый телефон.")
+    return None
+
+def _expired_medicine(game, user: Player, opponent: Player) -> Optional[ItemResult]:
+    if game.rng.random() < 0.5:
+        user.lives += 2
+        game.say(f"{user.name} использует Просроченное лекарство. Получено 2 дополнительные жизни. Жизней: {user.lives}")
+    else:
+        user.lives -= 1
+        game.say(f"{user.name} использует Просроченное лекарство. Потеряна 1 жизнь. Жизней: {user.lives}")
+    return None
+
+ITEMS: Tuple[ItemSpec, ...] = (
+    ItemSpec(PHONE, _phone, in_box=True),
+    ItemSpec(BEER, _beer, in_box=True),
+    ItemSpec(MAGNIFYING_GLASS, _magnifying_glass, in_box=True),
+    ItemSpec(HANDCUFFS, _handcuffs, in_box=True),
+    ItemSpec(CIGARETTES, _cigarettes, in_box=True),
+    ItemSpec(HAND_SAW, _hand_saw, in_box=True),
+    ItemSpec(WAIVER, _waiver, in_box=True),
+    ItemSpec(ADRENALINE, _adrenaline),
+    ItemSpec(INVERTER, _inverter),
+    ItemSpec(BURNER_PHONE, _burner_phone),
+    ItemSpec(EXPIRED_MEDICINE, _expired_medicine),
+)
+assert all(spec.id == index for index, spec in enumerate(ITEMS))
+
+BOX_ITEMS: Tuple[int, ...] = tuple(spec.id for spec in ITEMS if spec.in_box)
+
+def apply_item(game, user: Player, item: int) -> Optional[ItemResult]:
+    """
+    Применяет эффект предмета без вывода паузы и очистки экрана.
+
+    Args:
+        game: Игра с полями shotgun, player, dealer, rng и методами say и reveal.
+        user (Player): Игрок, использующий предмет.
+        item (int): Идентификатор предмета.
+
+    Returns:
+        Optional[ItemResult]: Результат предмета или None.
+    """
+    opponent = game.dealer if user is game.player else game.player
+    return ITEMS[item].effect(game, user, opponent)
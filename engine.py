@@ -0,0 +1,615 @@
+import random
+import time
+import os
+import sys
+from typing import Callable, Optional, Tuple, Union
+
+from effects import ItemResult, apply_item
+from items import ITEM_IDS, ITEM_NAMES, MAGNIFYING_GLASS
+from policies import SHOOT_SELF, Policy, RandomDealer
+from rules import DEFAULT_RULES, Rules
+from state import LIVE, SHELL_NAMES, Belief, Magazine, Player
+
+# Версия правил движка и batchsim: меняется вместе с их поведением и сбрасывает кэш sweep.py.
+ENGINE_VERSION = 1
+
+# Стороны в событиях игры.
+PLAYER = 0
+DEALER = 1
+
+# События игры: (STAGE, этап, предметы игрока, предметы дилера), (ROUND, раунд, патроны, количество),
+# (TAKE, предмет из коробочки), (ITEM, сторона, предмет), (SHOT, сторона-цель, патрон),
+# (LIVES, жизни игрока, жизни дилера) после их изменения, (RESULT, этап, жизни игрока, жизни дилера).
+# Предметы в STAGE - bytes(Inventory.counts), патроны в ROUND - Magazine.bits.
+# LIVES и RESULT выводятся из остальных событий и в журнал повторов не пишутся; 5 там занято записью GAME.
+STAGE = 0
+ROUND = 1
+TAKE = 2
+ITEM = 3
+SHOT = 4
+LIVES = 6
+RESULT = 7
+
+EVENT_NAMES = {STAGE: "stage", ROUND: "round", TAKE: "take", ITEM: "item", SHOT: "shot", LIVES: "lives",
+               RESULT: "result"}
+
+Event = Tuple
+
+class Recorder:
+    """Приемник событий игры: движок передает ему каждый этап, раунд, предмет и выстрел."""
+
+    def record(self, event: Event) -> None:
+        """
+        Принимает событие.
+
+        Args:
+            event (Event): Событие игры, первый элемент - его тип.
+        """
+        raise NotImplementedError
+
+def console_clear() -> None:
+    """Очищает консоль escape-последовательностью, без запуска процесса."""
+    if os.name == 'nt':
+        os.system('cls')
+    else:
+        sys.stdout.write("\x1b[2J\x1b[H")
+        sys.stdout.flush()
+
+def _noop(*args) -> None:
+    """Пустой приемник для безголового режима."""
+
+class GameIO:
+    """
+    Внешние зависимости движка: ввод, вывод, часы и очистка экрана.
+
+    Attributes:
+        output (Callable[[str], None]): Приемник сообщений.
+        input (Callable[[str], str]): Источник ответов игрока.
+        sleep (Callable[[float], None]): Пауза между сообщениями.
+        clear (Callable[[], None]): Очистка экрана.
+        silent (bool): Вывод отключен, сообщения можно не собирать.
+    """
+
+    __slots__ = ("output", "input", "sleep", "clear", "silent")
+
+    def __init__(self,
+                 output: Callable[[str], None] = print,
+                 input: Callable[[str], str] = input,
+                 sleep: Callable[[float], None] = time.sleep,
+                 clear: Callable[[], None] = console_clear,
+                 silent: bool = False):
+        self.output = output
+        self.input = input
+        self.sleep = sleep
+        self.clear = clear
+        self.silent = silent
+
+    @classmethod
+    def headless(cls, input: Optional[Callable[[str], str]] = None) -> "GameIO":
+        """
+        Создает набор приемников без вывода и пауз.
+
+        Args:
+            input (Optional[Callable[[str], str]]): Источник ответов, по умолчанию AutoInput.
+
+        Returns:
+            GameIO: Безголовый набор приемников.
+        """
+        return cls(output=_noop, input=input or AutoInput(), sleep=_noop, clear=_noop, silent=True)
+
+# Генератор AutoInput, вызванного напрямую, без движка и без своего генератора.
+_AUTO_RNG = random.Random()
+
+class AutoInput:
+    """
+    Автоматические ответы на вопросы игры для безголового режима.
+
+    Игрок всегда стреляет, цель выбирается случайно, предметы из коробочки забираются.
+    Движок спрашивает через answer и без своего генератора передает policy_rng,
+    как стратегиям без своего генератора, поэтому один ввод можно делить между
+    движками. При вызове напрямую без генератора используется _AUTO_RNG.
+
+    Attributes:
+        rng (Optional[random.Random]): Генератор выбора цели.
+    """
+
+    __slots__ = ("rng",)
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng: Optional[random.Random] = rng
+
+    def __call__(self, prompt: str) -> str:
+        return self.answer(prompt, self.rng or _AUTO_RNG)
+
+    def answer(self, prompt: str, rng: random.Random) -> str:
+        """
+        Ответ на вопрос игры.
+
+        Args:
+            prompt (str): Вопрос.
+            rng (random.Random): Генератор выбора цели, если у ввода нет своего.
+
+        Returns:
+            str: Ответ.
+        """
+        if prompt.startswith("Выберите действие (стрелять"):
+            return "стрелять"
+        if prompt.startswith("Выберите цель"):
+            return "себя" if (self.rng or rng).random() < 0.5 else "дилера"
+        if prompt.startswith("Достать предмет"):
+            return "q"
+        if prompt.startswith("Выберите действие (новая игра"):
+            return "новая игра"
+        return "нет"
+
+class GameEngine:
+    """
+    Правила игры "Русская рулетка" без привязки к консоли.
+
+    Весь ввод, вывод и паузы идут через GameIO, поэтому движок можно
+    запускать как в консоли, так и без вывода для симуляций.
+
+    Attributes:
+        io (GameIO): Приемники ввода, вывода и часов.
+        player (Player): Объект игрока.
+        dealer (Player): Объект дилера.
+        shotgun (Magazine): Магазин дробовика.
+        stage (int): Текущий этап игры.
+        round (int): Текущий раунд игры.
+        player_policy (Optional[Policy]): Стратегия игрока, None - ввод через GameIO.
+        dealer_policy (Policy): Стратегия дилера.
+        seed (int): Зерно генератора случайных чисел игры.
+        rng (random.Random): Генератор патронов, коробочек и эффектов предметов.
+        policy_rng (random.Random): Генератор случайных стратегий и AutoInput без своего генератора;
+            по умолчанию свой у каждой игры и выводится из seed.
+        recorder (Optional[Recorder]): Приемник событий игры для журнала повторов.
+        player_belief (Belief): Что игрок знает о патронах.
+        dealer_belief (Belief): Что дилер знает о патронах.
+        hints (bool): Показывать игроку вероятность боевого патрона.
+        rules (Rules): Балансные константы.
+    """
+
+    __slots__ = ("io", "player", "dealer", "shotgun", "dealer_last_bullet", "stage", "round",
+                 "player_policy", "dealer_policy", "seed", "rng", "policy_rng", "recorder", "player_belief", "dealer_belief",
+                 "hints", "rules")
+
+    def __init__(self, io: Optional[GameIO] = None,
+                 player_policy: Optional[Policy] = None,
+                 dealer_policy: Optional[Policy] = None,
+                 seed: Optional[int] = None,
+                 rules: Optional[Rules] = None,
+                 rng: Optional[random.Random] = None,
+                 policy_rng: Optional[random.Random] = None):
+        self.io: GameIO = io or GameIO()
+        self.rules: Rules = rules or DEFAULT_RULES
+        self.seed: int = random.getrandbits(64) if seed is None else seed
+        self.rng: random.Random = rng if rng is not None else random.Random(self.seed)
+        self.policy_rng: random.Random = (policy_rng if policy_rng is not None
+                                          else random.Random(f"{self.seed}/policy"))
+        self.recorder: Optional[Recorder] = None
+        self.player_policy: Optional[Policy] = player_policy
+        self.dealer_policy: Policy = dealer_policy or RandomDealer()
+        self.player: Player = Player("Игрок")
+        self.dealer: Player = Player("Дилер")
+        self.shotgun: Magazine = Magazine()
+        self.player_belief: Belief = Belief(self.shotgun)
+        self.dealer_belief: Belief = Belief(self.shotgun)
+        self.hints: bool = False
+        self.dealer_last_bullet: Optional[int] = None
+        self.stage: int = 1
+        self.round: int = 1
+
+    @classmethod
+    def headless(cls, input: Optional[Callable[[str], str]] = None,
+                 player_policy: Optional[Policy] = None,
+                 dealer_policy: Optional[Policy] = None,
+                 seed: Optional[int] = None,
+                 rules: Optional[Rules] = None) -> "GameEngine":
+        """
+        Создает движок без вывода и пауз.
+
+        Args:
+            input (Optional[Callable[[str], str]]): Источник ответов игрока.
+            player_policy (Optional[Policy]): Стратегия игрока вместо ввода.
+            dealer_policy (Optional[Policy]): Стратегия дилера.
+            seed (Optional[int]): Зерно игры, по умолчанию из глобального random.
+            rules (Optional[Rules]): Балансные константы, по умолчанию исходные.
+
+        Returns:
+            GameEngine: Безголовый движок.
+        """
+        return cls(GameIO.headless(input), player_policy, dealer_policy, seed, rules)
+
+    def reseed(self, seed: int) -> None:
+        """Перезапускает генератор игры с новым зерном."""
+        self.seed = seed
+        self.rng.seed(seed)
+
+    def say(self, message: str) -> None:
+        """Передает сообщение в приемник вывода."""
+        self.io.output(message)
+
+    def pause(self, seconds: float) -> None:
+        """Делает паузу через приемник часов."""
+        self.io.sleep(seconds)
+
+    def ask(self, prompt: str) -> str:
+        """Запрашивает ответ у источника ввода."""
+        source = self.io.input
+        if isinstance(source, AutoInput):
+            return source.answer(prompt, self.policy_rng)
+        return source(prompt)
+
+    def clear_console(self) -> None:
+        """Очищает экран через приемник очистки."""
+        self.io.clear()
+
+    def belief(self, player: Player) -> Belief:
+        """Что сторона знает о патронах."""
+        return self.dealer_belief if player is self.dealer else self.player_belief
+
+    def reveal(self, player: Player, index: int, public: bool = False) -> None:
+        """
+        Сообщает знаниям сторон и стратегиям, что тип патрона на позиции index стал известен.
+
+        Args:
+            player (Player): Кто раскрыл патрон.
+            index (int): Позиция патрона от ближайшего.
+            public (bool): Патрон стал известен обеим сторонам.
+        """
+        shell = self.shotgun.peek(index)
+        if public:
+            self.player_belief.reveal(index, shell)
+            self.dealer_belief.reveal(index, shell)
+        else:
+            self.belief(player).reveal(index, shell)
+        if self.player_policy is not None:
+            self.player_policy.observe(self, player, index, shell, public)
+        self.dealer_policy.observe(self, player, index, shell, public)
+
+    def load_shotgun(self) -> None:
+        """Заряжает дробовик случайными патронами."""
+        # Счетчиковый генератор (streams.CounterRandom) начинает для каждой зарядки новый раунд.
+        next_round = getattr(self.rng, "next_round", None)
+        if next_round is not None:
+            next_round()
+        self.shotgun.load_random(self.rules.shells, self.rng, self.rules.live_chance)
+        self.player_belief.reset()
+        self.dealer_belief.reset()
+        if self.player_policy is not None:
+            self.player_policy.reload(self)
+        self.dealer_policy.reload(self)
+        self.dealer_last_bullet = self.shotgun.peek(self.rules.shells - 1)
+        if self.recorder is not None:
+            self.recorder.record((ROUND, self.round, self.shotgun.bits, self.shotgun.size))
+        self.print_shotgun_info()
+
+    def print_shotgun_info(self) -> None:
+        """Выводит информацию о текущем состоянии дробовика."""
+        if self.io.silent:
+            return
+        shotgun = self.shotgun
+        self.say(f"В дробовике {shotgun.size} патронов: {shotgun.blank} холостых, {shotgun.live} боевых.")
+
+    def print_hint(self) -> None:
+        """Выводит игроку то, что он знает о ближайшем патроне."""
+        shell = self.player_belief.shell()
+        if shell is not None:
+            self.say(f"Следующий патрон: {SHELL_NAMES[shell]}")
+        else:
+            self.say(f"Вероятность боевого патрона: {self.player_belief.live_probability():.0%}")
+
+    def shoot(self, target: Player) -> Union[bool, str]:
+        """
+        Производит выстрел по цели.
+
+        Args:
+            target (Player): Цель выстрела.
+
+        Returns:
+            Union[bool, str]: Результат выстрела или "new_round", если начинается новый раунд.
+        """
+        if not self.shotgun:
+            self.clear_console()
+            self.say("Дробовик пуст. Начинается новый раунд...")
+            self.pause(1)
+            self.start_new_round()
+            return "new_round"
+
+        bullet = self.shotgun.pop()
+        if self.recorder is not None:
+            self.recorder.record((SHOT, DEALER if target is self.dealer else PLAYER, bullet))
+        self.clear_console()
+        self.say(f"{target.name} получает выстрел. Заряд: {SHELL_NAMES[bullet]}")
+        self.print_shotgun_info()
+        self.pause(1)
+
+        if bullet == LIVE:
+            target.lives -= 1
+            if self.recorder is not None:
+                self.recorder.record((LIVES, self.player.lives, self.dealer.lives))
+            self.say(f"{target.name} теряет жизнь. Осталось жизней: {target.lives}")
+            self.pause(1)
+            return False
+        else:
+            self.say(f"{target.name} везет. Можно сделать еще один выстрел.")
+            self.pause(1)
+            return True
+
+    def use_item(self, player: Player, item: int) -> Optional[ItemResult]:
+        """
+        Использует предмет из инвентаря игрока.
+
+        Args:
+            player (Player): Игрок, использующий предмет.
+            item (int): Идентификатор предмета.
+
+        Returns:
+            Optional[ItemResult]: Результат использования предмета или None.
+        """
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.record((ITEM, DEALER if player is self.dealer else PLAYER, item))
+            lives = self.player.lives, self.dealer.lives
+        self.clear_console()
+        result = apply_item(self, player, item)
+        if recorder is not None and lives != (self.player.lives, self.dealer.lives):
+            recorder.record((LIVES, self.player.lives, self.dealer.lives))
+        if result is None:
+            self.pause(2)
+        return result
+
+    def dealer_turn(self) -> Union[bool, str, ItemResult]:
+        """
+        Выполняет ход дилера.
+
+        Returns:
+            Union[bool, str, ItemResult]: Результат хода дилера.
+        """
+        return self.policy_turn(self.dealer, self.dealer_policy)
+
+    def policy_turn(self, me: Player, policy: Policy) -> Union[bool, str, ItemResult]:
+        """
+        Выполняет ход стороны по стратегии.
+
+        Args:
+            me (Player): Сторона, которая ходит.
+            policy (Policy): Стратегия этой стороны.
+
+        Returns:
+            Union[bool, str, ItemResult]: Результат хода.
+
+        Raises:
+            ValueError: Стратегия выбрала предмет, которого у стороны нет.
+        """
+        opponent = self.dealer if me is self.player else self.player
+        items_used = 0
+        while True:
+            action = policy.act(self, me, opponent, items_used)
+            if action >= 0:
+                if not me.items.remove(action):
+                    raise ValueError(f"у стороны {me.name} нет предмета {action}")
+                items_used += 1
+                result = self.use_item(me, action)
+                if result is not None:
+                    return result
+                continue
+
+            if not self.shotgun:
+                self.clear_console()
+                self.say("Дробовик пуст. Начинается новый раунд...")
+                self.pause(1)
+                self.start_new_round()
+                return "new_round"
+
+            return self.shoot(me if action == SHOOT_SELF else opponent)
+
+    def dealer_knows_bullet(self) -> bool:
+        """
+        Проверяет, знает ли дилер следующий патрон.
+
+        Кроме исходных правил учитываются патроны, раскрытые дилеру
+        предметами в этом заряде.
+
+        Returns:
+            bool: True, если дилер знает следующий патрон, иначе False.
+        """
+        return bool(self.shotgun) and (self.shotgun.peek() == self.dealer_last_bullet or MAGNIFYING_GLASS in self.dealer.items
+                                       or self.dealer_belief.shell() is not None)
+
+    def player_turn(self) -> Union[bool, str, ItemResult]:
+        """
+        Выполняет ход игрока.
+
+        Returns:
+            Union[bool, str, ItemResult]: Результат хода игрока.
+        """
+        if not self.shotgun:
+            self.clear_console()
+            self.say("Дробовик пуст. Начинается новый раунд...")
+            self.pause(1)
+            self.start_new_round()
+            return "new_round"
+
+        if self.player_policy is not None:
+            return self.policy_turn(self.player, self.player_policy)
+
+        while True:
+            self.clear_console()
+            if not self.io.silent:
+                self.say(f"Ваши жизни: {self.player.lives}")
+                self.say(f"Ваши предметы: {', '.join(self.player.items.names())}")
+                self.print_shotgun_info()
+                if self.hints:
+                    self.print_hint()
+            action = self.ask("Выберите действие (стрелять/использовать предмет): ").lower()
+            if action == "стрелять":
+                target = self.ask("Выберите цель (себя/дилера): ").lower()
+                if target == "себя":
+                    result = self.shoot(self.player)
+                    if result == "new_round":
+                        continue
+                    return result
+                elif target == "дилера":
+                    result = self.shoot(self.dealer)
+                    if result == "new_round":
+                        continue
+                    return result
+                else:
+                    self.say("Неверная цель. Попробуйте снова.")
+                    self.pause(1)
+            elif action == "использовать предмет":
+                if self.player.items:
+                    self.say("Доступные предметы: " + ", ".join(self.player.items.names()))
+                    item = ITEM_IDS.get(self.ask("Выберите предмет для использования: "))
+                    if item is not None and self.player.items.remove(item):
+                        result = self.use_item(self.player, item)
+                        if result is not None:
+                            return result
+                    else:
+                        self.say("У вас нет такого предмета. Попробуйте снова.")
+                        self.pause(1)
+                else:
+                    self.say("У вас нет предметов для использования.")
+                    self.pause(1)
+            else:
+                self.say("Неверное действие. Попробуйте снова.")
+                self.pause(1)
+
+    def offer_new_items(self) -> None:
+        """Предлагает игроку новые предметы в начале этапа."""
+        new_items = self.rng.sample(self.rules.box_pool, self.rules.box_size(self.stage))
+
+        self.say("Вам дали специальную коробочку!")
+        for item in new_items:
+            while True:
+                choice = self.ask(f"Достать предмет '{ITEM_NAMES[item]}'? (q - да, a - завершить): ").lower()
+                if choice == 'q':
+                    if len(self.player.items) < self.rules.max_items:
+                        self.player.items.add(item)
+                        if self.recorder is not None:
+                            self.recorder.record((TAKE, item))
+                        self.say(f"Вы получили предмет: {ITEM_NAMES[item]}")
+                        if not self.io.silent:
+                            self.say(f"Ваши предметы: {', '.join(self.player.items.names())}")
+                        break
+                    else:
+                        self.say("Все слоты заполнены!")
+                        break
+                elif choice == 'a':
+                    self.say("Получение предметов завершено.")
+                    return
+                else:
+                    self.say("Неверный ввод. Попробуйте снова.")
+
+        self.say("Все предметы из коробочки разобраны.")
+
+    def start_new_round(self) -> None:
+        """Начинает новый раунд игры."""
+        self.round += 1
+        self.clear_console()
+        self.say(f"\nНачинается раунд {self.round}")
+        self.load_shotgun()
+        self.say("Информация о патронах:")
+        self.print_shotgun_info()
+        if self.rules.box_size(self.stage):
+            self.offer_new_items()
+        self.pause(2)
+
+    def play_stage(self) -> Optional[bool]:
+        """
+        Играет один этап игры.
+
+        Returns:
+            Optional[bool]: True, если игрок выиграл, False, если проиграл, None в случае ничьей.
+        """
+        self.clear_console()
+        self.say(f"\nНачинается этап {self.stage}")
+        self.pause(1)
+        lives = self.rules.lives(self.stage)
+        if lives:
+            self.player.lives = self.dealer.lives = lives
+        if self.stage == 1:
+            self.player.items.clear()
+            self.dealer.items.clear()
+
+        if self.recorder is not None:
+            self.recorder.record((STAGE, self.stage, bytes(self.player.items.counts), bytes(self.dealer.items.counts)))
+        self.round = 0
+        self.start_new_round()
+
+        skip_next_turn = None
+
+        while self.player.lives > 0 and self.dealer.lives > 0:
+            self.clear_console()
+            if not self.io.silent:
+                self.say(f"\nЭтап {self.stage}, Раунд {self.round}")
+                self.say(f"Жизни игрока: {self.player.lives}, Жизни дилера: {self.dealer.lives}")
+                self.say(f"Предметы игрока: {', '.join(self.player.items.names())}")
+                self.say(f"Предметы дилера: {', '.join(self.dealer.items.names())}")
+                self.print_shotgun_info()
+            self.pause(1)
+
+            if skip_next_turn != "player":
+                player_result = self.player_turn()
+                if player_result == "new_round":
+                    self.start_new_round()
+                    continue
+                if player_result is ItemResult.SKIP_TURN:
+                    skip_next_turn = "dealer"
+                    continue
+                if self.dealer.lives <= 0:
+                    break
+            else:
+                skip_next_turn = None
+
+            if skip_next_turn != "dealer" and self.dealer.lives > 0:
+                dealer_result = self.dealer_turn()
+                if dealer_result == "new_round":
+                    self.start_new_round()
+                    continue
+                if dealer_result is ItemResult.SKIP_TURN:
+                    skip_next_turn = "player"
+                    continue
+            else:
+                skip_next_turn = None
+
+            if self.stage == 3 and (self.player.lives <= 2 or self.dealer.lives <= 2):
+                self.clear_console()
+                self.say("Внимание! Система жизнеобеспечения отключена. Режим 'пан или пропал'.")
+                self.pause(2)
+
+        if self.recorder is not None:
+            self.recorder.record((RESULT, self.stage, self.player.lives, self.dealer.lives))
+        self.clear_console()
+        if self.player.lives <= 0:
+            self.say("Игрок проиграл.")
+            self.pause(2)
+            return False
+        elif self.dealer.lives <= 0:
+            self.say("Дилер проиграл.")
+            self.pause(2)
+            return True
+        else:
+            self.say("Этап завершен. Ничья.")
+            self.pause(2)
+            return None
+
+def run_headless(games: int, stage: int = 1) -> int:
+    """
+    Прогоняет этап без вывода заданное число раз.
+
+    Args:
+        games (int): Количество прогонов этапа.
+        stage (int): Номер этапа.
+
+    Returns:
+        int: Количество побед игрока.
+    """
+    engine = GameEngine.headless()
+    wins = 0
+    for _ in range(games):
+        engine.stage = stage
+        if engine.play_stage():
+            wins += 1
+    return wins
@@ -0,0 +1,341 @@
+import argparse
+import csv
+import itertools
+import sqlite3
+import sys
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from engine import DEALER, ITEM, PLAYER, ROUND, STAGE, Event, Recorder
+from items import ITEM_NAMES
+from saves import INT64_MAX, WriteBehindStore
+
+DEFAULT_HISTORY_PATH = "game_history.db"
+
+# Исходы партии.
+LOST = 0
+WON = 1
+QUIT = 2
+OUTCOME_NAMES = ("проигрыш", "победа", "выход")
+
+# SQLite хранит знаковые 64-битные целые. Зерно игры беззнаковое и пишется в дополнительном коде,
+# исходное зерно - seed & SEED_MASK; выигрыш больше INT64_MAX записывается как INT64_MAX.
+SEED_MASK = (1 << 64) - 1
+
+# Строки, которые партия добавляет в историю. Номера этапов (seq) идут с 1 в пределах партии.
+RunRow = Tuple  # (слот, зерно, начало, конец, исход, бесконечный режим, выигрыш, пройдено этапов, серия)
+StageRow = Tuple  # (seq, этап, итог: 1/0/None, раундов, жизни игрока, жизни дилера)
+RoundRow = Tuple  # (seq этапа, раунд, боевых, холостых)
+ItemRow = Tuple  # (seq этапа, раунд, сторона, предмет)
+
+_SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS runs
+       (id INTEGER PRIMARY KEY,
+        slot TEXT,
+        seed INTEGER,
+        started_at REAL,
+        finished_at REAL,
+        outcome INTEGER,
+        infinite_mode INTEGER,
+        winnings INTEGER,
+        stages_completed INTEGER,
+        streak INTEGER)''',
+    # Таблицы событий кластеризованы по номеру партии: новые строки всегда дописываются в конец дерева.
+    '''CREATE TABLE IF NOT EXISTS stages
+       (run_id INTEGER, seq INTEGER, stage INTEGER, won INTEGER, rounds INTEGER,
+        player_lives INTEGER, dealer_lives INTEGER,
+        PRIMARY KEY (run_id, seq)) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS rounds
+       (run_id INTEGER, stage_seq INTEGER, round INTEGER, live INTEGER, blank INTEGER,
+        PRIMARY KEY (run_id, stage_seq, round)) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS item_uses
+       (run_id INTEGER, seq INTEGER, stage_seq INTEGER, round INTEGER, side INTEGER, item INTEGER,
+        PRIMARY KEY (run_id, seq)) WITHOUT ROWID''',
+    # Сводки пополняются в той же транзакции, что и история, поэтому статистика не сканирует события.
+    '''CREATE TABLE IF NOT EXISTS item_stats
+       (side INTEGER, item INTEGER, stages INTEGER, wins INTEGER, uses INTEGER,
+        PRIMARY KEY (side, item)) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS stage_stats
+       (stage INTEGER PRIMARY KEY, stages INTEGER, player_wins INTEGER, dealer_wins INTEGER)''',
+    "CREATE INDEX IF NOT EXISTS runs_winnings ON runs (winnings DESC)",
+    "CREATE INDEX IF NOT EXISTS runs_streak ON runs (streak DESC)",
+    "CREATE INDEX IF NOT EXISTS runs_slot ON runs (slot, started_at)",
+)
+
+_INSERT_RUN = ("INSERT INTO runs (slot, seed, started_at, finished_at, outcome, infinite_mode, winnings, "
+               "stages_completed, streak) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+_INSERT_STAGE = "INSERT INTO stages VALUES (?, ?, ?, ?, ?, ?, ?)"
+_INSERT_ROUND = "INSERT INTO rounds VALUES (?, ?, ?, ?, ?)"
+_INSERT_ITEM = "INSERT INTO item_uses VALUES (?, ?, ?, ?, ?, ?)"
+_ADD_ITEM_STATS = ('''INSERT INTO item_stats VALUES (?, ?, ?, ?, ?) ON CONFLICT (side, item) DO UPDATE SET
+                      stages = stages + excluded.stages, wins = wins + excluded.wins, uses = uses + excluded.uses''')
+_ADD_STAGE_STATS = ('''INSERT INTO stage_stats VALUES (?, ?, ?, ?) ON CONFLICT (stage) DO UPDATE SET
+                       stages = stages + excluded.stages, player_wins = player_wins + excluded.player_wins,
+                       dealer_wins = dealer_wins + excluded.dealer_wins''')
+
+_TOP_WINNINGS = ("SELECT id, slot, winnings, stages_completed, finished_at FROM runs "
+                 "WHERE winnings > 0 ORDER BY winnings DESC LIMIT ?")
+_TOP_STREAKS = ("SELECT id, slot, streak, winnings, finished_at FROM runs "
+                "WHERE streak > 0 ORDER BY streak DESC LIMIT ?")
+
+EXPORT_TABLES = ("runs", "stages", "rounds", "item_uses")
+
+class RunRecorder(Recorder):
+    """
+    Собирает историю одной партии из событий движка.
+
+    Подключается приемником к bus.EventBus игры или как recorder; во втором
+    случае прежний recorder продолжает получать все события через forward.
+
+    Attributes:
+        slot (str): Слот сохранения партии.
+        seed (int): Зерно игры.
+        stages (List[StageRow]): Сыгранные этапы.
+        rounds (List[RoundRow]): Зарядки дробовика.
+        items (List[ItemRow]): Использованные предметы.
+        streak (int): Самая длинная серия побед в бесконечном режиме.
+        forward (Optional[Recorder]): Следующий получатель событий.
+    """
+
+    __slots__ = ("slot", "seed", "started_at", "stages", "rounds", "items", "round", "streak", "current", "forward")
+
+    def __init__(self, slot: str, seed: int, forward: Optional[Recorder] = None):
+        self.slot: str = slot
+        self.seed: int = seed
+        self.started_at: float = time.time()
+        self.stages: List[StageRow] = []
+        self.rounds: List[RoundRow] = []
+        self.items: List[ItemRow] = []
+        self.round: int = 0
+        self.streak: int = 0
+        self.current: int = 0
+        self.forward: Optional[Recorder] = forward
+
+    def record(self, event: Event) -> None:
+        kind = event[0]
+        if kind == STAGE:
+            self.round = 0
+        elif kind == ROUND:
+            self.round = event[1]
+            live = bin(event[2]).count("1")
+            self.rounds.append((len(self.stages) + 1, self.round, live, event[3] - live))
+        elif kind == ITEM:
+            self.items.append((len(self.stages) + 1, self.round, event[1], event[2]))
+        if self.forward is not None:
+            self.forward.record(event)
+
+    def end_stage(self, game, result: Optional[bool]) -> None:
+        """
+        Записывает итог этапа.
+
+        Args:
+            game: Игра с полями stage, round, player, dealer и infinite_mode.
+            result (Optional[bool]): Результат play_stage.
+        """
+        self.stages.append((len(self.stages) + 1, game.stage, None if result is None else int(result), game.round,
+                            game.player.lives, game.dealer.lives))
+        if game.infinite_mode and result:
+            self.current += 1
+            self.streak = max(self.streak, self.current)
+        else:
+            self.current = 0
+
+    def finish(self, game, completed: bool = True) -> Tuple[RunRow, List[StageRow], List[RoundRow], List[ItemRow]]:
+        """
+        Завершает партию.
+
+        Выигрыш засчитывается, только если игрок ушел с ним сам: проигрыш в
+        бесконечном режиме оставляет ни с чем.
+
+        Args:
+            game: Игра с полями winnings, infinite_mode и stages_completed.
+            completed (bool): Партия дошла до конца, а не прервана.
+
+        Returns:
+            Tuple: Строки партии для HistoryStore.append.
+        """
+        last = self.stages[-1] if self.stages else None
+        if last is not None and last[2] == 0:
+            outcome = LOST
+        elif completed and last is not None and (game.infinite_mode or last[1] == 3):
+            outcome = WON
+        else:
+            outcome = QUIT
+        winnings = min(game.winnings, INT64_MAX) if outcome == WON and game.infinite_mode else 0
+        seed = self.seed & SEED_MASK
+        seed = seed - (1 << 64) if seed > INT64_MAX else seed
+        run = (self.slot, seed, self.started_at, time.time(), outcome, int(game.infinite_mode), winnings,
+               game.stages_completed, self.streak)
+        return run, self.stages, self.rounds, self.items
+
+class HistoryStore(WriteBehindStore):
+    """
+    Журнал партий в SQLite только на дозапись.
+
+    append кладет партию в очередь, фоновый поток записывает накопленные
+    партии одной транзакцией (см. saves.WriteBehindStore) и в ней же
+    пополняет сводки item_stats и stage_stats. Лидерборды идут по индексам,
+    статистика предметов - по сводкам, поэтому запросы не замедляются с
+    ростом истории. Выгрузка читает курсор порциями и не держит таблицу в памяти.
+
+    Attributes:
+        path (str): Путь к файлу базы данных.
+        delay (float): Сколько ждать новых партий перед записью, в секундах.
+        runs (int): Записано партий.
+    """
+
+    __slots__ = ("_sequence",)
+
+    DEFAULT_PATH = DEFAULT_HISTORY_PATH
+    THREAD_NAME = "history-writer"
+    CLOSED_MESSAGE = "журнал партий закрыт"
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, delay: float = 0.5):
+        super().__init__(path, delay)
+        # Партии не заменяют друг друга: у каждой свой ключ в очереди.
+        self._sequence = itertools.count()
+
+    @property
+    def runs(self) -> int:
+        return self.written
+
+    def _create(self, connection: sqlite3.Connection) -> None:
+        for statement in _SCHEMA:
+            connection.execute(statement)
+
+    def _write(self, connection: sqlite3.Connection, rows: List[Tuple]) -> None:
+        _write_runs(connection, rows)
+
+    def append(self, run: Tuple[RunRow, List[StageRow], List[RoundRow], List[ItemRow]]) -> None:
+        """
+        Ставит партию в очередь записи.
+
+        Args:
+            run (Tuple): Результат RunRecorder.finish.
+        """
+        self._queue(next(self._sequence), run)
+
+    def _query(self, sql: str, parameters: Tuple = ()) -> Iterator[Tuple]:
+        self.flush()
+        cursor = self._reader().execute(sql, parameters)
+        cursor.arraysize = 1000
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                return
+            yield from rows
+
+    def top_winnings(self, limit: int = 10) -> Iterator[Tuple]:
+        """Партии с наибольшим выигрышем: (id, слот, выигрыш, пройдено этапов, время)."""
+        return self._query(_TOP_WINNINGS, (limit,))
+
+    def longest_streaks(self, limit: int = 10) -> Iterator[Tuple]:
+        """Самые длинные серии побед в бесконечном режиме: (id, слот, серия, выигрыш, время)."""
+        return self._query(_TOP_STREAKS, (limit,))
+
+    def slot_runs(self, slot: str) -> Iterator[Tuple]:
+        """Партии слота по порядку."""
+        return self._query("SELECT * FROM runs WHERE slot = ? ORDER BY started_at", (slot,))
+
+    def item_stats(self) -> List[Tuple[int, int, int, float, float]]:
+        """
+        Вклад предметов в победы.
+
+        Returns:
+            List[Tuple[int, int, int, float, float]]: (сторона, предмет, использований, доля побед
+            стороны в этапах с предметом, разница с долей побед стороны во всех этапах).
+        """
+        self.flush()
+        connection = self._reader()
+        stages, player_wins, dealer_wins = connection.execute(
+            "SELECT TOTAL(stages), TOTAL(player_wins), TOTAL(dealer_wins) FROM stage_stats").fetchone()
+        base = {PLAYER: player_wins / stages if stages else 0.0, DEALER: dealer_wins / stages if stages else 0.0}
+        result = []
+        for side, item, used_in, wins, uses in connection.execute(
+                "SELECT side, item, stages, wins, uses FROM item_stats ORDER BY side, item"):
+            rate = wins / used_in if used_in else 0.0
+            result.append((side, item, uses, rate, rate - base[side]))
+        return result
+
+    def export(self, table: str, file: TextIO) -> int:
+        """
+        Выгружает таблицу истории в CSV порциями.
+
+        Args:
+            table (str): Одна из EXPORT_TABLES.
+            file (TextIO): Куда писать.
+
+        Returns:
+            int: Выгружено строк.
+        """
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"неизвестная таблица: {table}")
+        self.flush()
+        cursor = self._reader().execute(f"SELECT * FROM {table}")
+        writer = csv.writer(file)
+        writer.writerow(column for column, *_ in cursor.description)
+        count = 0
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                return count
+            writer.writerows(rows)
+            count += len(rows)
+
+def _write_runs(connection: sqlite3.Connection, batch: List[Tuple]) -> None:
+    """Записывает партии и пополняет сводки; вызывается внутри транзакции."""
+    item_stats: Dict[Tuple[int, int], List[int]] = {}
+    stage_stats: Dict[int, List[int]] = {}
+    stages: List[Tuple] = []
+    rounds: List[Tuple] = []
+    items: List[Tuple] = []
+    for run, run_stages, run_rounds, run_items in batch:
+        run_id = connection.execute(_INSERT_RUN, run).lastrowid
+        stages.extend((run_id,) + row for row in run_stages)
+        rounds.extend((run_id,) + row for row in run_rounds)
+        items.extend((run_id, seq) + row for seq, row in enumerate(run_items, 1))
+        used: Dict[int, Counter] = {}
+        for stage_seq, _, side, item in run_items:
+            used.setdefault(stage_seq, Counter())[side, item] += 1
+        for seq, stage, won, *_ in run_stages:
+            totals = stage_stats.setdefault(stage, [0, 0, 0])
+            totals[0] += 1
+            totals[1] += won == 1
+            totals[2] += won == 0
+            for (side, item), uses in used.get(seq, {}).items():
+                totals = item_stats.setdefault((side, item), [0, 0, 0])
+                totals[0] += 1
+                totals[1] += won == (1 if side == PLAYER else 0)
+                totals[2] += uses
+    connection.executemany(_INSERT_STAGE, stages)
+    connection.executemany(_INSERT_ROUND, rounds)
+    connection.executemany(_INSERT_ITEM, items)
+    connection.executemany(_ADD_ITEM_STATS, [key + tuple(totals) for key, totals in item_stats.items()])
+    connection.executemany(_ADD_STAGE_STATS, [(stage,) + tuple(totals) for stage, totals in stage_stats.items()])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="История партий")
+    parser.add_argument("command", choices=("top", "streaks", "items", "export"), help="что показать")
+    parser.add_argument("argument", nargs="?", help="количество строк или таблица для export")
+    parser.add_argument("--db", default=DEFAULT_HISTORY_PATH, help="файл истории")
+    options = parser.parse_args()
+    store = HistoryStore(options.db)
+    limit = int(options.argument) if options.argument and options.command != "export" else 10
+    if options.command == "top":
+        for _, slot, won, completed, finished in store.top_winnings(limit):
+            print(f"{won:>10}$  {slot:<20} этапов {completed:<4} "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(finished))}")
+    elif options.command == "streaks":
+        for _, slot, streak, won, _ in store.longest_streaks(limit):
+            print(f"{streak:>5} побед подряд  {slot:<20} {won}$")
+    elif options.command == "items":
+        for side, item, uses, rate, contribution in store.item_stats():
+            print(f"{'дилер' if side == DEALER else 'игрок':<6} {ITEM_NAMES[item]:<40} {uses:>8} {rate:>7.1%} "
+                  f"{contribution:>+7.1%}")
+    elif options.argument in EXPORT_TABLES:
+        exported = store.export(options.argument, sys.stdout)
+        print(f"Выгружено строк: {exported}", file=sys.stderr)
+    else:
+        parser.error(f"таблица для export: {', '.join(EXPORT_TABLES)}")
+    store.close()
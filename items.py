@@ -0,0 +1,29 @@
+from typing import Dict, Tuple
+
+PHONE = 0
+BEER = 1
+MAGNIFYING_GLASS = 2
+HANDCUFFS = 3
+CIGARETTES = 4
+HAND_SAW = 5
+WAIVER = 6
+ADRENALINE = 7
+INVERTER = 8
+BURNER_PHONE = 9
+EXPIRED_MEDICINE = 10
+
+ITEM_NAMES: Tuple[str, ...] = (
+    "Телефон",
+    "Банка пива",
+    "Лупа",
+    "Наручники",
+    "Пачка сигарет",
+    "Складная ножовка",
+    "Отказ от претензий, подписанный Богом",
+    "Адреналин",
+    "Инвертор",
+    "Одноразовый телефон",
+    "Просроченное лекарство",
+)
+ITEM_COUNT: int = len(ITEM_NAMES)
+ITEM_IDS: Dict[str, int] = {name: item_id for item_id, name in enumerate(ITEM_NAMES)}
@@ -0,0 +1,339 @@
+import math
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from items import (ADRENALINE, BEER, BURNER_PHONE, CIGARETTES, EXPIRED_MEDICINE, HAND_SAW, INVERTER,
+                   MAGNIFYING_GLASS, PHONE)
+from policies import SHOOT_OPPONENT, Policy
+from rules import Rules
+from state import Player
+
+PLAYER = 0
+DEALER = 1
+
+# Предметы, которые меняют состояние или знание о патронах; Наручники и Отказ
+# в текущих правилах ничего не дают и в поиске не рассматриваются.
+ACTIVE_ITEMS: Tuple[int, ...] = (BEER, MAGNIFYING_GLASS, CIGARETTES, HAND_SAW, ADRENALINE, INVERTER,
+                                 PHONE, BURNER_PHONE, EXPIRED_MEDICINE)
+
+Key = Tuple[int, int, int, int, int, bytes, bytes, int]
+
+class Simulation:
+    """
+    Одна детерминизация игры: магазин известен целиком, правила как в GameEngine.
+
+    Attributes:
+        rules (Rules): Правила игры, по ним идут перезарядки и коробочки.
+        bits (int): Битовая маска патронов.
+        size (int): Количество патронов.
+        live (int): Количество боевых патронов.
+        known (int): Маска позиций, тип которых известен обеим сторонам.
+        lives (List[int]): Жизни игрока и дилера.
+        items (List[bytearray]): Количества предметов игрока и дилера.
+        turn (int): Чей ход.
+    """
+
+    __slots__ = ("rng", "rules", "stage", "bits", "size", "live", "known", "lives", "items", "turn")
+
+    def __init__(self, rng: random.Random, rules: Rules, stage: int, bits: int, size: int, known: int,
+                 lives: List[int], items: List[bytearray], turn: int):
+        self.rng = rng
+        self.rules = rules
+        self.stage = stage
+        self.bits = bits
+        self.size = size
+        self.live = bin(bits).count("1")
+        self.known = known
+        self.lives = lives
+        self.items = items
+        self.turn = turn
+
+    @classmethod
+    def sample(cls, game, revealed: Dict[int, int], rng: random.Random) -> "Simulation":
+        """
+        Выбирает магазин, согласованный со счетчиками патронов и раскрытыми позициями.
+
+        Args:
+            game: Движок игры.
+            revealed (Dict[int, int]): Известные типы патронов по позициям от ближайшего.
+            rng (random.Random): Генератор случайных чисел.
+
+        Returns:
+            Simulation: Детерминизированная игра, ход дилера.
+        """
+        shotgun = game.shotgun
+        bits = known = 0
+        live_left = shotgun.live
+        for index, shell in revealed.items():
+            known |= 1 << index
+            bits |= shell << index
+            live_left -= shell
+        hidden = [index for index in range(shotgun.size) if not known >> index & 1]
+        for index in rng.sample(hidden, max(0, min(live_left, len(hidden)))):
+            bits |= 1 << index
+        return cls(rng, game.rules, game.stage, bits, shotgun.size, known,
+                   [game.player.lives, game.dealer.lives],
+                   [bytearray(game.player.items.counts), bytearray(game.dealer.items.counts)], DEALER)
+
+    def key(self) -> Key:
+        """Открытая информация о позиции: по ней узлы дерева общие для всех детерминизаций."""
+        front = 0
+        if self.known & 1:
+            front = 1 if self.bits & 1 else 2
+        return (self.size, self.live, front, self.lives[PLAYER], self.lives[DEALER],
+                bytes(self.items[PLAYER]), bytes(self.items[DEALER]), self.turn)
+
+    def winner(self) -> Optional[int]:
+        """Победившая сторона или None, если игра продолжается."""
+        if self.lives[PLAYER] <= 0:
+            return DEALER
+        if self.lives[DEALER] <= 0:
+            return PLAYER
+        return None
+
+    def actions(self) -> List[int]:
+        """
+        Осмысленные действия ходящей стороны.
+
+        Выстрел в себя не дает лишнего хода и потому не рассматривается.
+        """
+        counts = self.items[self.turn]
+        result = [SHOOT_OPPONENT]
+        for item in ACTIVE_ITEMS:
+            if not counts[item]:
+                continue
+            if item == MAGNIFYING_GLASS and self.known & 1:
+                continue
+            if item == ADRENALINE and not any(self.items[self.turn ^ 1]):
+                continue
+            result.append(item)
+        return result
+
+    def pop(self) -> int:
+        shell = self.bits & 1
+        self.bits >>= 1
+        self.known >>= 1
+        self.size -= 1
+        self.live -= shell
+        return shell
+
+    def reload(self) -> None:
+        """Новый раунд: как в play_stage, после перезарядки ходит игрок."""
+        rules = self.rules
+        if rules.live_chance == 0.5:
+            self.bits = self.rng.getrandbits(rules.shells)
+        else:
+            self.bits = sum(1 << index for index in range(rules.shells) if self.rng.random() < rules.live_chance)
+        self.size = rules.shells
+        self.live = bin(self.bits).count("1")
+        self.known = 0
+        self.turn = PLAYER
+        box_size = rules.box_size(self.stage)
+        if box_size:
+            counts = self.items[PLAYER]
+            for item in self.rng.sample(rules.box_pool, box_size):
+                if sum(counts) < rules.max_items:
+                    counts[item] += 1
+
+    def apply(self, action: int) -> None:
+        """Применяет действие ходящей стороны."""
+        me = self.turn
+        if action < 0:
+            shell = self.pop()
+            self.lives[me ^ 1] -= shell
+            self.turn = me ^ 1
+            if not self.size:
+                self.reload()
+            return
+        self.items[me][action] -= 1
+        self.effect(me, action)
+
+    def effect(self, me: int, item: int) -> None:
+        """Эффект предмета, как в effects.ITEMS."""
+        if item == CIGARETTES:
+            self.lives[me] += 1
+        elif item == EXPIRED_MEDICINE:
+            self.lives[me] += 2 if self.rng.random() < 0.5 else -1
+        elif item == HAND_SAW:
+            self.turn = me ^ 1
+        elif item == ADRENALINE:
+            opponent = self.items[me ^ 1]
+            while any(opponent):
+                draw = self.rng.randrange(sum(opponent))
+                for stolen, count in enumerate(opponent):
+                    if draw < count:
+                        break
+                    draw -= count
+                opponent[stolen] -= 1
+                if stolen != ADRENALINE:
+                    self.effect(me, stolen)
+                    return
+        elif not self.size:
+            return
+        elif item == BEER:
+            self.pop()
+            if not self.size:
+                self.reload()
+        elif item == MAGNIFYING_GLASS:
+            self.known |= 1
+        elif item == INVERTER:
+            self.live += 1 - 2 * (self.bits & 1)
+            self.bits ^= 1
+            self.known |= 1
+        elif item == PHONE or item == BURNER_PHONE:
+            self.known |= 1 << self.rng.randrange(self.size)
+
+    def rollout(self, max_plies: int) -> float:
+        """
+        Доигрывает случайно и возвращает результат для дилера.
+
+        Returns:
+            float: 1 - победа дилера, 0 - поражение, иначе доля жизней дилера.
+        """
+        rng = self.rng
+        for _ in range(max_plies):
+            winner = self.winner()
+            if winner is not None:
+                return 1.0 if winner == DEALER else 0.0
+            actions = self.actions()
+            if len(actions) > 1 and rng.random() < 0.5:
+                self.apply(rng.choice(actions[1:]))
+            else:
+                self.apply(SHOOT_OPPONENT)
+        winner = self.winner()
+        if winner is not None:
+            return 1.0 if winner == DEALER else 0.0
+        return self.lives[DEALER] / (self.lives[DEALER] + self.lives[PLAYER])
+
+class Node:
+    """
+    Узел дерева: статистика действий в одной открытой позиции.
+
+    Attributes:
+        actions (List[int]): Действия.
+        visits (List[int]): Посещения по действиям.
+        wins (List[float]): Сумма результатов по действиям для ходящей стороны.
+        total (int): Всего посещений узла.
+        generation (int): Номер поиска, в котором узел использовался последний раз.
+    """
+
+    __slots__ = ("actions", "visits", "wins", "total", "generation")
+
+    def __init__(self, actions: List[int], generation: int):
+        self.actions = actions
+        self.visits = [0] * len(actions)
+        self.wins = [0.0] * len(actions)
+        self.total = 0
+        self.generation = generation
+
+    def select(self, exploration: float) -> int:
+        """Номер действия по UCB1; непосещенные действия выбираются первыми."""
+        best = 0
+        best_score = -1.0
+        log_total = math.log(self.total + 1)
+        for index, visits in enumerate(self.visits):
+            if not visits:
+                return index
+            score = self.wins[index] / visits + exploration * math.sqrt(log_total / visits)
+            if score > best_score:
+                best, best_score = index, score
+        return best
+
+class MCTSPolicy(Policy):
+    """
+    Дилер на поиске Монте-Карло по дереву с ограничением времени на ход.
+
+    Скрытый магазин на каждой итерации выбирается заново: количество боевых
+    и холостых патронов берется со счетчиков, позиции, раскрытые дилеру
+    (Лупой и Телефонами) или обеим сторонам (Инвертором), сохраняются до
+    перезарядки. Закрытые раскрытия игрока дилер не видит. Узлы хранятся по открытой информации,
+    поэтому поддерево, построенное на прошлом ходу, продолжает использоваться.
+
+    Attributes:
+        budget_ms (float): Время на одно решение в миллисекундах.
+        exploration (float): Коэффициент исследования UCB1.
+        max_nodes (int): Предел числа узлов; при переполнении остаются узлы двух последних поисков.
+        rng (Optional[random.Random]): Генератор поиска; None - game.policy_rng.
+        iterations (int): Итераций в последнем поиске.
+    """
+
+    __slots__ = ("budget_ms", "exploration", "max_nodes", "max_depth", "rng", "nodes", "generation",
+                 "revealed", "iterations")
+
+    def __init__(self, budget_ms: float = 50.0, exploration: float = 1.0, max_nodes: int = 200000,
+                 max_depth: int = 200, rng: Optional[random.Random] = None):
+        self.budget_ms: float = budget_ms
+        self.exploration: float = exploration
+        self.max_nodes: int = max_nodes
+        self.max_depth: int = max_depth
+        self.rng: Optional[random.Random] = rng
+        self.nodes: Dict[Key, Node] = {}
+        self.generation: int = 0
+        self.revealed: Dict[int, int] = {}
+        self.iterations: int = 0
+
+    def reload(self, game) -> None:
+        self.revealed = {}
+
+    def observe(self, game, player: Player, index: int, shell: int, public: bool) -> None:
+        # Закрытые раскрытия игрока дилер не видит.
+        if public or player is game.dealer:
+            # Позиция хранится относительно конца магазина, поэтому выстрелы и Пиво ее не сдвигают.
+            self.revealed[index - game.shotgun.size] = shell
+
+    def act(self, game, me: Player, opponent: Player, items_used: int) -> int:
+        # Игрок, застреливший себя, не завершает ход: дилер все равно ходит.
+        if not game.shotgun or me.lives <= 0 or opponent.lives <= 0:
+            return SHOOT_OPPONENT
+        size = game.shotgun.size
+        revealed = {index + size: shell for index, shell in self.revealed.items() if index + size >= 0}
+        rng = self.rng or game.policy_rng
+        self.generation += 1
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        root_key = None
+        iterations = 0
+        while True:
+            simulation = Simulation.sample(game, revealed, rng)
+            if root_key is None:
+                root_key = simulation.key()
+            self._iterate(simulation)
+            iterations += 1
+            if not iterations & 15 and time.perf_counter() >= deadline:
+                break
+        self.iterations = iterations
+        root = self.nodes[root_key]
+        action = root.actions[max(range(len(root.actions)), key=root.visits.__getitem__)]
+        if len(self.nodes) > self.max_nodes:
+            keep = self.generation - 1
+            self.nodes = {key: node for key, node in self.nodes.items() if node.generation >= keep}
+        return action
+
+    def _iterate(self, simulation: Simulation) -> None:
+        path: List[Tuple[Node, int, int]] = []
+        result = None
+        for _ in range(self.max_depth):
+            winner = simulation.winner()
+            if winner is not None:
+                result = 1.0 if winner == DEALER else 0.0
+                break
+            key = simulation.key()
+            node = self.nodes.get(key)
+            if node is None:
+                node = Node(simulation.actions(), self.generation)
+                self.nodes[key] = node
+                index = node.select(self.exploration)
+                path.append((node, index, simulation.turn))
+                simulation.apply(node.actions[index])
+                result = simulation.rollout(self.max_depth)
+                break
+            node.generation = self.generation
+            index = node.select(self.exploration)
+            path.append((node, index, simulation.turn))
+            simulation.apply(node.actions[index])
+        if result is None:
+            result = simulation.rollout(0)
+        for node, index, side in path:
+            node.total += 1
+            node.visits[index] += 1
+            node.wins[index] += result if side == DEALER else 1.0 - result
@@ -0,0 +1,273 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from engine import EVENT_NAMES, Event
+from items import ADRENALINE, ITEM_NAMES
+from state import BLANK, LIVE, SHELL_NAMES
+
+# Границы корзин гистограмм задержек в секундах, от микросекунды до 10 с.
+BUCKETS: Tuple[float, ...] = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                              1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Замеряемые методы движка и консольной игры.
+ENGINE_METHODS = ("shoot", "use_item", "dealer_turn", "player_turn", "start_new_round")
+SAVE_METHODS = ("save_progress", "load_progress")
+
+PREFIX = "buckshot"
+
+class Histogram:
+    """
+    Гистограмма задержек с фиксированными корзинами.
+
+    Attributes:
+        counts (List[int]): Количество замеров по корзинам, последняя - больше всех границ.
+        count (int): Всего замеров.
+        sum (float): Сумма задержек в секундах.
+    """
+
+    __slots__ = ("counts", "count", "sum", "lock")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * (len(BUCKETS) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """Учитывает один замер."""
+        index = bisect.bisect_left(BUCKETS, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def reset(self) -> None:
+        """Обнуляет замеры."""
+        with self.lock:
+            self.counts = [0] * (len(BUCKETS) + 1)
+            self.count = 0
+            self.sum = 0.0
+
+    def quantile(self, q: float) -> float:
+        """Верхняя граница корзины, в которую попадает квантиль q."""
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return BUCKETS[index] if index < len(BUCKETS) else float("inf")
+        return 0.0
+
+class Metrics:
+    """
+    Счетчики и гистограммы задержек горячих методов игры.
+
+    Пока замеры выключены, методы классов остаются исходными и ничего не
+    стоят. install подменяет их на обертки с замером времени, uninstall
+    возвращает исходные.
+
+    Attributes:
+        calls (Dict[str, Histogram]): Задержки по методам.
+        shells (Counter): Выстреленные патроны по типу.
+        items (Counter): Использованные предметы по идентификатору.
+        rounds (Counter): Начатые раунды по этапам.
+        events (Counter): События шины по типу, если Metrics подключен к bus.EventBus.
+    """
+
+    __slots__ = ("calls", "shells", "items", "rounds", "events", "lock", "originals", "exporter", "stop")
+
+    def __init__(self):
+        self.calls: Dict[str, Histogram] = {name: Histogram() for name in ENGINE_METHODS + SAVE_METHODS}
+        self.shells: Counter = Counter()
+        self.items: Counter = Counter()
+        self.rounds: Counter = Counter()
+        self.events: Counter = Counter()
+        self.lock = threading.Lock()
+        self.originals: List[Tuple[type, str, Callable]] = []
+        self.exporter: Optional[threading.Thread] = None
+        self.stop = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        """Установлены ли обертки."""
+        return bool(self.originals)
+
+    def install(self, *classes: type) -> None:
+        """
+        Подменяет замеряемые методы классов обертками.
+
+        Args:
+            *classes (type): Классы, по умолчанию GameEngine и RussianRoulette.
+        """
+        if not classes:
+            from engine import GameEngine
+            from main import RussianRoulette
+            classes = (GameEngine, RussianRoulette)
+        for cls in classes:
+            for name in ENGINE_METHODS + SAVE_METHODS:
+                function = cls.__dict__.get(name)
+                if function is None or getattr(function, "__wrapped__", None) is not None:
+                    continue
+                self.originals.append((cls, name, function))
+                setattr(cls, name, self._wrap(name, function))
+
+    def uninstall(self) -> None:
+        """Возвращает исходные методы."""
+        for cls, name, function in reversed(self.originals):
+            setattr(cls, name, function)
+        self.originals.clear()
+
+    def _wrap(self, name: str, function: Callable) -> Callable:
+        histogram = self.calls[name]
+        perf_counter = time.perf_counter
+
+        if name == "shoot":
+            @functools.wraps(function)
+            def timed(game, *args, **kwargs):
+                start = perf_counter()
+                try:
+                    result = function(game, *args, **kwargs)
+                finally:
+                    histogram.observe(perf_counter() - start)
+                if result is not None and result != "new_round":
+                    with self.lock:
+                        self.shells[BLANK if result else LIVE] += 1
+                return result
+        elif name == "use_item":
+            @functools.wraps(function)
+            def timed(game, player, item, *args, **kwargs):
+                # Украденный Адреналином предмет применяется сразу, минуя use_item: он считается
+                # по тому, что пропало из инвентаря противника.
+                if item == ADRENALINE:
+                    opponent = game.dealer if player is game.player else game.player
+                    before = bytes(opponent.items.counts)
+                start = perf_counter()
+                try:
+                    result = function(game, player, item, *args, **kwargs)
+                finally:
+                    histogram.observe(perf_counter() - start)
+                with self.lock:
+                    self.items[item] += 1
+                    if item == ADRENALINE:
+                        for stolen, after in enumerate(opponent.items.counts):
+                            if before[stolen] > after:
+                                self.items[stolen] += before[stolen] - after
+                return result
+        elif name == "start_new_round":
+            @functools.wraps(function)
+            def timed(game, *args, **kwargs):
+                start = perf_counter()
+                try:
+                    result = function(game, *args, **kwargs)
+                finally:
+                    histogram.observe(perf_counter() - start)
+                with self.lock:
+                    self.rounds[game.stage] += 1
+                return result
+        else:
+            @functools.wraps(function)
+            def timed(game, *args, **kwargs):
+                start = perf_counter()
+                try:
+                    return function(game, *args, **kwargs)
+                finally:
+                    histogram.observe(perf_counter() - start)
+        return timed
+
+    def record(self, event: Event) -> None:
+        """Считает событие игры: так Metrics подключается приемником к bus.EventBus."""
+        with self.lock:
+            self.events[event[0]] += 1
+
+    def reset(self) -> None:
+        """Обнуляет все замеры."""
+        for histogram in self.calls.values():
+            histogram.reset()
+        with self.lock:
+            self.shells.clear()
+            self.items.clear()
+            self.rounds.clear()
+            self.events.clear()
+
+    def to_json(self) -> dict:
+        """Замеры в виде словаря для JSON."""
+        with self.lock:
+            return {
+                "calls": {name: {"count": h.count, "sum": h.sum, "p50": h.quantile(0.5), "p99": h.quantile(0.99),
+                                 "buckets": dict(zip([str(bound) for bound in BUCKETS] + ["+Inf"], h.counts))}
+                          for name, h in self.calls.items()},
+                "shells_fired": {SHELL_NAMES[shell]: count for shell, count in sorted(self.shells.items())},
+                "items_used": {ITEM_NAMES[item]: count for item, count in sorted(self.items.items())},
+                "rounds": {str(stage): count for stage, count in sorted(self.rounds.items())},
+                "events": {EVENT_NAMES.get(kind, str(kind)): count for kind, count in sorted(self.events.items())},
+            }
+
+    def to_prometheus(self) -> str:
+        """Замеры в текстовом формате Prometheus."""
+        lines = [f"# TYPE {PREFIX}_call_seconds histogram"]
+        with self.lock:
+            for name, h in self.calls.items():
+                cumulative = 0
+                for bound, count in zip(BUCKETS + (float("inf"),), h.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{PREFIX}_call_seconds_bucket{{method="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'{PREFIX}_call_seconds_sum{{method="{name}"}} {h.sum!r}')
+                lines.append(f'{PREFIX}_call_seconds_count{{method="{name}"}} {h.count}')
+            lines.append(f"# TYPE {PREFIX}_shells_fired_total counter")
+            for shell, count in sorted(self.shells.items()):
+                lines.append(f'{PREFIX}_shells_fired_total{{shell="{SHELL_NAMES[shell]}"}} {count}')
+            lines.append(f"# TYPE {PREFIX}_items_used_total counter")
+            for item, count in sorted(self.items.items()):
+                lines.append(f'{PREFIX}_items_used_total{{item="{ITEM_NAMES[item]}"}} {count}')
+            lines.append(f"# TYPE {PREFIX}_rounds_total counter")
+            for stage, count in sorted(self.rounds.items()):
+                lines.append(f'{PREFIX}_rounds_total{{stage="{stage}"}} {count}')
+            lines.append(f"# TYPE {PREFIX}_events_total counter")
+            for kind, count in sorted(self.events.items()):
+                lines.append(f'{PREFIX}_events_total{{kind="{EVENT_NAMES.get(kind, kind)}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str) -> None:
+        """
+        Записывает замеры в файл целиком: читатель никогда не видит половину файла.
+
+        Формат выбирается по расширению: .json - JSON, иначе текст Prometheus.
+        """
+        if path.endswith(".json"):
+            data = json.dumps(self.to_json(), ensure_ascii=False, indent=2)
+        else:
+            data = self.to_prometheus()
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(data)
+        os.replace(temporary, path)
+
+    def export_every(self, path: str, interval: float = 15.0) -> None:
+        """Запускает фоновый поток, который записывает замеры каждые interval секунд."""
+        if self.exporter is not None:
+            return
+        self.stop.clear()
+
+        def run() -> None:
+            while not self.stop.wait(interval):
+                self.export(path)
+            self.export(path)
+
+        self.exporter = threading.Thread(target=run, name="metrics-export", daemon=True)
+        self.exporter.start()
+
+    def close(self) -> None:
+        """Останавливает фоновую запись, записав замеры последний раз."""
+        if self.exporter is not None:
+            self.stop.set()
+            self.exporter.join()
+            self.exporter = None
+
+METRICS = Metrics()
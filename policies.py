@@ -0,0 +1,121 @@
+import random
+from typing import Optional
+
+from items import CIGARETTES, MAGNIFYING_GLASS
+from state import BLANK, LIVE, Player
+
+# Действия стратегии: неотрицательное число - идентификатор предмета.
+SHOOT_SELF = -1
+SHOOT_OPPONENT = -2
+
+class Policy:
+    """
+    Стратегия стороны за столом.
+
+    Движок вызывает act, пока стратегия выбирает предметы, и заканчивает ход
+    выстрелом или результатом предмета (ItemResult).
+    """
+
+    def act(self, game, me: Player, opponent: Player, items_used: int) -> int:
+        """
+        Выбирает следующее действие.
+
+        Args:
+            game: Движок игры.
+            me (Player): Сторона, за которую играет стратегия.
+            opponent (Player): Противник.
+            items_used (int): Сколько предметов уже использовано в этом ходу.
+
+        Returns:
+            int: SHOOT_SELF, SHOOT_OPPONENT или идентификатор предмета из инвентаря.
+        """
+        raise NotImplementedError
+
+    def observe(self, game, player: Player, index: int, shell: int, public: bool) -> None:
+        """
+        Сообщает стратегии о раскрытом патроне.
+
+        Закрытое раскрытие (Лупа, Телефон, Одноразовый телефон) видит только
+        сторона player: стратегия другой стороны не должна его учитывать.
+
+        Args:
+            game: Движок игры.
+            player (Player): Кто раскрыл патрон.
+            index (int): Позиция патрона от ближайшего.
+            shell (int): LIVE или BLANK.
+            public (bool): Патрон стал известен обеим сторонам.
+        """
+
+    def reload(self, game) -> None:
+        """
+        Сообщает стратегии, что дробовик заряжен заново и прежние раскрытия больше не действуют.
+
+        Args:
+            game: Движок игры.
+        """
+
+class RandomPlayer(Policy):
+    """
+    Игрок безголового режима: не использует предметы и стреляет в случайную цель.
+
+    Attributes:
+        rng (Optional[random.Random]): Генератор решений, None - game.policy_rng.
+    """
+
+    __slots__ = ("rng",)
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng: Optional[random.Random] = rng
+
+    def act(self, game, me: Player, opponent: Player, items_used: int) -> int:
+        return SHOOT_SELF if (self.rng or game.policy_rng).random() < 0.5 else SHOOT_OPPONENT
+
+class RandomDealer(Policy):
+    """
+    Исходная стратегия дилера: один случайный предмет за ход, затем выстрел.
+
+    Если дилер знает следующий патрон (dealer_knows_bullet), холостой он
+    стреляет в себя, боевой - в игрока, иначе бросает монетку.
+
+    Attributes:
+        rng (Optional[random.Random]): Генератор решений, None - game.policy_rng.
+    """
+
+    __slots__ = ("rng",)
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng: Optional[random.Random] = rng
+
+    def act(self, game, me: Player, opponent: Player, items_used: int) -> int:
+        rng = self.rng or game.policy_rng
+        if not items_used and me.items:
+            return me.items.pick(rng)
+        if game.dealer_knows_bullet():
+            return SHOOT_SELF if game.shotgun.peek() == BLANK else SHOOT_OPPONENT
+        return SHOOT_OPPONENT if rng.random() < 0.5 else SHOOT_SELF
+
+class CountingPolicy(Policy):
+    """
+    Стратегия по счету патронов.
+
+    Лечится сигаретами, смотрит Лупой следующий патрон и стреляет в
+    противника, если боевых не меньше, чем холостых.
+    """
+
+    __slots__ = ("known",)
+
+    def __init__(self):
+        self.known: Optional[int] = None
+
+    def act(self, game, me: Player, opponent: Player, items_used: int) -> int:
+        if not items_used:
+            self.known = None
+        if CIGARETTES in me.items:
+            return CIGARETTES
+        if self.known is None and game.shotgun and MAGNIFYING_GLASS in me.items:
+            self.known = game.shotgun.peek()
+            return MAGNIFYING_GLASS
+        if self.known is not None:
+            return SHOOT_OPPONENT if self.known == LIVE else SHOOT_SELF
+        shotgun = game.shotgun
+        return SHOOT_OPPONENT if shotgun.live >= shotgun.blank else SHOOT_SELF
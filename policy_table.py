@@ -0,0 +1,232 @@
+import mmap
+import struct
+import sys
+import time
+from typing import Optional
+
+from policies import SHOOT_OPPONENT, SHOOT_SELF, Policy
+from rules import DEFAULT_RULES
+from solver import (INERT, KNOWN_BLANK, KNOWN_LIVE, SOLVER_ITEMS, UNKNOWN, Solver, State,
+                    engine_state, front_after, heuristic_action)
+from state import Player
+
+# Заголовок файла: сигнатура, версия, максимум патронов, максимум жизней, глубина перезарядок.
+# Таблица строится для исходных правил.
+MAGIC = b"BRDP"
+VERSION = 2
+HEADER = struct.Struct("<4sHBBB3x")
+SHELLS = DEFAULT_RULES.shells
+MAX_LIVES = max(DEFAULT_RULES.stage_lives)
+FRONTS = 3
+FLAGS = 1 << INERT
+# Предметы в ключе: маска дилера при пустом инвентаре игрока или FLAGS + маска игрока при пустом
+# инвентаре дилера. В исходной игре предметы получает только игрок.
+KEYS = 2 * FLAGS
+ENTRIES = (SHELLS + 1) * (SHELLS + 1) * FRONTS * MAX_LIVES * MAX_LIVES * KEYS
+
+# Коды действий в таблице.
+NO_ACTION = 255
+_SHOOT_OPPONENT = 0
+_SHOOT_SELF = 1
+_FIRST_ITEM = 2
+
+DEFAULT_PATH = "dealer_policy.bin"
+
+def table_index(live: int, blank: int, front: int, my_lives: int, their_lives: int, flags: int,
+                their_flags: int = 0) -> int:
+    """
+    Номер записи таблицы.
+
+    Args:
+        live (int): Боевые патроны.
+        blank (int): Холостые патроны.
+        front (int): Что известно о ближайшем патроне.
+        my_lives (int): Жизни дилера, 1..MAX_LIVES.
+        their_lives (int): Жизни игрока, 1..MAX_LIVES.
+        flags (int): Битовая маска слотов решателя, в которых у дилера есть предметы.
+        their_flags (int): То же для игрока.
+
+    Returns:
+        int: Номер записи.
+
+    Raises:
+        ValueError: Предметы есть у обеих сторон или патронов больше SHELLS, таких состояний в таблице нет.
+    """
+    if flags and their_flags:
+        raise ValueError("в таблице нет состояний, где предметы есть у обеих сторон")
+    if live < 0 or blank < 0 or live + blank > SHELLS:
+        raise ValueError(f"в таблице нет состояний с {live} боевыми и {blank} холостыми патронами")
+    index = (live * (SHELLS + 1) + blank) * FRONTS + front
+    index = (index * MAX_LIVES + my_lives - 1) * MAX_LIVES + their_lives - 1
+    return index * KEYS + (FLAGS + their_flags if their_flags else flags)
+
+def _encode(action: int) -> int:
+    if action == SHOOT_OPPONENT:
+        return _SHOOT_OPPONENT
+    if action == SHOOT_SELF:
+        return _SHOOT_SELF
+    return _FIRST_ITEM + SOLVER_ITEMS.index(action)
+
+def _decode(code: int) -> int:
+    if code == _SHOOT_SELF:
+        return SHOOT_SELF
+    if code >= _FIRST_ITEM and code != NO_ACTION:
+        return SOLVER_ITEMS[code - _FIRST_ITEM]
+    return SHOOT_OPPONENT
+
+def build(path: str = DEFAULT_PATH, rounds: int = 1, verbose: bool = False) -> int:
+    """
+    Перебирает все состояния ключа таблицы и записывает лучшие действия дилера.
+
+    Ключ: счетчики патронов, что известно о ближайшем патроне, жизни сторон
+    (до MAX_LIVES) и наличие предметов каждого слота решателя у той стороны,
+    у которой они есть: отдельно состояния с предметами только у дилера и
+    только у игрока. Каждый слот считается одним предметом.
+
+    Args:
+        path (str): Путь к файлу таблицы.
+        rounds (int): Глубина просчета перезарядок решателем.
+        verbose (bool): Печатать ли ход построения.
+
+    Returns:
+        int: Количество заполненных записей.
+    """
+    solver = Solver(rounds, max_entries=1 << 22, max_nodes=None)
+    table = bytearray([NO_ACTION]) * ENTRIES
+    filled = 0
+    start = time.perf_counter()
+    for key in range(KEYS):
+        flags, their_flags = (key, 0) if key < FLAGS else (0, key - FLAGS)
+        if key == FLAGS:
+            continue
+        items = tuple((flags >> slot) & 1 for slot in range(INERT)) + (0,)
+        their_items = tuple((their_flags >> slot) & 1 for slot in range(INERT)) + (0,)
+        for live in range(SHELLS + 1):
+            for blank in range(SHELLS + 1 - live):
+                if not live + blank:
+                    continue
+                for front in (UNKNOWN, KNOWN_LIVE, KNOWN_BLANK):
+                    if front == KNOWN_LIVE and not live or front == KNOWN_BLANK and not blank:
+                        continue
+                    for my_lives in range(1, MAX_LIVES + 1):
+                        for their_lives in range(1, MAX_LIVES + 1):
+                            state: State = (live, blank, front, my_lives, their_lives, items, their_items, False,
+                                            rounds)
+                            action, _ = solver.best_action(state)
+                            index = table_index(live, blank, front, my_lives, their_lives, flags, their_flags)
+                            table[index] = _encode(action)
+                            filled += 1
+        if verbose:
+            print(f"{key + 1}/{KEYS} наборов предметов, {filled} записей, {time.perf_counter() - start:.1f} с")
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, SHELLS, MAX_LIVES, rounds))
+        file.write(table)
+    return filled
+
+class PolicyTable:
+    """
+    Таблица действий дилера, отображенная в память.
+
+    Файл открывается только на чтение, поэтому страницы таблицы делятся
+    между всеми процессами, открывшими тот же файл.
+
+    Attributes:
+        path (str): Путь к файлу таблицы.
+        rounds (int): Глубина просчета, с которой построена таблица.
+    """
+
+    __slots__ = ("path", "rounds", "file", "data")
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path: str = path
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.file.close()
+            raise
+        magic, version, shells, max_lives, rounds = HEADER.unpack_from(self.data)
+        if (magic, version, shells, max_lives) != (MAGIC, VERSION, SHELLS, MAX_LIVES) \
+                or len(self.data) != HEADER.size + ENTRIES:
+            self.close()
+            raise ValueError(f"{path}: несовместимая таблица стратегии дилера")
+        self.rounds: int = rounds
+
+    def lookup(self, live: int, blank: int, front: int, my_lives: int, their_lives: int, flags: int,
+               their_flags: int = 0) -> int:
+        """
+        Лучшее действие для состояния.
+
+        Жизни приводятся к диапазону 1..MAX_LIVES. Предметы не могут быть у обеих сторон, см. table_index.
+
+        Returns:
+            int: SHOOT_SELF, SHOOT_OPPONENT или идентификатор предмета.
+        """
+        my_lives = min(max(my_lives, 1), MAX_LIVES)
+        their_lives = min(max(their_lives, 1), MAX_LIVES)
+        index = table_index(live, blank, front, my_lives, their_lives, flags, their_flags)
+        return _decode(self.data[HEADER.size + index])
+
+    def __reduce__(self):
+        # В другом процессе таблица открывается заново и делит с этим те же страницы.
+        return PolicyTable, (self.path,)
+
+    def __deepcopy__(self, memo: dict) -> "PolicyTable":
+        # Таблица только читается, поэтому копии стратегии делят одно отображение.
+        return self
+
+    def close(self) -> None:
+        """Закрывает отображение и файл."""
+        self.data.close()
+        self.file.close()
+
+def inventory_flags(me: Player) -> int:
+    """Маска слотов решателя, в которых у стороны есть предметы."""
+    flags = 0
+    counts = me.items.counts
+    for slot, item in enumerate(SOLVER_ITEMS):
+        if counts[item]:
+            flags |= 1 << slot
+    return flags
+
+class TablePolicy(Policy):
+    """
+    Стратегия дилера по предрасчитанной таблице: одно чтение из памяти на решение.
+
+    Ближайший патрон запоминается так же, как в SolverPolicy. Когда предметы
+    есть у обеих сторон, записи в таблице нет и ход выбирает
+    solver.heuristic_action. Таблица построена для исходных правил, в игре
+    с другими правилами act бросает ValueError.
+    """
+
+    __slots__ = ("table", "known")
+
+    def __init__(self, table: Optional[PolicyTable] = None):
+        self.table: PolicyTable = table or PolicyTable()
+        self.known: int = UNKNOWN
+
+    def act(self, game, me: Player, opponent: Player, items_used: int) -> int:
+        if not items_used:
+            self.known = UNKNOWN
+        if game.rules is not DEFAULT_RULES and game.rules != DEFAULT_RULES:
+            raise ValueError(f"таблица стратегии построена для исходных правил, в игре {game.rules!r}")
+        shotgun = game.shotgun
+        if not shotgun:
+            return SHOOT_OPPONENT
+        flags, their_flags = inventory_flags(me), inventory_flags(opponent)
+        if flags and their_flags:
+            action = heuristic_action(engine_state(game, me, self.known))
+        else:
+            action = self.table.lookup(shotgun.live, shotgun.blank, self.known, me.lives, opponent.lives,
+                                       flags, their_flags)
+        self.known = front_after(self.known, action, shotgun)
+        return action
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print("Использование: python policy_table.py build [путь] [глубина]")
+        sys.exit(1)
+    target = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_PATH
+    depth = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    count = build(target, depth, verbose=True)
+    print(f"Записано {count} состояний в {target}")
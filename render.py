@@ -0,0 +1,149 @@
+import shutil
+import sys
+import time
+from typing import List, Optional, TextIO
+
+from engine import GameIO
+
+CLEAR_SCREEN = "\x1b[2J"
+CLEAR_LINE = "\x1b[K"
+CLEAR_BELOW = "\x1b[J"
+
+def move(row: int, column: int = 1) -> str:
+    """Перемещение курсора, строки и столбцы с 1."""
+    return f"\x1b[{row};{column}H"
+
+class FrameBuffer:
+    """
+    Экран игры в памяти.
+
+    Сообщения между очистками экрана собираются в кадр. diff возвращает
+    escape-последовательность, которая переводит терминал из показанного
+    кадра в текущий: перерисовываются только изменившиеся строки.
+
+    Attributes:
+        width (int): Ширина терминала; длинные строки переносятся по ней.
+        height (int): Высота терминала; из длинного кадра показывается конец.
+        max_fps (float): Предел кадров в секунду для необязательной отрисовки.
+        frames (int): Отрисовано кадров.
+    """
+
+    __slots__ = ("width", "height", "max_fps", "frames", "frame", "shown", "last", "fresh")
+
+    def __init__(self, width: int = 80, height: int = 24, max_fps: float = 30.0):
+        self.width: int = max(width, 1)
+        self.height: int = max(height, 3)
+        self.max_fps: float = max_fps
+        self.frames: int = 0
+        self.frame: List[str] = []
+        self.shown: List[Optional[str]] = []
+        self.last: float = 0.0
+        self.fresh: bool = True
+
+    def output(self, message: str) -> None:
+        """Добавляет сообщение в кадр."""
+        width = self.width
+        for line in message.split("\n"):
+            if len(line) <= width:
+                self.frame.append(line)
+            else:
+                self.frame.extend(line[start:start + width] for start in range(0, len(line), width))
+
+    def clear(self) -> None:
+        """Начинает новый кадр; экран не трогается до следующей отрисовки."""
+        self.frame = []
+
+    def due(self) -> bool:
+        """Прошло ли с прошлой отрисовки достаточно времени по пределу кадров."""
+        return not self.max_fps or time.monotonic() - self.last >= 1.0 / self.max_fps
+
+    def diff(self, prompt: str = "") -> str:
+        """
+        Отрисовывает кадр.
+
+        Args:
+            prompt (str): Вопрос, после которого останется курсор.
+
+        Returns:
+            str: Escape-последовательность для терминала.
+        """
+        # Последняя строка экрана остается пустой, чтобы Enter после ответа не прокрутил экран.
+        lines = self.frame[-(self.height - 2):]
+        if prompt:
+            lines.append(prompt[:self.width - 1])
+        parts = []
+        shown = self.shown
+        if self.fresh:
+            parts.append(CLEAR_SCREEN)
+            shown = []
+            self.fresh = False
+        for row, line in enumerate(lines):
+            if row >= len(shown) or shown[row] != line:
+                parts.append(move(row + 1) + line + CLEAR_LINE)
+        if len(shown) > len(lines):
+            parts.append(move(len(lines) + 1) + CLEAR_BELOW)
+        if prompt:
+            parts.append(move(len(lines), len(lines[-1]) + 1))
+        else:
+            parts.append(move(len(lines) + 1))
+        self.shown = list(lines)
+        self.last = time.monotonic()
+        self.frames += 1
+        return "".join(parts)
+
+    def answered(self, prompt: str, answer: str) -> None:
+        """Учитывает ответ, который терминал сам вывел после вопроса."""
+        line = (prompt + answer)[:self.width]
+        self.frame.append(line)
+        if self.shown:
+            self.shown[-1] = line
+
+class TerminalRenderer(FrameBuffer):
+    """
+    Вывод игры в терминал через FrameBuffer.
+
+    Каждый кадр записывается одним вызовом write и одним flush. Перед паузой
+    кадр рисуется не чаще max_fps раз в секунду, перед вопросом - всегда.
+    """
+
+    __slots__ = ("stream", "stdin")
+
+    def __init__(self, stream: TextIO = sys.stdout, stdin: TextIO = sys.stdin, max_fps: float = 30.0):
+        size = shutil.get_terminal_size()
+        super().__init__(size.columns, size.lines, max_fps)
+        self.stream: TextIO = stream
+        self.stdin: TextIO = stdin
+
+    def clear(self) -> None:
+        size = shutil.get_terminal_size((self.width, self.height))
+        if (size.columns, size.lines) != (self.width, self.height):
+            self.width, self.height = max(size.columns, 1), max(size.lines, 3)
+            self.fresh = True
+        super().clear()
+
+    def present(self, prompt: str = "", force: bool = False) -> None:
+        """Рисует кадр, если это обязательно или позволяет предел кадров."""
+        if force or prompt or self.due():
+            self.stream.write(self.diff(prompt))
+            self.stream.flush()
+
+    def sleep(self, seconds: float) -> None:
+        self.present()
+        time.sleep(seconds)
+
+    def input(self, prompt: str) -> str:
+        self.present(prompt, force=True)
+        line = self.stdin.readline()
+        if not line:
+            raise EOFError
+        answer = line.rstrip("\n")
+        self.answered(prompt, answer)
+        return answer
+
+    def close(self) -> None:
+        """Рисует последний кадр."""
+        self.present(force=True)
+
+    def io(self) -> GameIO:
+        """Набор приемников движка, выводящих через этот экран."""
+        return GameIO(output=self.output, input=self.input, sleep=self.sleep, clear=self.clear)
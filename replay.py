@@ -0,0 +1,257 @@
+import struct
+import sys
+import time
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from bus import EventBus
+from engine import DEALER, ITEM, PLAYER, ROUND, SHOT, STAGE, TAKE, Event, GameEngine, GameIO, Recorder
+from items import ITEM_COUNT
+from policies import SHOOT_OPPONENT, SHOOT_SELF, Policy
+from state import Inventory, Player
+
+# Заголовок файла: сигнатура и версия. Дальше записи подряд, первый байт - тип записи.
+MAGIC = b"BRRP"
+VERSION = 1
+HEADER = struct.Struct("<4sH")
+
+# Начало игры в журнале: за ним идут события этой игры до следующей записи GAME.
+GAME = 5
+
+RECORDS = {
+    GAME: struct.Struct("<BQ"),
+    STAGE: struct.Struct(f"<BB{ITEM_COUNT}s{ITEM_COUNT}s"),
+    ROUND: struct.Struct("<BHBB"),
+    TAKE: struct.Struct("<BB"),
+    ITEM: struct.Struct("<BBB"),
+    SHOT: struct.Struct("<BBB"),
+}
+
+class ReplayError(Exception):
+    """Повтор разошелся с журналом или журнал поврежден."""
+
+class ReplayWriter(Recorder):
+    """
+    Журнал повторов, открытый на дозапись.
+
+    Запись в файл буферизована; одна игра занимает несколько сотен байт.
+
+    Attributes:
+        path (str): Путь к файлу журнала.
+        games (int): Начатых в этом журнале игр.
+    """
+
+    __slots__ = ("path", "file", "games")
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.file: BinaryIO = open(path, "ab")
+        self.games: int = 0
+        if not self.file.tell():
+            self.file.write(HEADER.pack(MAGIC, VERSION))
+
+    def begin(self, game: GameEngine) -> None:
+        """
+        Начинает запись игры: перезапускает генератор игры с ее зерном и подключает журнал.
+
+        Если recorder игры - EventBus, журнал подключается к ней приемником.
+
+        Args:
+            game (GameEngine): Игра, которую нужно записывать.
+        """
+        game.reseed(game.seed)
+        if isinstance(game.recorder, EventBus):
+            if self not in game.recorder.sinks:
+                game.recorder.attach(self)
+        else:
+            game.recorder = self
+        self.games += 1
+        self.file.write(RECORDS[GAME].pack(GAME, game.seed))
+
+    def record(self, event: Event) -> None:
+        record = RECORDS.get(event[0])
+        if record is not None:
+            self.file.write(record.pack(*event))
+
+    def close(self) -> None:
+        """Дописывает буфер и закрывает файл."""
+        self.file.close()
+
+    def __enter__(self) -> "ReplayWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def read_games(path: str) -> Iterator[Tuple[int, List[Event]]]:
+    """
+    Читает журнал повторов по играм.
+
+    Args:
+        path (str): Путь к файлу журнала.
+
+    Yields:
+        Tuple[int, List[Event]]: Зерно игры и ее события.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) < HEADER.size or HEADER.unpack_from(data) != (MAGIC, VERSION):
+        raise ReplayError(f"{path}: не журнал повторов версии {VERSION}")
+    offset = HEADER.size
+    seed = None
+    events: List[Event] = []
+    while offset < len(data):
+        record = RECORDS.get(data[offset])
+        if record is None or offset + record.size > len(data):
+            raise ReplayError(f"{path}: поврежденная запись по смещению {offset}")
+        event = record.unpack_from(data, offset)
+        offset += record.size
+        if event[0] == GAME:
+            if seed is not None:
+                yield seed, events
+            seed, events = event[1], []
+        elif seed is None:
+            raise ReplayError(f"{path}: событие до начала игры по смещению {offset - record.size}")
+        else:
+            events.append(event)
+    if seed is not None:
+        yield seed, events
+
+class _LogEnd(Exception):
+    """Журнал кончился посреди игры."""
+
+class Replay(Recorder):
+    """
+    Проигрыватель событий одной игры.
+
+    Решения сторон и выбор предметов из коробочки берутся из журнала, а
+    каждое событие, которое порождает движок, сверяется с записанным.
+
+    Attributes:
+        events (List[Event]): События игры.
+        position (int): Номер следующего события.
+    """
+
+    __slots__ = ("events", "position")
+
+    def __init__(self, events: List[Event]):
+        self.events: List[Event] = events
+        self.position: int = 0
+
+    def peek(self) -> Event:
+        """Следующее событие журнала."""
+        if self.position >= len(self.events):
+            raise _LogEnd
+        return self.events[self.position]
+
+    def record(self, event: Event) -> None:
+        if event[0] not in RECORDS:
+            return
+        expected = self.peek()
+        if event != expected:
+            raise ReplayError(f"событие {self.position}: в журнале {expected}, в повторе {event}")
+        self.position += 1
+
+    def answer(self, prompt: str) -> str:
+        """Источник ответов для GameIO: забирает из коробочки те предметы, что взяты в журнале."""
+        if prompt.startswith("Достать предмет"):
+            return "q" if self.position < len(self.events) and self.events[self.position][0] == TAKE else "a"
+        return "нет"
+
+class ReplayPolicy(Policy):
+    """Стратегия стороны, повторяющая ее действия из журнала."""
+
+    __slots__ = ("replay", "side")
+
+    def __init__(self, replay: Replay, side: int):
+        self.replay: Replay = replay
+        self.side: int = side
+
+    def act(self, game, me: Player, opponent: Player, items_used: int) -> int:
+        event = self.replay.peek()
+        if event[0] == ITEM and event[1] == self.side:
+            return event[2]
+        if event[0] == SHOT:
+            return SHOOT_SELF if event[1] == self.side else SHOOT_OPPONENT
+        raise ReplayError(f"событие {self.replay.position}: в журнале {event}, а ходит сторона {self.side}")
+
+def replay_game(seed: int, events: List[Event]) -> GameEngine:
+    """
+    Повторяет записанную игру без вывода и пауз.
+
+    Если журнал кончается посреди этапа, возвращается игра в состоянии на
+    момент последнего события.
+
+    Args:
+        seed (int): Зерно игры.
+        events (List[Event]): События игры.
+
+    Returns:
+        GameEngine: Движок в конечном состоянии игры.
+
+    Raises:
+        ReplayError: Повтор разошелся с журналом.
+    """
+    replay = Replay(events)
+    game = GameEngine(GameIO.headless(replay.answer), ReplayPolicy(replay, PLAYER),
+                      ReplayPolicy(replay, DEALER), seed)
+    game.recorder = replay
+    try:
+        while replay.position < len(events):
+            event = replay.peek()
+            if event[0] != STAGE:
+                raise ReplayError(f"событие {replay.position}: в журнале {event}, ожидалось начало этапа")
+            game.stage = event[1]
+            game.player.items = Inventory.from_counts(event[2])
+            game.dealer.items = Inventory.from_counts(event[3])
+            game.play_stage()
+    except _LogEnd:
+        pass
+    return game
+
+def record_games(path: str, games: int, stage: int = 1, player_policy: Optional[Policy] = None,
+                 dealer_policy: Optional[Policy] = None) -> None:
+    """
+    Играет этап без вывода заданное число раз и дописывает игры в журнал.
+
+    Args:
+        path (str): Путь к файлу журнала.
+        games (int): Количество игр.
+        stage (int): Номер этапа.
+        player_policy (Optional[Policy]): Стратегия игрока, по умолчанию ответы AutoInput.
+        dealer_policy (Optional[Policy]): Стратегия дилера.
+    """
+    with ReplayWriter(path) as writer:
+        for _ in range(games):
+            game = GameEngine.headless(player_policy=player_policy, dealer_policy=dealer_policy)
+            writer.begin(game)
+            game.stage = stage
+            game.play_stage()
+
+def check_archive(path: str) -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    Повторяет все игры журнала.
+
+    Returns:
+        Tuple[int, List[Tuple[int, str]]]: Количество игр и расхождения (зерно, описание).
+    """
+    count = 0
+    failures = []
+    for seed, events in read_games(path):
+        count += 1
+        try:
+            replay_game(seed, events)
+        except ReplayError as error:
+            failures.append((seed, str(error)))
+    return count, failures
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Использование: python replay.py журнал")
+        sys.exit(1)
+    start = time.perf_counter()
+    total, diverged = check_archive(sys.argv[1])
+    elapsed = time.perf_counter() - start
+    for seed, message in diverged:
+        print(f"Игра {seed}: {message}")
+    print(f"Повторено {total} игр за {elapsed:.2f} с, расхождений: {len(diverged)}")
+    sys.exit(1 if diverged else 0)
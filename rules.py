@@ -0,0 +1,82 @@
+import hashlib
+import json
+from typing import Sequence, Tuple
+
+from effects import BOX_ITEMS
+from items import ITEM_COUNT
+
+# Пакетная симуляция хранит магазин в одном байте.
+MAX_SHELLS = 8
+
+class Rules:
+    """
+    Балансные константы игры.
+
+    Объект неизменяем: для другого набора правил используется replace.
+
+    Attributes:
+        shells (int): Патронов в заряде.
+        live_chance (float): Вероятность, что патрон боевой.
+        stage_lives (Tuple[int, ...]): Жизни сторон в начале этапов 1, 2, 3.
+        box_sizes (Tuple[int, ...]): Предметов в коробочке на этапах 1, 2, 3.
+        box_pool (Tuple[int, ...]): Предметы, которые могут выпасть в коробочке.
+        max_items (int): Вместимость инвентаря.
+    """
+
+    __slots__ = ("shells", "live_chance", "stage_lives", "box_sizes", "box_pool", "max_items")
+
+    def __init__(self, shells: int = 6, live_chance: float = 0.5, stage_lives: Sequence[int] = (2, 4, 6),
+                 box_sizes: Sequence[int] = (0, 2, 4), box_pool: Sequence[int] = BOX_ITEMS, max_items: int = 8):
+        if not 1 <= shells <= MAX_SHELLS:
+            raise ValueError(f"патронов должно быть от 1 до {MAX_SHELLS}")
+        if not 0.0 <= live_chance <= 1.0:
+            raise ValueError("вероятность боевого патрона должна быть от 0 до 1")
+        if len(stage_lives) != len(box_sizes) or min(stage_lives) < 1:
+            raise ValueError("жизни и коробочки задаются для каждого этапа, жизней не меньше одной")
+        if not all(0 <= item < ITEM_COUNT for item in box_pool) or max(box_sizes) > len(box_pool):
+            raise ValueError("коробочка больше набора предметов или в наборе неизвестный предмет")
+        for name, value in (("shells", shells), ("live_chance", float(live_chance)),
+                            ("stage_lives", tuple(stage_lives)), ("box_sizes", tuple(box_sizes)),
+                            ("box_pool", tuple(box_pool)), ("max_items", max_items)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("правила неизменяемы, используйте replace")
+
+    def lives(self, stage: int) -> int:
+        """Жизни сторон в начале этапа, 0 - этап не меняет жизни."""
+        return self.stage_lives[stage - 1] if 1 <= stage <= len(self.stage_lives) else 0
+
+    def box_size(self, stage: int) -> int:
+        """Предметов в коробочке этапа, 0 - коробочки нет."""
+        return self.box_sizes[stage - 1] if 1 <= stage <= len(self.box_sizes) else 0
+
+    def replace(self, **changes) -> "Rules":
+        """Копия правил с измененными полями."""
+        return Rules(**{**self.to_dict(), **changes})
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def key(self) -> str:
+        """Хеш правил, одинаковый в любом процессе и на любой машине."""
+        return hashlib.sha256(json.dumps(self.to_dict(), sort_keys=True).encode()).hexdigest()
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Rules) and self.to_dict() == other.to_dict()
+
+    def __hash__(self) -> int:
+        return hash(tuple(self.to_dict().values()))
+
+    def __reduce__(self) -> tuple:
+        return Rules, tuple(self.to_dict().values())
+
+    def __repr__(self) -> str:
+        return f"Rules({', '.join(describe(self))})"
+
+DEFAULT_RULES = Rules()
+
+def describe(rules: Rules) -> Tuple[str, ...]:
+    """Отличия правил от исходных в виде строк name=value."""
+    return tuple(f"{name}={value}" for name, value in rules.to_dict().items()
+                 if value != getattr(DEFAULT_RULES, name))
@@ -0,0 +1,333 @@
+import atexit
+import sqlite3
+import threading
+import time
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from state import Inventory
+
+DEFAULT_PATH = "game_progress.db"
+DEFAULT_SLOT = "default"
+
+# SQLite хранит знаковые 64-битные целые. Выигрыш удваивается без предела, поэтому больший
+# выигрыш пишется в столбец как BLOB с десятичной записью числа и читается обратно без потерь.
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+_WINNINGS = 8
+
+# Сохранение: (слот, жизни игрока, жизни дилера, предметы игрока, предметы дилера,
+# этап, раунд, бесконечный режим, выигрыш, пройдено этапов). Предметы - bytes(Inventory.counts).
+SaveRow = Tuple[str, int, int, bytes, bytes, int, int, int, int, int]
+
+_COLUMNS = ("slot, player_lives, dealer_lives, player_items, dealer_items, stage, round, "
+            "infinite_mode, winnings, stages_completed")
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS save_slots
+(slot TEXT PRIMARY KEY,
+ player_lives INTEGER,
+ dealer_lives INTEGER,
+ player_items BLOB,
+ dealer_items BLOB,
+ stage INTEGER,
+ round INTEGER,
+ infinite_mode INTEGER,
+ winnings INTEGER,
+ stages_completed INTEGER,
+ saved_at REAL)
+'''
+
+# Тексты запросов постоянны, поэтому sqlite3 компилирует их один раз на соединение
+# и дальше берет из кэша подготовленных выражений.
+_UPSERT = f"INSERT OR REPLACE INTO save_slots ({_COLUMNS}, saved_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_SELECT = f"SELECT {_COLUMNS} FROM save_slots WHERE slot = ?"
+_SLOTS = "SELECT slot FROM save_slots ORDER BY saved_at DESC"
+_DELETE = "DELETE FROM save_slots WHERE slot = ?"
+
+def _migrate_legacy(connection: sqlite3.Connection) -> None:
+    """Переносит единственное сохранение старой таблицы game_progress в слот по умолчанию."""
+    legacy = connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'game_progress'").fetchone()
+    if not legacy or connection.execute(_SELECT, (DEFAULT_SLOT,)).fetchone():
+        return
+    row = connection.execute('SELECT * FROM game_progress WHERE id = 1').fetchone()
+    if not row:
+        return
+    player_lives, dealer_lives, player_items, dealer_items, stage, round_, infinite_mode, winnings, stages_completed = row[1:]
+    player = Inventory.from_names(player_items.split(',') if player_items else [])
+    dealer = Inventory.from_names(dealer_items.split(',') if dealer_items else [])
+    connection.execute(_UPSERT, (DEFAULT_SLOT, player_lives, dealer_lives, bytes(player.counts), bytes(dealer.counts),
+                                 stage, round_, infinite_mode, winnings, stages_completed, time.time()))
+
+def _encode(row: SaveRow) -> SaveRow:
+    """Строка для записи: выигрыш вне 64 бит становится BLOB."""
+    winnings = row[_WINNINGS]
+    if INT64_MIN <= winnings <= INT64_MAX:
+        return row
+    return row[:_WINNINGS] + (str(winnings).encode(),) + row[_WINNINGS + 1:]
+
+def _decode(row: SaveRow) -> SaveRow:
+    """Строка из базы: выигрыш из BLOB снова становится числом."""
+    winnings = row[_WINNINGS]
+    if not isinstance(winnings, bytes):
+        return row
+    return row[:_WINNINGS] + (int(winnings),) + row[_WINNINGS + 1:]
+
+_shared: Dict[Tuple[type, str], "WriteBehindStore"] = {}
+_shared_lock = threading.Lock()
+
+class WriteBehindStore:
+    """
+    База SQLite с отложенной записью в фоновом потоке.
+
+    Строки ставятся в очередь под ключами, и более поздняя строка с тем же
+    ключом заменяет еще не записанную. Фоновый поток ждет delay секунд,
+    чтобы очередь накопилась, и записывает ее одной транзакцией через _write.
+    Соединения открываются при первом обращении: у потока записи свое, у
+    каждого читающего потока свое; схему при первом открытии создает
+    _create. База работает в режиме WAL, поэтому чтение не ждет записи, а
+    несколько процессов могут делить один файл.
+
+    Если база занята или недоступна, пачка возвращается в очередь и
+    пишется позже. Любая другая ошибка означает негодные данные: тогда
+    строки пачки пишутся по одной, а негодные отбрасываются. Ошибку в обоих
+    случаях получает flush или close, а поток записи продолжает работать.
+
+    Наследник задает схему (_create), запись строк (_write), а также
+    DEFAULT_PATH, THREAD_NAME и CLOSED_MESSAGE.
+
+    Attributes:
+        path (str): Путь к файлу базы данных.
+        delay (float): Окно накопления очереди в секундах.
+        queued (int): Строк поставлено в очередь.
+        written (int): Строк записано.
+    """
+
+    __slots__ = ("path", "delay", "queued", "written", "_cond", "_pending", "_writing", "_thread", "_closing",
+                 "_error", "_local", "_ready", "_init_lock")
+
+    DEFAULT_PATH = ""
+    THREAD_NAME = "store-writer"
+    CLOSED_MESSAGE = "хранилище закрыто"
+
+    def __init__(self, path: Optional[str] = None, delay: float = 0.05):
+        self.path: str = path or self.DEFAULT_PATH
+        self.delay: float = delay
+        self.queued: int = 0
+        self.written: int = 0
+        self._cond = threading.Condition()
+        self._pending: Dict[Hashable, Tuple] = {}
+        self._writing: Dict[Hashable, Tuple] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._closing: bool = False
+        self._error: Optional[BaseException] = None
+        self._local = threading.local()
+        self._ready: bool = False
+        # Схема создается под своей блокировкой: очередь (_cond) не ждет миграции.
+        self._init_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, path: Optional[str] = None) -> "WriteBehindStore":
+        """Общее хранилище для всех сессий процесса, работающих с одним файлом."""
+        path = path or cls.DEFAULT_PATH
+        with _shared_lock:
+            store = _shared.get((cls, path))
+            if store is None or store._closing:
+                store = _shared[cls, path] = cls(path)
+            return store
+
+    def _create(self, connection: sqlite3.Connection) -> None:
+        """Создает схему; вызывается один раз внутри транзакции."""
+        raise NotImplementedError
+
+    def _write(self, connection: sqlite3.Connection, rows: List[Tuple]) -> None:
+        """Записывает строки; вызывается внутри транзакции."""
+        raise NotImplementedError
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30.0)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    with connection:
+                        self._create(connection)
+                    self._ready = True
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._open()
+        return connection
+
+    def _queue(self, key: Hashable, row: Tuple) -> None:
+        """Ставит строку в очередь записи и при первом вызове запускает поток записи."""
+        with self._cond:
+            if self._closing:
+                raise RuntimeError(self.CLOSED_MESSAGE)
+            self._pending[key] = row
+            self.queued += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.THREAD_NAME, daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+            self._cond.notify_all()
+
+    def _unwritten(self, key: Hashable) -> Optional[Tuple]:
+        """Строка под ключом, которая еще не записана в базу, или None."""
+        with self._cond:
+            row = self._pending.get(key)
+            return row if row is not None else self._writing.get(key)
+
+    def flush(self) -> None:
+        """Ждет записи всей очереди."""
+        with self._cond:
+            while (self._pending or self._writing) and self._error is None:
+                self._cond.notify_all()
+                self._cond.wait()
+            if self._error is not None:
+                error, self._error = self._error, None
+                raise error
+
+    def close(self) -> None:
+        """Записывает очередь, останавливает поток записи и закрывает соединение этого потока."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self) -> None:
+        connection = None
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    break
+                closing = self._closing
+            if not closing and self.delay:
+                time.sleep(self.delay)
+            with self._cond:
+                self._writing, self._pending = self._pending, {}
+                batch = list(self._writing.values())
+            try:
+                if connection is None:
+                    connection = self._open()
+                with connection:
+                    self._write(connection, batch)
+                written = len(batch)
+            except (sqlite3.OperationalError, OSError) as error:
+                with self._cond:
+                    # База занята или недоступна: пачка возвращается в начало очереди,
+                    # кроме строк, которые за это время заменили новыми.
+                    self._pending = {**self._writing, **self._pending}
+                    self._writing = {}
+                    self._error = error
+                    self._cond.notify_all()
+                    if self._closing:
+                        break
+                    self._cond.wait(1.0)
+                continue
+            except Exception as error:
+                # Пачку с негодными данными повторять бесполезно: остальные строки пишутся по одной,
+                # негодные отбрасываются, а ошибка достается flush или close.
+                written = 0
+                for row in batch:
+                    try:
+                        with connection:
+                            self._write(connection, [row])
+                        written += 1
+                    except Exception as row_error:
+                        error = row_error
+                with self._cond:
+                    self._error = error
+            with self._cond:
+                self._writing = {}
+                self.written += written
+                self._cond.notify_all()
+        if connection is not None:
+            connection.close()
+
+class SaveStore(WriteBehindStore):
+    """
+    Хранилище сохранений по слотам с отложенной записью в фоновом потоке.
+
+    save только кладет строку в очередь и сразу возвращается. Частые
+    сохранения одного слота за окно delay сливаются в одно, а накопленное
+    записывается одной транзакцией (см. WriteBehindStore).
+
+    Attributes:
+        path (str): Путь к файлу базы данных.
+        delay (float): Окно слияния сохранений в секундах.
+        writes (int): Записано строк.
+        saves (int): Вызовов save.
+    """
+
+    __slots__ = ()
+
+    DEFAULT_PATH = DEFAULT_PATH
+    THREAD_NAME = "save-writer"
+    CLOSED_MESSAGE = "хранилище сохранений закрыто"
+
+    @property
+    def writes(self) -> int:
+        return self.written
+
+    @property
+    def saves(self) -> int:
+        return self.queued
+
+    def _create(self, connection: sqlite3.Connection) -> None:
+        connection.execute(_SCHEMA)
+        _migrate_legacy(connection)
+
+    def _write(self, connection: sqlite3.Connection, rows: List[Tuple]) -> None:
+        now = time.time()
+        connection.executemany(_UPSERT, [_encode(row) + (now,) for row in rows])
+
+    def save(self, row: SaveRow) -> None:
+        """
+        Ставит сохранение в очередь записи.
+
+        Более позднее сохранение того же слота заменяет еще не записанное.
+
+        Args:
+            row (SaveRow): Сохранение.
+        """
+        self._queue(row[0], row)
+
+    def load(self, slot: str = DEFAULT_SLOT) -> Optional[SaveRow]:
+        """
+        Читает сохранение слота с учетом еще не записанных.
+
+        Returns:
+            Optional[SaveRow]: Сохранение или None, если слот пуст.
+        """
+        row = self._unwritten(slot)
+        if row is not None:
+            return row
+        row = self._reader().execute(_SELECT, (slot,)).fetchone()
+        return _decode(row) if row is not None else None
+
+    def slots(self) -> List[str]:
+        """Занятые слоты, начиная с последнего сохраненного."""
+        self.flush()
+        return [slot for slot, in self._reader().execute(_SLOTS)]
+
+    def delete(self, slot: str) -> None:
+        """Удаляет сохранение слота."""
+        self.flush()
+        connection = self._reader()
+        with connection:
+            connection.execute(_DELETE, (slot,))
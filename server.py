@@ -0,0 +1,419 @@
+import asyncio
+import functools
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from bus import EventBus, format_event
+from engine import AutoInput, Event, GameIO
+from main import RussianRoulette
+from render import FrameBuffer
+from saves import SaveStore
+
+# Строчный протокол. Сервер шлет строки "MSG текст", "ASK вопрос", "CLEAR" и "BYE",
+# клиент отвечает одной строкой на каждый ASK. В режиме ansi вместо MSG, ASK и CLEAR
+# сервер шлет изменения экрана FrameBuffer для терминала клиента.
+MSG = b"MSG "
+ASK = b"ASK "
+CLEAR = b"CLEAR\n"
+BYE = b"BYE\n"
+
+PROFILE_PROMPT = "Профиль (пусто - без имени): "
+
+# Ответ на вопрос о профиле, после которого клиент смотрит стол с этим номером, а не играет.
+WATCH = "смотреть "
+
+# Событий, которые зритель получает одним пакетом.
+WATCH_BATCH = 256
+
+# Движок синхронный, поэтому каждый стол занимает поток пула на всю игру, в том числе
+# пока ждет ответа клиента. Глубоких вызовов в игре нет, так что стек можно взять маленьким.
+TABLE_STACK_SIZE = 256 * 1024
+
+# Секунд на ответ клиента или на прием отправленного; молчащий клиент не держит поток стола дольше.
+READ_TIMEOUT = 300.0
+
+class TableExecutor(ThreadPoolExecutor):
+    """
+    Пул потоков столов с маленьким стеком.
+
+    threading.stack_size действует на все потоки, создаваемые после вызова,
+    поэтому размер стека ставится только на время запуска потока пула и сразу
+    возвращается прежним: потоки записи сохранений, истории и остальные
+    получают обычный стек.
+    """
+
+    def _adjust_thread_count(self) -> None:
+        previous = threading.stack_size(TABLE_STACK_SIZE)
+        try:
+            super()._adjust_thread_count()
+        finally:
+            threading.stack_size(previous)
+
+class SessionClosed(Exception):
+    """Клиент отключился или не ответил вовремя посреди игры."""
+
+class Session:
+    """
+    Один стол: игра RussianRoulette и соединение ее игрока.
+
+    Игра выполняется в отдельном потоке пула и занимает его до конца игры,
+    а ввод, вывод и паузы идут через цикл событий: поток стола ждет ответа
+    клиента или конца паузы, не занимая цикл. Ответа и приема отправленного
+    поток ждет не дольше timeout секунд, после чего стол закрывается.
+    Сообщения копятся и отправляются одним пакетом перед вопросом, паузой
+    или концом игры.
+
+    Attributes:
+        id (int): Номер стола.
+        pace (float): Множитель пауз игры, 0 - без пауз.
+        timeout (Optional[float]): Секунд на ответ клиента, None - без предела.
+        screen (Optional[FrameBuffer]): Экран клиента в режиме ansi.
+        bus (Optional[EventBus]): Шина событий игры за столом, пока игра идет.
+        watching (Optional[str]): Номер стола, который клиент выбрал смотреть вместо игры.
+        spectators (List[asyncio.Event]): Сигналы зрителей стола о новых событиях.
+        closed (bool): Игра за столом закончилась.
+    """
+
+    __slots__ = ("id", "pace", "timeout", "screen", "loop", "reader", "writer", "pending", "bus", "watching", "spectators",
+                 "waking", "closed")
+
+    def __init__(self, table_id: int, loop: asyncio.AbstractEventLoop, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter, pace: float, screen: Optional[FrameBuffer] = None,
+                 timeout: Optional[float] = READ_TIMEOUT):
+        self.id: int = table_id
+        self.pace: float = pace
+        self.timeout: Optional[float] = timeout
+        self.screen: Optional[FrameBuffer] = screen
+        self.loop = loop
+        self.reader = reader
+        self.writer = writer
+        self.pending: List[bytes] = []
+        self.bus: Optional[EventBus] = None
+        self.watching: Optional[str] = None
+        self.spectators: List[asyncio.Event] = []
+        self.waking: bool = False
+        self.closed: bool = False
+
+    def output(self, message: str) -> None:
+        if self.screen is not None:
+            self.screen.output(message)
+            return
+        for line in message.split("\n"):
+            self.pending.append(MSG + line.encode() + b"\n")
+
+    def clear(self) -> None:
+        if self.screen is not None:
+            self.screen.clear()
+        else:
+            self.pending.append(CLEAR)
+
+    def _take(self, prompt: str = "", force: bool = False) -> bytes:
+        if self.screen is not None:
+            if prompt or force or self.screen.due():
+                return self.screen.diff(prompt).encode()
+            return b""
+        data = b"".join(self.pending)
+        self.pending.clear()
+        if prompt:
+            data += ASK + prompt.encode() + b"\n"
+        return data
+
+    async def _send(self, data: bytes) -> None:
+        if data:
+            self.writer.write(data)
+            await asyncio.wait_for(self.writer.drain(), self.timeout)
+
+    async def _ask(self, data: bytes) -> bytes:
+        await self._send(data)
+        try:
+            return await asyncio.wait_for(self.reader.readline(), self.timeout)
+        except asyncio.TimeoutError:
+            self.writer.write(MSG + "Время ожидания ответа истекло".encode() + b"\n" + BYE)
+            raise
+
+    async def _pause(self, data: bytes, seconds: float) -> None:
+        await self._send(data)
+        await asyncio.sleep(seconds)
+
+    def _wait(self, coroutine) -> object:
+        try:
+            return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+        except (ConnectionError, RuntimeError, asyncio.TimeoutError) as error:
+            raise SessionClosed from error
+
+    def input(self, prompt: str) -> str:
+        line = self._wait(self._ask(self._take(prompt)))
+        if not line:
+            raise SessionClosed
+        answer = line.decode(errors="replace").strip()
+        if self.screen is not None:
+            self.screen.answered(prompt, answer)
+        return answer
+
+    def sleep(self, seconds: float) -> None:
+        seconds *= self.pace
+        if seconds > 0:
+            self._wait(self._pause(self._take(), seconds))
+
+    def wake(self) -> None:
+        """
+        Будит зрителей после события; вызывается шиной в потоке стола.
+
+        Поток стола только ставит один вызов в цикл событий, сколько бы ни было
+        зрителей, и не ставит новый, пока прежний не выполнен.
+        """
+        if self.spectators and not self.waking:
+            self.waking = True
+            self.loop.call_soon_threadsafe(self.notify)
+
+    def notify(self) -> None:
+        """Будит зрителей в цикле событий."""
+        self.waking = False
+        for ready in self.spectators:
+            ready.set()
+
+    def run(self, saves: SaveStore) -> bool:
+        """
+        Играет одну игру за столом.
+
+        Returns:
+            bool: True, если игра дошла до конца или клиент выбрал смотреть стол, False, если клиент отключился.
+        """
+        io = GameIO(output=self.output, input=self.input, sleep=self.sleep, clear=self.clear)
+        try:
+            slot = self.input(PROFILE_PROMPT) or f"table-{self.id}"
+            if slot.startswith(WATCH):
+                self.watching = slot[len(WATCH):].strip()
+                return True
+            game = RussianRoulette(io, saves=saves, slot=slot)
+            game.bus.wakers.append(self.wake)
+            self.bus = game.bus
+            game.play()
+            self._wait(self._send(self._take(force=True) + BYE))
+        except SessionClosed:
+            return False
+        return True
+
+@functools.lru_cache(maxsize=4096)
+def _spectator_line(event: Event) -> bytes:
+    """Строка протокола для события; одна на всех зрителей всех столов."""
+    return MSG + format_event(event).encode() + b"\n"
+
+class GameServer:
+    """
+    TCP-сервер, на котором в одном процессе идет много независимых столов.
+
+    У каждого соединения свой стол со своей игрой и своим генератором
+    случайных чисел; общими остаются только хранилище сохранений и пул
+    потоков столов. Идущий стол занимает поток пула на всю игру, поэтому
+    одновременно играется не больше max_tables столов, а клиент, который
+    молчит дольше timeout секунд, теряет стол и освобождает поток.
+
+    Клиент, ответивший на вопрос о профиле "смотреть N", становится зрителем
+    стола N: он получает события игры из шины стола в цикле событий, не
+    занимая поток. Зритель, который не успевает читать, пропускает старые
+    события, а игра его не ждет.
+
+    Attributes:
+        host (str): Адрес.
+        port (int): Порт, 0 - выбрать свободный при запуске.
+        pace (float): Множитель пауз игры.
+        max_tables (int): Столов, то есть потоков, одновременно; остальные соединения ждут свободный стол.
+        timeout (Optional[float]): Секунд на ответ клиента, None - без предела.
+        ansi (bool): Слать клиентам изменения экрана вместо строк протокола.
+        saves (SaveStore): Хранилище сохранений столов.
+        tables (int): Открытых столов.
+        finished (int): Доигранных игр.
+        dropped (int): Игр, прерванных отключением или молчанием клиента.
+        sessions (Dict[int, Session]): Идущие столы по номерам.
+        spectators (int): Зрителей сейчас.
+        missed (int): Событий, пропущенных отстающими зрителями.
+    """
+
+    __slots__ = ("host", "port", "pace", "max_tables", "timeout", "ansi", "saves", "tables", "finished", "dropped", "next_id",
+                 "executor", "server", "sessions", "spectators", "missed")
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 7777, pace: float = 1.0, max_tables: int = 4096,
+                 saves: Optional[SaveStore] = None, ansi: bool = False, timeout: Optional[float] = READ_TIMEOUT):
+        self.host: str = host
+        self.port: int = port
+        self.pace: float = pace
+        self.max_tables: int = max_tables
+        self.timeout: Optional[float] = timeout
+        self.ansi: bool = ansi
+        self.saves: SaveStore = saves or SaveStore.shared()
+        self.tables: int = 0
+        self.finished: int = 0
+        self.dropped: int = 0
+        self.next_id: int = 0
+        self.sessions: Dict[int, Session] = {}
+        self.spectators: int = 0
+        self.missed: int = 0
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """Открывает порт; port заменяется фактическим, если был 0."""
+        self.executor = TableExecutor(self.max_tables, thread_name_prefix="table")
+        self.server = await asyncio.start_server(self._handle, self.host, self.port, limit=4096,
+                                                 backlog=self.max_tables)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        """Запускает сервер и обслуживает соединения до отмены."""
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self) -> None:
+        """Закрывает порт, ждет столы и записывает сохранения."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        await asyncio.get_running_loop().run_in_executor(None, self.saves.flush)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.next_id += 1
+        self.tables += 1
+        loop = asyncio.get_running_loop()
+        session = Session(self.next_id, loop, reader, writer, self.pace, FrameBuffer() if self.ansi else None,
+                          self.timeout)
+        self.sessions[session.id] = session
+        try:
+            try:
+                played = await loop.run_in_executor(self.executor, session.run, self.saves)
+            finally:
+                self.tables -= 1
+                del self.sessions[session.id]
+                session.closed = True
+                session.notify()
+            if not played:
+                self.dropped += 1
+            elif session.watching is not None:
+                await self._watch(writer, session.watching)
+            else:
+                self.finished += 1
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _watch(self, writer: asyncio.StreamWriter, table: str) -> None:
+        """
+        Передает зрителю события стола table, пока игра за ним не закончится.
+
+        Args:
+            writer (asyncio.StreamWriter): Соединение зрителя.
+            table (str): Номер стола.
+        """
+        session = self.sessions.get(int(table)) if table.isdigit() else None
+        if session is None or session.bus is None:
+            writer.write(MSG + f"Стол {table} не найден".encode() + b"\n" + BYE)
+            await writer.drain()
+            return
+        subscription = session.bus.subscribe(replay=True)
+        ready = asyncio.Event()
+        session.spectators.append(ready)
+        self.spectators += 1
+        try:
+            while True:
+                missed = subscription.dropped
+                events = subscription.poll(WATCH_BATCH)
+                ready.clear()
+                data = b"".join(map(_spectator_line, events))
+                if subscription.dropped > missed:
+                    self.missed += subscription.dropped - missed
+                    data = MSG + f"Пропущено событий: {subscription.dropped - missed}".encode() + b"\n" + data
+                if data:
+                    writer.write(data)
+                    await writer.drain()
+                if not subscription.pending:
+                    if session.closed:
+                        break
+                    await ready.wait()
+            writer.write(BYE)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            session.spectators.remove(ready)
+            self.spectators -= 1
+
+async def play_client(host: str, port: int, name: str) -> int:
+    """
+    Клиент для нагрузочных тестов: отвечает на вопросы так же, как AutoInput.
+
+    Args:
+        host (str): Адрес сервера.
+        port (int): Порт сервера.
+        name (str): Профиль; от него же зависит генератор ответов.
+
+    Returns:
+        int: Количество полученных строк.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    answer = AutoInput(random.Random(name))
+    lines = 0
+    try:
+        while True:
+            line = await reader.readline()
+            if not line or line == BYE:
+                break
+            lines += 1
+            if line.startswith(ASK):
+                prompt = line[len(ASK):].decode().rstrip("\n")
+                reply = name if prompt == PROFILE_PROMPT else answer(prompt)
+                writer.write(reply.encode() + b"\n")
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return lines
+
+async def load_test(clients: int, server: Optional[GameServer] = None, host: str = "127.0.0.1",
+                    port: int = 0) -> Tuple[int, int, float]:
+    """
+    Играет clients игр одновременно против сервера.
+
+    Если сервер не передан, в том же процессе поднимается локальный сервер
+    без пауз.
+
+    Returns:
+        Tuple[int, int, float]: Доиграно игр, получено строк, секунд.
+    """
+    own = server is None
+    if own:
+        server = GameServer(host, port, pace=0.0, max_tables=clients)
+        await server.start()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(play_client(host, server.port, f"load-{index}") for index in range(clients)),
+                                   return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    if own:
+        await server.close()
+    line_counts = [result for result in results if isinstance(result, int)]
+    return len(line_counts), sum(line_counts), elapsed
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "load":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+        games, received, seconds = asyncio.run(load_test(count))
+        print(f"{games}/{count} игр, {received} строк за {seconds:.2f} с ({games / seconds:.0f} игр/с)")
+    elif len(sys.argv) > 1 and sys.argv[1] == "serve":
+        listen_port = int(sys.argv[2]) if len(sys.argv) > 2 else 7777
+        print(f"Сервер слушает 127.0.0.1:{listen_port}")
+        try:
+            asyncio.run(GameServer(port=listen_port, ansi="ansi" in sys.argv[3:]).serve_forever())
+        except KeyboardInterrupt:
+            pass
+    else:
+        print("Использование: python server.py serve [порт] [ansi] | python server.py load [клиентов]")
+        sys.exit(1)
@@ -0,0 +1,447 @@
+from collections import OrderedDict
+from math import comb
+from typing import Dict, List, Optional, Tuple
+
+from items import (ADRENALINE, BEER, CIGARETTES, EXPIRED_MEDICINE, HAND_SAW, INVERTER, ITEM_COUNT,
+                   MAGNIFYING_GLASS)
+from policies import SHOOT_OPPONENT, Policy
+from rules import DEFAULT_RULES, Rules
+from state import Inventory, Magazine, Player
+
+# Что известно о ближайшем патроне.
+UNKNOWN = 0
+KNOWN_LIVE = 1
+KNOWN_BLANK = 2
+
+# Слоты предметов в ключе состояния. Телефоны, Наручники и Отказ не меняют
+# состояние в модели решателя и сливаются в один слот INERT.
+SOLVER_ITEMS: Tuple[int, ...] = (BEER, CIGARETTES, HAND_SAW, ADRENALINE, INVERTER, EXPIRED_MEDICINE, MAGNIFYING_GLASS)
+INERT = len(SOLVER_ITEMS)
+SLOTS = INERT + 1
+_SLOT_OF: Dict[int, int] = {item: slot for slot, item in enumerate(SOLVER_ITEMS)}
+_BEER, _CIGARETTES, _HAND_SAW, _ADRENALINE, _INVERTER, _MEDICINE, _MAGNIFYING_GLASS = range(INERT)
+
+# (боевые, холостые, ближайший, мои жизни, жизни противника, мои предметы,
+#  предметы противника, хожу ли я первым после перезарядки, осталось перезарядок)
+State = Tuple[int, int, int, int, int, Tuple[int, ...], Tuple[int, ...], bool, int]
+
+class BudgetExceeded(Exception):
+    """Поиск посчитал больше новых состояний, чем разрешает max_nodes."""
+
+def inventory_key(items: Inventory) -> Tuple[int, ...]:
+    """
+    Сворачивает инвентарь в слоты решателя.
+
+    Args:
+        items (Inventory): Инвентарь.
+
+    Returns:
+        Tuple[int, ...]: Количества по слотам решателя.
+    """
+    key = [0] * SLOTS
+    for item in range(ITEM_COUNT):
+        count = items.counts[item]
+        if count:
+            key[_SLOT_OF.get(item, INERT)] += count
+    return tuple(key)
+
+def canonical(state: State) -> State:
+    """
+    Сводит равноценные состояния к одному ключу.
+
+    Сигареты ходящего засчитываются сразу (их выгодно курить немедленно),
+    бесполезные предметы учитываются, только если их может украсть Адреналин
+    противника, а очередность после перезарядки важна, только пока перезарядки
+    просчитываются.
+
+    Args:
+        state (State): Состояние относительно ходящей стороны.
+
+    Returns:
+        State: Каноническое состояние.
+    """
+    live, blank, front, mine, theirs, my_items, their_items, starter, rounds = state
+    if my_items[_CIGARETTES] or (my_items[INERT] and not their_items[_ADRENALINE]):
+        mine += my_items[_CIGARETTES]
+        my_items = my_items[:_CIGARETTES] + (0,) + my_items[_CIGARETTES + 1:INERT] + (
+            my_items[INERT] if their_items[_ADRENALINE] else 0,)
+    if their_items[INERT] and not my_items[_ADRENALINE]:
+        their_items = their_items[:INERT] + (0,)
+    if not rounds:
+        starter = False
+    return live, blank, front, mine, theirs, my_items, their_items, starter, rounds
+
+def _take(items: Tuple[int, ...], slot: int) -> Tuple[int, ...]:
+    return items[:slot] + (items[slot] - 1,) + items[slot + 1:]
+
+class TranspositionTable:
+    """
+    Ограниченная таблица ценностей состояний с вытеснением давно не использованных.
+
+    Attributes:
+        max_entries (int): Максимальное число записей.
+        hits (int): Попадания.
+        misses (int): Промахи.
+    """
+
+    __slots__ = ("max_entries", "entries", "hits", "misses")
+
+    def __init__(self, max_entries: int = 1 << 20):
+        self.max_entries: int = max_entries
+        self.entries: "OrderedDict[State, float]" = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, key: State) -> Optional[float]:
+        """Возвращает ценность состояния или None."""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: State, value: float) -> None:
+        """Запоминает ценность состояния, вытесняя самую старую запись."""
+        self.entries[key] = value
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Забывает все записи и счетчики."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class Solver:
+    """
+    Точный expectimax по правилам GameEngine.
+
+    Магазин описывается только количеством боевых и холостых патронов, поэтому
+    следующий патрон боевой с вероятностью live / (live + blank). Ценность
+    состояния - вероятность победы того, кто ходит. Состояния записываются
+    относительно ходящей стороны, так что зеркальные позиции игрока и дилера
+    дают один ключ.
+
+    В текущих правилах выстрел холостым не дает лишнего хода, Ножовка только
+    завершает ход, а Наручники возвращают ход той же стороне, поэтому флагов
+    пропуска хода и двойного урона в состоянии нет. Перезарядки просчитываются
+    на глубину rounds, дальше ценность оценивается по соотношению жизней;
+    предметы из коробочки при перезарядке не учитываются. Размер заряда и
+    вероятность боевого патрона при перезарядке берутся из rules.
+
+    Число состояний растет с предметами обеих сторон: из (3 боевых, 3 холостых)
+    при 6 жизнях и 8 предметах у одной стороны это 50-85 тысяч состояний и
+    0,6-2 с, а с 8 предметами у обеих - минуты и сотни мегабайт. Поэтому
+    best_action считает не больше max_nodes состояний и начинает с пустой
+    таблицы: иначе одна и та же позиция досчитывалась бы или нет в
+    зависимости от того, что осталось в таблице от прошлых решений, и итоги
+    турнира зависели бы от размера порций. Без предела (max_nodes=None)
+    таблица общая для всех вызовов, как при построении policy_table.
+
+    Attributes:
+        rounds (int): Глубина просчета перезарядок.
+        table (TranspositionTable): Таблица ценностей.
+        max_nodes (Optional[int]): Состояний на один best_action, None - без предела.
+        rules (Rules): Правила, для которых считаются ценности.
+    """
+
+    __slots__ = ("rounds", "table", "max_nodes", "budget", "rules", "reloads")
+
+    def __init__(self, rounds: int = 1, max_entries: int = 1 << 20, max_nodes: Optional[int] = 20000,
+                 rules: Rules = DEFAULT_RULES):
+        self.rounds: int = rounds
+        self.rules: Rules = rules
+        shells, chance = rules.shells, rules.live_chance
+        # Исходы перезарядки: (боевых, вероятность) по биномиальному закону.
+        self.reloads: Tuple[Tuple[int, float], ...] = tuple(
+            (live, comb(shells, live) * chance ** live * (1.0 - chance) ** (shells - live))
+            for live in range(shells + 1))
+        self.table: TranspositionTable = TranspositionTable(max_entries)
+        self.max_nodes: Optional[int] = max_nodes
+        self.budget: float = float("inf")
+
+    def value(self, state: State) -> float:
+        """
+        Вероятность победы ходящей стороны при оптимальной игре обеих сторон.
+
+        Args:
+            state (State): Состояние относительно ходящей стороны.
+
+        Returns:
+            float: Вероятность победы.
+        """
+        state = canonical(state)
+        cached = self.table.get(state)
+        if cached is not None:
+            return cached
+        self.budget -= 1
+        if self.budget < 0:
+            raise BudgetExceeded
+        best = max(value for _, value in self.actions(state))
+        self.table.put(state, best)
+        return best
+
+    def best_action(self, state: State) -> Tuple[int, float]:
+        """
+        Лучшее действие для ходящей стороны.
+
+        Returns:
+            Tuple[int, float]: Действие (SHOOT_SELF, SHOOT_OPPONENT или предмет) и его ценность.
+
+        Raises:
+            BudgetExceeded: Не хватило max_nodes состояний.
+        """
+        if self.max_nodes is None:
+            self.budget = float("inf")
+        else:
+            self.table.clear()
+            self.budget = self.max_nodes
+        try:
+            return max(self.actions(state), key=lambda action: action[1])
+        finally:
+            self.budget = float("inf")
+
+    def actions(self, state: State) -> List[Tuple[int, float]]:
+        """
+        Все осмысленные действия с их ценностями.
+
+        Args:
+            state (State): Состояние относительно ходящей стороны.
+
+        Returns:
+            List[Tuple[int, float]]: Пары (действие, ценность).
+        """
+        live, blank, front, mine, theirs, my_items, their_items, starter, rounds = state
+        # Выстрел в себя не дает лишнего хода и потому не лучше выстрела в противника.
+        result = [(SHOOT_OPPONENT, self._shoot(state, False))]
+        for slot in range(INERT):
+            if not my_items[slot]:
+                continue
+            if slot == _ADRENALINE and not any(their_items):
+                continue
+            if slot == _MAGNIFYING_GLASS and (front != UNKNOWN or not live or not blank):
+                continue
+            after = (live, blank, front, mine, theirs, _take(my_items, slot), their_items, starter, rounds)
+            result.append((SOLVER_ITEMS[slot], self._apply(after, slot)))
+        return result
+
+    def _front(self, live: int, blank: int, front: int) -> List[Tuple[float, int, int, int]]:
+        """Исходы ближайшего патрона: (вероятность, боевой ли, боевые после, холостые после)."""
+        total = live + blank
+        if front == KNOWN_LIVE:
+            return [(1.0, 1, live - 1, blank)]
+        if front == KNOWN_BLANK:
+            return [(1.0, 0, live, blank - 1)]
+        outcomes = []
+        if live:
+            outcomes.append((live / total, 1, live - 1, blank))
+        if blank:
+            outcomes.append((blank / total, 0, live, blank - 1))
+        return outcomes
+
+    def _pass(self, state: State) -> float:
+        """Ценность для ходящего после передачи хода противнику."""
+        live, blank, front, mine, theirs, my_items, their_items, starter, rounds = state
+        return 1.0 - self.value((live, blank, front, theirs, mine, their_items, my_items, not starter, rounds))
+
+    def _reload(self, mine: int, theirs: int, my_items: Tuple[int, ...], their_items: Tuple[int, ...],
+                starter: bool, rounds: int) -> float:
+        """Ценность для ходящего, когда дробовик опустел и начинается новый раунд."""
+        if not rounds:
+            return mine / (mine + theirs)
+        total = 0.0
+        shells = self.rules.shells
+        for live, probability in self.reloads:
+            if not probability:
+                continue
+            if starter:
+                value = self.value((live, shells - live, UNKNOWN, mine, theirs, my_items, their_items, True, rounds - 1))
+            else:
+                value = 1.0 - self.value((live, shells - live, UNKNOWN, theirs, mine, their_items, my_items, True, rounds - 1))
+            total += probability * value
+        return total
+
+    def _shoot(self, state: State, at_self: bool) -> float:
+        live, blank, front, mine, theirs, my_items, their_items, starter, rounds = state
+        if not live + blank:
+            return self._reload(mine, theirs, my_items, their_items, starter, rounds)
+        total = 0.0
+        for probability, fired, live_after, blank_after in self._front(live, blank, front):
+            my_after, their_after = mine, theirs
+            if fired:
+                if at_self:
+                    my_after -= 1
+                else:
+                    their_after -= 1
+            if my_after <= 0:
+                continue
+            if their_after <= 0:
+                total += probability
+                continue
+            if not live_after + blank_after:
+                total += probability * self._reload(my_after, their_after, my_items, their_items, starter, rounds)
+            else:
+                total += probability * self._pass((live_after, blank_after, UNKNOWN, my_after, their_after,
+                                                   my_items, their_items, starter, rounds))
+        return total
+
+    def _apply(self, state: State, slot: int) -> float:
+        """Ценность для ходящего после эффекта предмета из слота slot (предмет уже убран)."""
+        live, blank, front, mine, theirs, my_items, their_items, starter, rounds = state
+        if slot == _CIGARETTES:
+            return self.value((live, blank, front, mine + 1, theirs, my_items, their_items, starter, rounds))
+        if slot == _MEDICINE:
+            healed = self.value((live, blank, front, mine + 2, theirs, my_items, their_items, starter, rounds))
+            if mine <= 1:
+                return 0.5 * healed
+            hurt = self.value((live, blank, front, mine - 1, theirs, my_items, their_items, starter, rounds))
+            return 0.5 * (healed + hurt)
+        if slot == _HAND_SAW:
+            return self._pass(state)
+        if slot == _ADRENALINE:
+            total_items = sum(their_items)
+            if not total_items:
+                return self.value(state)
+            total = 0.0
+            for stolen, count in enumerate(their_items):
+                if count:
+                    after = (live, blank, front, mine, theirs, my_items, _take(their_items, stolen), starter, rounds)
+                    total += count / total_items * self._apply(after, stolen)
+            return total
+        if slot == INERT or not live + blank:
+            return self.value(state)
+        if slot == _BEER:
+            total = 0.0
+            for probability, _, live_after, blank_after in self._front(live, blank, front):
+                if live_after + blank_after:
+                    total += probability * self.value((live_after, blank_after, UNKNOWN, mine, theirs,
+                                                       my_items, their_items, starter, rounds))
+                else:
+                    total += probability * self._reload(mine, theirs, my_items, their_items, starter, rounds)
+            return total
+        tail = (mine, theirs, my_items, their_items, starter, rounds)
+        if slot == _INVERTER:
+            # Счетчики патронов видны всем, поэтому после Инвертора тип ближайшего патрона известен.
+            if front == KNOWN_LIVE:
+                return self.value((live - 1, blank + 1, KNOWN_BLANK) + tail)
+            if front == KNOWN_BLANK:
+                return self.value((live + 1, blank - 1, KNOWN_LIVE) + tail)
+            total = 0.0
+            count = live + blank
+            if live:
+                total += live / count * self.value((live - 1, blank + 1, KNOWN_BLANK) + tail)
+            if blank:
+                total += blank / count * self.value((live + 1, blank - 1, KNOWN_LIVE) + tail)
+            return total
+        # Лупа
+        if front != UNKNOWN:
+            return self.value(state)
+        total = 0.0
+        count = live + blank
+        if live:
+            total += live / count * self.value((live, blank, KNOWN_LIVE) + tail)
+        if blank:
+            total += blank / count * self.value((live, blank, KNOWN_BLANK) + tail)
+        return total
+
+def engine_state(game, me: Player, front: int = UNKNOWN, rounds: int = 1) -> State:
+    """
+    Строит состояние решателя по движку с точки зрения стороны me.
+
+    Args:
+        game: Движок игры.
+        me (Player): Ходящая сторона.
+        front (int): Что известно о ближайшем патроне.
+        rounds (int): Глубина просчета перезарядок.
+
+    Returns:
+        State: Состояние решателя.
+    """
+    opponent = game.dealer if me is game.player else game.player
+    shotgun = game.shotgun
+    return (shotgun.live, shotgun.blank, front, me.lives, opponent.lives,
+            inventory_key(me.items), inventory_key(opponent.items), me is game.player, rounds)
+
+def heuristic_action(state: State) -> int:
+    """
+    Действие без поиска, когда решатель не уложился в бюджет.
+
+    Курит сигареты, смотрит Лупой неизвестный патрон, Инвертором делает
+    известный холостой боевым и стреляет в противника.
+
+    Args:
+        state (State): Состояние относительно ходящей стороны.
+
+    Returns:
+        int: Действие.
+    """
+    live, blank, front, mine, theirs, my_items, their_items, starter, rounds = state
+    if my_items[_CIGARETTES]:
+        return CIGARETTES
+    if my_items[_MAGNIFYING_GLASS] and front == UNKNOWN and live and blank:
+        return MAGNIFYING_GLASS
+    if my_items[_INVERTER] and front == KNOWN_BLANK:
+        return INVERTER
+    return SHOOT_OPPONENT
+
+def front_after(front: int, action: int, shotgun: Magazine) -> int:
+    """
+    Что будет известно о ближайшем патроне после действия.
+
+    Args:
+        front (int): Что известно сейчас.
+        action (int): Выбранное действие, еще не примененное.
+        shotgun (Magazine): Магазин дробовика.
+
+    Returns:
+        int: UNKNOWN, KNOWN_LIVE или KNOWN_BLANK.
+    """
+    if action == MAGNIFYING_GLASS:
+        return KNOWN_LIVE if shotgun.peek() else KNOWN_BLANK
+    if action == INVERTER:
+        return KNOWN_BLANK if shotgun.peek() else KNOWN_LIVE
+    if action == CIGARETTES or action == EXPIRED_MEDICINE:
+        return front
+    return UNKNOWN
+
+class SolverPolicy(Policy):
+    """
+    Стратегия по решателю: на каждом шаге выбирает действие с наибольшей ценностью.
+
+    Ближайший патрон стратегия помнит до конца хода после Лупы или Инвертора
+    (после Инвертора его выдают изменившиеся счетчики). Предметы вне модели
+    решателя (Телефоны, Наручники, Отказ) не используются. Если решатель не
+    укладывается в max_nodes, ход выбирает heuristic_action, и игра не стоит.
+
+    Решатель по умолчанию создается под правила игры; переданный решатель
+    должен быть построен для тех же правил, что и игра, иначе act бросает
+    ValueError.
+    """
+
+    __slots__ = ("solver", "own", "known")
+
+    def __init__(self, solver: Optional[Solver] = None):
+        self.solver: Solver = solver or Solver()
+        self.own: bool = solver is None
+        self.known: int = UNKNOWN
+
+    def act(self, game, me: Player, opponent: Player, items_used: int) -> int:
+        if not items_used:
+            self.known = UNKNOWN
+        solver = self.solver
+        if solver.rules is not game.rules and solver.rules != game.rules:
+            if not self.own:
+                raise ValueError(f"решатель построен для других правил: {solver.rules!r}, в игре {game.rules!r}")
+            solver = self.solver = Solver(solver.rounds, solver.table.max_entries, solver.max_nodes, game.rules)
+        state = engine_state(game, me, self.known, solver.rounds)
+        try:
+            action, _ = solver.best_action(state)
+        except BudgetExceeded:
+            action = heuristic_action(state)
+        self.known = front_after(self.known, action, game.shotgun)
+        return action
@@ -0,0 +1,279 @@
+import random
+from typing import Iterable, Iterator, List, Optional
+
+from items import ITEM_COUNT, ITEM_IDS, ITEM_NAMES
+
+BLANK = 0
+LIVE = 1
+SHELL_NAMES = ("пустой", "боевой")
+
+class Magazine:
+    """
+    Магазин дробовика в виде битовой маски.
+
+    Бит 0 - ближайший патрон, 1 - боевой, 0 - холостой. Счетчики боевых и
+    холостых патронов поддерживаются при каждом выстреле.
+
+    Attributes:
+        bits (int): Битовая маска патронов.
+        size (int): Количество оставшихся патронов.
+        live (int): Количество оставшихся боевых патронов.
+    """
+
+    __slots__ = ("bits", "size", "live")
+
+    def __init__(self, bits: int = 0, size: int = 0):
+        self.load(bits, size)
+
+    def load(self, bits: int, size: int) -> None:
+        """
+        Заряжает магазин заново.
+
+        Args:
+            bits (int): Битовая маска патронов.
+            size (int): Количество патронов.
+        """
+        self.bits = bits & ((1 << size) - 1)
+        self.size = size
+        self.live = bin(self.bits).count("1")
+
+    def load_random(self, size: int, rng=random, live_chance: float = 0.5) -> None:
+        """Заряжает магазин случайными патронами, каждый боевой с вероятностью live_chance."""
+        if live_chance == 0.5:
+            self.load(rng.getrandbits(size), size)
+        else:
+            self.load(sum(1 << index for index in range(size) if rng.random() < live_chance), size)
+
+    @property
+    def blank(self) -> int:
+        """Количество оставшихся холостых патронов."""
+        return self.size - self.live
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[int]:
+        bits = self.bits
+        for _ in range(self.size):
+            yield bits & 1
+            bits >>= 1
+
+    def peek(self, index: int = 0) -> int:
+        """
+        Возвращает патрон без извлечения.
+
+        Args:
+            index (int): Позиция патрона от ближайшего.
+
+        Returns:
+            int: LIVE или BLANK.
+        """
+        return (self.bits >> index) & 1
+
+    def pop(self) -> int:
+        """
+        Извлекает ближайший патрон.
+
+        Returns:
+            int: LIVE или BLANK.
+        """
+        shell = self.bits & 1
+        self.bits >>= 1
+        self.size -= 1
+        self.live -= shell
+        return shell
+
+    def invert(self) -> None:
+        """Меняет тип ближайшего патрона на противоположный."""
+        self.live += 1 - 2 * (self.bits & 1)
+        self.bits ^= 1
+
+class Belief:
+    """
+    Что одна сторона знает о патронах текущего магазина.
+
+    Известные позиции хранятся маской от начала заряда, поэтому выстрел
+    и Банка пива ничего не пересчитывают: пройденные позиции списываются при следующем
+    обращении, каждая один раз. Счетчики боевых и холостых берутся из
+    Magazine, все запросы выполняются за O(1).
+
+    Attributes:
+        shotgun (Magazine): Магазин, о котором идет речь.
+        known (int): Известных еще не выстреленных патронов.
+        known_live (int): Боевых среди них.
+    """
+
+    __slots__ = ("shotgun", "start", "fired", "mask", "bits", "known", "known_live")
+
+    def __init__(self, shotgun: Magazine):
+        self.shotgun: Magazine = shotgun
+        self.reset()
+
+    def reset(self) -> None:
+        """Забывает все: магазин только что заряжен."""
+        self.start = self.shotgun.size
+        self.fired = 0
+        self.mask = 0
+        self.bits = 0
+        self.known = 0
+        self.known_live = 0
+
+    def _sync(self) -> int:
+        fired = self.start - self.shotgun.size
+        while self.fired < fired:
+            if self.mask >> self.fired & 1:
+                self.known -= 1
+                self.known_live -= self.bits >> self.fired & 1
+            self.fired += 1
+        return fired
+
+    def reveal(self, index: int, shell: int) -> None:
+        """
+        Запоминает патрон; уже известная позиция перезаписывается (Инвертор).
+
+        Args:
+            index (int): Позиция патрона от ближайшего.
+            shell (int): LIVE или BLANK.
+        """
+        position = self._sync() + index
+        bit = 1 << position
+        if self.mask & bit:
+            self.known_live -= self.bits >> position & 1
+        else:
+            self.mask |= bit
+            self.known += 1
+        self.bits = self.bits & ~bit | shell << position
+        self.known_live += shell
+
+    def shell(self, index: int = 0) -> Optional[int]:
+        """
+        Известный тип патрона.
+
+        Returns:
+            Optional[int]: LIVE, BLANK или None, если патрон неизвестен.
+        """
+        position = self._sync() + index
+        if self.mask >> position & 1:
+            return self.bits >> position & 1
+        return None
+
+    def live_probability(self) -> float:
+        """Точная вероятность того, что ближайший патрон боевой."""
+        position = self._sync()
+        if self.mask >> position & 1:
+            return float(self.bits >> position & 1)
+        unknown = self.shotgun.size - self.known
+        return (self.shotgun.live - self.known_live) / unknown if unknown else 0.0
+
+class Inventory:
+    """
+    Инвентарь в виде вектора количеств по идентификаторам предметов.
+
+    Attributes:
+        counts (bytearray): Количество каждого предмета.
+        total (int): Общее количество предметов.
+    """
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self, items: Iterable[int] = ()):
+        self.counts: bytearray = bytearray(ITEM_COUNT)
+        self.total: int = 0
+        for item in items:
+            self.add(item)
+
+    @classmethod
+    def from_names(cls, names: Iterable[str]) -> "Inventory":
+        """Создает инвентарь по названиям предметов."""
+        return cls(ITEM_IDS[name] for name in names)
+
+    @classmethod
+    def from_counts(cls, counts: bytes) -> "Inventory":
+        """
+        Создает инвентарь по вектору количеств (bytes(inventory.counts)).
+
+        Raises:
+            ValueError: В векторе больше ITEM_COUNT количеств.
+        """
+        if len(counts) > ITEM_COUNT:
+            raise ValueError(f"количеств предметов больше {ITEM_COUNT}: {len(counts)}")
+        inventory = cls()
+        inventory.counts[:len(counts)] = counts
+        inventory.total = sum(inventory.counts)
+        return inventory
+
+    def __len__(self) -> int:
+        return self.total
+
+    def __contains__(self, item: int) -> bool:
+        return self.counts[item] > 0
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ids())
+
+    def add(self, item: int) -> None:
+        """Добавляет предмет."""
+        self.counts[item] += 1
+        self.total += 1
+
+    def remove(self, item: int) -> bool:
+        """
+        Убирает предмет, если он есть.
+
+        Returns:
+            bool: True, если предмет был в инвентаре.
+        """
+        if self.counts[item]:
+            self.counts[item] -= 1
+            self.total -= 1
+            return True
+        return False
+
+    def clear(self) -> None:
+        """Очищает инвентарь."""
+        self.counts = bytearray(ITEM_COUNT)
+        self.total = 0
+
+    def pick(self, rng=random) -> int:
+        """
+        Выбирает случайный предмет с учетом количества.
+
+        Returns:
+            int: Идентификатор предмета.
+        """
+        index = rng.randrange(self.total)
+        for item, count in enumerate(self.counts):
+            if index < count:
+                return item
+            index -= count
+        raise IndexError("пустой инвентарь")
+
+    def ids(self) -> List[int]:
+        """Возвращает идентификаторы предметов с повторами."""
+        result: List[int] = []
+        if self.total:
+            for item, count in enumerate(self.counts):
+                if count:
+                    result += [item] * count
+        return result
+
+    def names(self) -> List[str]:
+        """Возвращает названия предметов."""
+        return [ITEM_NAMES[item] for item in self.ids()]
+
+class Player:
+    """
+    Класс, представляющий игрока в игре.
+
+    Attributes:
+        name (str): Имя игрока.
+        lives (int): Количество жизней игрока.
+        items (Inventory): Инвентарь игрока.
+    """
+
+    __slots__ = ("name", "lives", "items")
+
+    def __init__(self, name: str):
+        self.name: str = name
+        self.lives: int = 2
+        self.items: Inventory = Inventory()
@@ -0,0 +1,162 @@
+import random
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Независимые потоки одной игры: патроны, коробочки и эффекты предметов - GAME, решения стратегий - POLICY.
+GAME = 0
+POLICY = 1
+
+_MASK = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+_M1 = 0xBF58476D1CE4E5B9
+_M2 = 0x94D049BB133111EB
+
+def _step(key: int, word: int) -> int:
+    """Смешивает слово в ключ финализатором SplitMix64."""
+    z = ((key ^ (word & _MASK)) + _GOLDEN) & _MASK
+    z = (z ^ (z >> 30)) * _M1 & _MASK
+    z = (z ^ (z >> 27)) * _M2 & _MASK
+    return z ^ (z >> 31)
+
+def round_key(seed: int, stream: int, game: int, round_: int) -> int:
+    """
+    Ключ раунда: от него считаются все выборки раунда.
+
+    Args:
+        seed (int): Общее зерно.
+        stream (int): Поток, GAME или POLICY.
+        game (int): Номер игры.
+        round_ (int): Номер зарядки дробовика в игре, 0 - до первой зарядки.
+
+    Returns:
+        int: 64-битный ключ.
+    """
+    return _step(_step(_step(_step(0, seed), stream), game), round_)
+
+def value(seed: int, stream: int, game: int, round_: int, index: int) -> int:
+    """64-битное значение выборки index; зависит только от аргументов."""
+    return _step(round_key(seed, stream, game, round_), index)
+
+_U30 = np.uint64(30)
+_U27 = np.uint64(27)
+_U31 = np.uint64(31)
+_UM1 = np.uint64(_M1)
+_UM2 = np.uint64(_M2)
+_UGOLDEN = np.uint64(_GOLDEN)
+
+def _mix_array(z: np.ndarray) -> np.ndarray:
+    z = (z ^ (z >> _U30)) * _UM1
+    z = (z ^ (z >> _U27)) * _UM2
+    return z ^ (z >> _U31)
+
+def _step_array(key: np.ndarray, word: np.ndarray) -> np.ndarray:
+    return _mix_array((key ^ word) + _UGOLDEN)
+
+def round_keys(seed: int, stream: int, games: np.ndarray, rounds: np.ndarray) -> np.ndarray:
+    """Ключи раундов для массивов игр и раундов, как round_key."""
+    base = np.uint64(_step(_step(0, seed), stream))
+    games = np.asarray(games).astype(np.uint64)
+    rounds = np.asarray(rounds).astype(np.uint64)
+    return _step_array(_step_array(np.full(np.broadcast(games, rounds).shape, base), games), rounds)
+
+def values(keys: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """Значения выборок по ключам раундов и номерам выборок, как value."""
+    return _step_array(np.asarray(keys, dtype=np.uint64), np.asarray(indices).astype(np.uint64))
+
+def to_unit(raw: np.ndarray) -> np.ndarray:
+    """Числа из [0, 1) из 64-битных значений, как CounterRandom.random."""
+    return (raw >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+def shell_bits(seed: int, games: np.ndarray, rounds: np.ndarray, shells: int = 6,
+               live_chance: float = 0.5) -> np.ndarray:
+    """
+    Патроны зарядок пачкой: те же, что зарядит GameEngine с CounterRandom(seed, game).
+
+    Аргументы транслируются, поэтому shell_bits(seed, games[:, None], np.arange(1, R + 1))
+    сразу дает таблицу патронов R зарядок для каждой игры.
+
+    Args:
+        seed (int): Общее зерно.
+        games (np.ndarray): Номера игр.
+        rounds (np.ndarray): Номера зарядок, с 1.
+        shells (int): Патронов в заряде.
+        live_chance (float): Вероятность боевого патрона.
+
+    Returns:
+        np.ndarray: Битовые маски Magazine.bits.
+    """
+    keys = round_keys(seed, GAME, games, rounds)
+    if live_chance == 0.5:
+        return (values(keys, np.uint64(0)) >> np.uint64(64 - shells)).astype(np.uint8)
+    bits = np.zeros(keys.shape, dtype=np.uint8)
+    for index in range(shells):
+        bits |= (to_unit(values(keys, np.uint64(index))) < live_chance).astype(np.uint8) << np.uint8(index)
+    return bits
+
+class CounterRandom(random.Random):
+    """
+    Генератор, в котором выборка - функция от (зерно, поток, игра, раунд, номер выборки).
+
+    Состояния нет, кроме счетчиков, поэтому поток можно переставить в
+    любой раунд через jump, а одна и та же игра дает одни и те же числа
+    в любом процессе и на любой машине. Все методы random.Random работают
+    поверх random и getrandbits.
+
+    Attributes:
+        key (int): Общее зерно.
+        stream (int): Поток.
+        game (int): Номер игры.
+        round (int): Текущий раунд, увеличивается в next_round.
+        index (int): Номер следующей выборки в раунде.
+    """
+
+    def __init__(self, seed: Optional[int] = None, game: int = 0, stream: int = GAME):
+        self.game = game
+        self.stream = stream
+        super().__init__(seed)
+
+    def seed(self, a: Optional[int] = None, version: int = 2) -> None:
+        """Задает зерно и возвращается к раунду 0."""
+        self.key = random.getrandbits(64) if a is None else int(a) & _MASK
+        self.jump(0)
+
+    def jump(self, round_: int, index: int = 0) -> None:
+        """Переходит к выборке index раунда round_."""
+        self.round = round_
+        self.index = index
+        self._round_key = round_key(self.key, self.stream, self.game, round_)
+
+    def next_round(self) -> None:
+        """Переходит к следующему раунду; GameEngine вызывает его перед каждой зарядкой."""
+        self.jump(self.round + 1)
+
+    def _next(self) -> int:
+        # _step, развернутый ради скорости: номер выборки всегда меньше 2 ** 64.
+        z = ((self._round_key ^ self.index) + _GOLDEN) & _MASK
+        self.index += 1
+        z = (z ^ (z >> 30)) * _M1 & _MASK
+        z = (z ^ (z >> 27)) * _M2 & _MASK
+        return z ^ (z >> 31)
+
+    def random(self) -> float:
+        return (self._next() >> 11) * 2.0 ** -53
+
+    def getrandbits(self, k: int) -> int:
+        if k <= 64:
+            return self._next() >> (64 - k)
+        result = 0
+        for shift in range(0, k, 64):
+            result |= self._next() << shift
+        return result & ((1 << k) - 1)
+
+    def getstate(self) -> Tuple[int, int, int, int, int]:
+        return self.key, self.stream, self.game, self.round, self.index
+
+    def setstate(self, state: Tuple[int, int, int, int, int]) -> None:
+        self.key, self.stream, self.game = state[:3]
+        self.jump(state[3], state[4])
+
+def game_streams(seed: int, game: int) -> Tuple[CounterRandom, CounterRandom]:
+    """Генераторы игры и ее стратегий: для GameEngine(rng=..., policy_rng=...)."""
+    return CounterRandom(seed, game, GAME), CounterRandom(seed, game, POLICY)
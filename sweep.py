@@ -0,0 +1,157 @@
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from batchsim import simulate
+from engine import ENGINE_VERSION
+from rules import DEFAULT_RULES, Rules, describe
+
+DEFAULT_CACHE = ".sweep_cache"
+STAGES = (1, 2, 3)
+
+# Задача: (правила, игр на этап, зерно).
+Task = Tuple[Rules, int, int]
+
+def grid(base: Rules = DEFAULT_RULES, **axes: Sequence) -> List[Rules]:
+    """
+    Все сочетания значений по осям.
+
+    Args:
+        base (Rules): Правила, от которых отсчитываются изменения.
+        **axes (Sequence): Значения полей Rules, например shells=(4, 6, 8).
+
+    Returns:
+        List[Rules]: Наборы правил в порядке перебора.
+    """
+    names = list(axes)
+    return [base.replace(**dict(zip(names, values))) for values in itertools.product(*axes.values())]
+
+def cache_key(task: Task) -> str:
+    """Ключ итога в кэше: хеш правил, версия движка, количество игр и зерно."""
+    rules, games, seed = task
+    data = json.dumps({"rules": rules.key(), "engine": ENGINE_VERSION, "games": games, "seed": seed}, sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+def evaluate(task: Task) -> dict:
+    """
+    Играет все этапы по одним правилам.
+
+    Returns:
+        dict: По этапам: доля побед игрока, среднее количество раундов, незавершенные игры.
+    """
+    rules, games, seed = task
+    stages = {}
+    for stage in STAGES:
+        if not rules.lives(stage):
+            continue
+        result = simulate(games, stage, seed=seed, rules=rules)
+        stages[str(stage)] = {"player_win_rate": result.player_win_rate, "mean_rounds": result.mean_rounds,
+                              "unfinished": result.unfinished}
+    return {"rules": rules.to_dict(), "engine": ENGINE_VERSION, "games": games, "seed": seed, "stages": stages}
+
+def unfairness(result: dict) -> float:
+    """Среднее отклонение доли побед игрока от 50% по этапам."""
+    rates = [stage["player_win_rate"] for stage in result["stages"].values()]
+    return sum(abs(rate - 0.5) for rate in rates) / len(rates) if rates else 0.0
+
+def _load(path: str) -> Optional[dict]:
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+def _store(path: str, result: dict) -> None:
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(result, file)
+    os.replace(temporary, path)
+
+def sweep(configs: Sequence[Rules], games: int = 100000, seed: int = 0, workers: Optional[int] = None,
+          cache: Optional[str] = DEFAULT_CACHE) -> List[Tuple[Rules, dict]]:
+    """
+    Оценивает наборы правил на пуле процессов с кэшем на диске.
+
+    Все наборы играются с одним зерном, поэтому различия между ними меньше
+    зависят от случайности. Уже посчитанные наборы берутся из кэша: при
+    повторном переборе считаются только новые правила, а смена ENGINE_VERSION
+    сбрасывает все итоги.
+
+    Args:
+        configs (Sequence[Rules]): Наборы правил.
+        games (int): Игр на этап.
+        seed (int): Зерно симуляции.
+        workers (Optional[int]): Количество процессов, по умолчанию по числу ядер.
+        cache (Optional[str]): Каталог кэша, None - без кэша.
+
+    Returns:
+        List[Tuple[Rules, dict]]: Итоги evaluate в порядке configs.
+    """
+    tasks = [(rules, games, seed) for rules in configs]
+    results: Dict[int, dict] = {}
+    missing: List[int] = []
+    if cache is not None:
+        os.makedirs(cache, exist_ok=True)
+    for index, task in enumerate(tasks):
+        cached = _load(os.path.join(cache, cache_key(task) + ".json")) if cache is not None else None
+        if cached is not None:
+            results[index] = cached
+        else:
+            missing.append(index)
+    workers = min(workers or multiprocessing.cpu_count(), len(missing)) or 1
+    if workers == 1:
+        computed = map(evaluate, [tasks[index] for index in missing])
+    else:
+        pool = multiprocessing.Pool(workers)
+        computed = pool.imap(evaluate, [tasks[index] for index in missing])
+    try:
+        for index, result in zip(missing, computed):
+            results[index] = result
+            if cache is not None:
+                _store(os.path.join(cache, cache_key(tasks[index]) + ".json"), result)
+    finally:
+        if workers > 1:
+            pool.close()
+            pool.join()
+    return [(rules, results[index]) for index, rules in enumerate(configs)]
+
+def _value(text: str):
+    """Значение оси из командной строки: 4, 0.45 или 2/4/6 для кортежей."""
+    if "/" in text:
+        return tuple(int(part) for part in text.split("/"))
+    return float(text) if "." in text else int(text)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Перебор балансных констант")
+    parser.add_argument("axes", nargs="*", metavar="поле=значения",
+                        help="например shells=4,6,8 live_chance=0.4,0.5 stage_lives=2/4/6,3/4/5")
+    parser.add_argument("--games", type=int, default=100000, help="игр на этап")
+    parser.add_argument("--seed", type=int, default=0, help="зерно симуляции")
+    parser.add_argument("--workers", type=int, help="процессов, по умолчанию по числу ядер")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help="каталог кэша")
+    parser.add_argument("--no-cache", action="store_true", help="не читать и не писать кэш")
+    options = parser.parse_args()
+    axes_values = {}
+    for axis in options.axes:
+        name, _, values = axis.partition("=")
+        if name not in Rules.__slots__ or not values:
+            parser.error(f"неизвестное поле или нет значений: {axis}")
+        axes_values[name] = [_value(value) for value in values.split(",")]
+    try:
+        configs = grid(**axes_values)
+    except ValueError as error:
+        parser.error(str(error))
+    start = time.perf_counter()
+    rows = sweep(configs, options.games, options.seed, options.workers, None if options.no_cache else options.cache)
+    elapsed = time.perf_counter() - start
+    print(f"{'правила':<48} {'этап 1':>8} {'этап 2':>8} {'этап 3':>8} {'откл.':>7}")
+    for rules, result in sorted(rows, key=lambda row: unfairness(row[1])):
+        rates = [result["stages"].get(str(stage), {}).get("player_win_rate") for stage in STAGES]
+        cells = " ".join(f"{rate:>8.1%}" if rate is not None else f"{'-':>8}" for rate in rates)
+        print(f"{' '.join(describe(rules)) or 'исходные':<48} {cells} {unfairness(result):>7.1%}")
+    print(f"{len(rows)} наборов за {elapsed:.1f} с")
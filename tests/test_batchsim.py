@@ -0,0 +1,32 @@
+import math
+
+import pytest
+
+from batchsim import simulate
+from engine import GameEngine
+
+GAMES = 3000
+BATCH = 30000
+
+@pytest.mark.parametrize("stage", (1, 2, 3))
+def test_batch_win_rate_matches_engine(stage):
+    """Пачка и движок играют по одним правилам: доли побед игрока совпадают с точностью до шума."""
+    wins = 0
+    for seed in range(GAMES):
+        game = GameEngine.headless(seed=seed)
+        game.stage = stage
+        if game.play_stage():
+            wins += 1
+    engine_rate = wins / GAMES
+    result = simulate(BATCH, stage, seed=stage)
+    assert result.unfinished == 0
+    error = math.sqrt(engine_rate * (1 - engine_rate) * (1 / GAMES + 1 / BATCH))
+    assert abs(engine_rate - result.player_win_rate) < 4 * error
+
+def test_streams_do_not_depend_on_split():
+    """В счетчиковых потоках пачка, поделенная на части, дает те же исходы, что и целая."""
+    whole = simulate(1000, 3, seed=11, streams=True)
+    first = simulate(400, 3, seed=11, streams=True)
+    second = simulate(600, 3, seed=11, streams=True, first_game=400)
+    assert round(whole.player_win_rate * 1000) == round(first.player_win_rate * 400) + \
+        round(second.player_win_rate * 600)
@@ -0,0 +1,17 @@
+import pytest
+
+from replay import check_archive, read_games, record_games
+
+@pytest.mark.parametrize("stage", (1, 3))
+def test_recorded_games_replay_without_divergence(tmp_path, stage):
+    """Каждая записанная игра повторяется по журналу без расхождений."""
+    path = str(tmp_path / "games.log")
+    record_games(path, 50, stage)
+    assert check_archive(path) == (50, [])
+
+def test_games_are_appended(tmp_path):
+    """Повторная запись дописывает игры в конец журнала, а не заменяет его."""
+    path = str(tmp_path / "games.log")
+    record_games(path, 3)
+    record_games(path, 2)
+    assert len(list(read_games(path))) == 5
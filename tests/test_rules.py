@@ -0,0 +1,47 @@
+import pickle
+
+import pytest
+
+from rules import DEFAULT_RULES, MAX_SHELLS, Rules
+from sweep import cache_key, grid
+
+@pytest.mark.parametrize("changes", (
+    {"shells": 0},
+    {"shells": MAX_SHELLS + 1},
+    {"live_chance": -0.1},
+    {"live_chance": 1.5},
+    {"stage_lives": (2, 4)},
+    {"stage_lives": (0, 4, 6)},
+    {"box_pool": (1, 2)},
+    {"box_pool": (1, 99)},
+))
+def test_invalid_rules_are_rejected(changes):
+    with pytest.raises(ValueError):
+        DEFAULT_RULES.replace(**changes)
+
+def test_rules_are_immutable():
+    with pytest.raises(AttributeError):
+        DEFAULT_RULES.shells = 4
+
+def test_key_depends_only_on_values():
+    """Равные правила дают один ключ независимо от типов аргументов и пересылки в другой процесс."""
+    rules = Rules(shells=4, stage_lives=[3, 4, 5])
+    same = Rules(shells=4, stage_lives=(3, 4, 5), live_chance=0.5)
+    assert rules == same and hash(rules) == hash(same)
+    assert rules.key() == same.key() == pickle.loads(pickle.dumps(rules)).key()
+    assert rules.key() != DEFAULT_RULES.key()
+    assert rules.replace(shells=6, stage_lives=(2, 4, 6)).key() == DEFAULT_RULES.key()
+
+def test_cache_key_covers_task():
+    """Ключ кэша свипа меняется вместе с правилами, количеством игр и зерном."""
+    task = (DEFAULT_RULES, 1000, 0)
+    assert cache_key(task) == cache_key((Rules(), 1000, 0))
+    changed = {cache_key((DEFAULT_RULES.replace(shells=4), 1000, 0)), cache_key((DEFAULT_RULES, 2000, 0)),
+               cache_key((DEFAULT_RULES, 1000, 1))}
+    assert len(changed) == 3 and cache_key(task) not in changed
+
+def test_grid_covers_all_combinations():
+    configs = grid(shells=(4, 6, 8), live_chance=(0.4, 0.6))
+    assert len(configs) == len(set(configs)) == 6
+    assert {(rules.shells, rules.live_chance) for rules in configs} == {
+        (shells, chance) for shells in (4, 6, 8) for chance in (0.4, 0.6)}
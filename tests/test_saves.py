@@ -0,0 +1,56 @@
+import sqlite3
+
+from saves import INT64_MAX, SaveStore
+
+def _row(slot="default", winnings=1000):
+    return (slot, 3, 2, bytes([1, 0, 2, 0, 0, 0, 0, 0, 0, 0, 0]), bytes(11), 2, 4, 1, winnings, 5)
+
+def test_save_round_trip(tmp_path):
+    """Сохранение читается до записи, после записи и из нового процесса без изменений."""
+    path = str(tmp_path / "saves.db")
+    store = SaveStore(path)
+    rows = [_row("default"), _row("big", 1000 * 2 ** 70), _row("edge", INT64_MAX), _row("debt", -(2 ** 80))]
+    for row in rows:
+        store.save(row)
+    assert store.load("big") == rows[1]
+    store.close()
+    reopened = SaveStore(path)
+    try:
+        for row in rows:
+            assert reopened.load(row[0]) == row
+        assert sorted(reopened.slots()) == sorted(row[0] for row in rows)
+        reopened.delete("big")
+        assert reopened.load("big") is None
+    finally:
+        reopened.close()
+
+def test_later_save_replaces_pending(tmp_path):
+    """Частые сохранения одного слота сливаются в одну запись."""
+    store = SaveStore(str(tmp_path / "saves.db"), delay=0.2)
+    try:
+        for winnings in range(100):
+            store.save(_row(winnings=winnings))
+        store.flush()
+        assert store.saves == 100
+        assert store.writes < 100
+        assert store.load()[8] == 99
+    finally:
+        store.close()
+
+def test_legacy_progress_is_migrated(tmp_path):
+    """Сохранение старой таблицы game_progress переезжает в слот по умолчанию."""
+    path = str(tmp_path / "saves.db")
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute('''CREATE TABLE game_progress
+            (id INTEGER PRIMARY KEY, player_lives INTEGER, dealer_lives INTEGER, player_items TEXT,
+             dealer_items TEXT, stage INTEGER, round INTEGER, infinite_mode INTEGER, winnings INTEGER,
+             stages_completed INTEGER)''')
+        connection.execute("INSERT INTO game_progress VALUES (1, 4, 3, 'Лупа,Банка пива,Лупа', '', 3, 2, 0, 70000, 2)")
+    connection.close()
+    store = SaveStore(path)
+    try:
+        assert store.load() == ("default", 4, 3, bytes([0, 1, 2] + [0] * 8), bytes(11), 3, 2, 0, 70000, 2)
+        assert store.slots() == ["default"]
+    finally:
+        store.close()
@@ -0,0 +1,46 @@
+from policies import SHOOT_OPPONENT, SHOOT_SELF, Policy, RandomDealer
+from solver import UNKNOWN, BudgetExceeded, Solver, SolverPolicy
+from tournament import TournamentStats, run_tournament
+
+class AlternatingPolicy(Policy):
+    """Стратегия с состоянием: стреляет в себя и в противника по очереди через все свои решения."""
+
+    def __init__(self):
+        self.decisions = 0
+
+    def act(self, game, me, opponent, items_used):
+        self.decisions += 1
+        return SHOOT_SELF if self.decisions % 2 else SHOOT_OPPONENT
+
+def _summary(stats: TournamentStats) -> tuple:
+    return stats.games, stats.player_wins, stats.dealer_wins, stats.draws, tuple(sorted(stats.rounds.items()))
+
+def _outcome(solver: Solver, state) -> object:
+    try:
+        return solver.best_action(state)
+    except BudgetExceeded:
+        return None
+
+def test_solver_budget_does_not_depend_on_earlier_searches():
+    """Позиция досчитывается или уходит в эвристику одинаково на холодном и прогретом решателе."""
+    items = (2, 2, 1, 1, 1, 0, 1, 0)
+    state = (3, 3, UNKNOWN, 6, 6, items, (0,) * 8, True, 1)
+    warm = Solver()
+    for live, blank in ((2, 3), (3, 2), (2, 2)):
+        _outcome(warm, (live, blank, UNKNOWN, 6, 6, items, (0,) * 8, True, 1))
+    assert _outcome(warm, state) == _outcome(Solver(), state)
+
+def test_solver_results_do_not_depend_on_shards():
+    """Стратегия с маленьким пределом часто уходит в эвристику, но итоги не зависят от порций и процессов."""
+    player = SolverPolicy(Solver(max_nodes=1000))
+    results = {_summary(run_tournament(player, RandomDealer(), 30, stage=3, seed=7, workers=workers,
+                                       shard_size=shard_size))
+               for workers, shard_size in ((1, 30), (2, 1), (2, 7))}
+    assert len(results) == 1
+
+def test_policy_state_does_not_carry_between_games():
+    """Каждая игра получает свежую копию стратегии, поэтому итоги не зависят от порций и процессов."""
+    results = {_summary(run_tournament(AlternatingPolicy(), RandomDealer(), 60, stage=1, seed=3, workers=workers,
+                                       shard_size=shard_size))
+               for workers, shard_size in ((1, 60), (2, 1), (2, 7))}
+    assert len(results) == 1
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from items import ITEM_COUNT
+from vecenv import ACTIONS, ITEM_ACTIONS, UNKNOWN, VecEnv, random_actions
+
+GAMES = 256
+
+def _check(env, obs):
+    """Наблюдение согласовано с состоянием: формы, живые стороны, счетчики патронов и маска."""
+    shells = env.state.rules.shells
+    assert obs["lives"].shape == (GAMES, 2) and (obs["lives"] > 0).all()
+    assert obs["shells"].shape == (GAMES, 2) and (obs["shells"] >= 0).all()
+    total = obs["shells"].sum(axis=1)
+    assert ((total >= 1) & (total <= shells)).all()
+    assert (total == env.state.size).all()
+    known = obs["known"]
+    assert known.shape == (GAMES, shells) and np.isin(known, (UNKNOWN, 0, 1)).all()
+    # Раскрыть можно только патроны в дробовике, и боевых среди них не больше оставшихся.
+    assert (known[np.arange(shells) >= total[:, None]] == UNKNOWN).all()
+    assert ((known == 1).sum(axis=1) <= obs["shells"][:, 0]).all()
+    assert ((known == 0).sum(axis=1) <= obs["shells"][:, 1]).all()
+    assert obs["items"].shape == (GAMES, 2, ITEM_COUNT) and (obs["items"] >= 0).all()
+    mask = env.action_mask()
+    assert mask.shape == (GAMES, ACTIONS) and mask[:, :ITEM_ACTIONS].all()
+    assert (mask[:, ITEM_ACTIONS:] == (obs["items"][:, 1] > 0)).all()
+
+@pytest.mark.parametrize("stage", (1, 3))
+def test_random_episodes_keep_invariants(stage):
+    env = VecEnv(GAMES, stage, seed=0, dealer_box=True)
+    obs = env.reset()
+    rng = np.random.default_rng(1)
+    finished = 0
+    for _ in range(300):
+        _check(env, obs)
+        obs, reward, done, info = env.step(random_actions(env.action_mask(), rng))
+        assert reward.shape == done.shape == (GAMES,)
+        assert np.isin(reward, (-1.0, 0.0, 1.0)).all()
+        assert (reward[~done] == 0).all() and (reward[done & ~info["truncated"]] != 0).all()
+        assert ((info["length"] > 0) == done).all()
+        # Законченная игра сразу начинается заново.
+        assert (env.length[done] == 0).all()
+        finished += int(done.sum())
+    assert finished > GAMES
+
+def test_same_seed_same_episodes():
+    runs = []
+    for _ in range(2):
+        env = VecEnv(64, 3, seed=5, dealer_box=True)
+        env.reset()
+        rng = np.random.default_rng(6)
+        rewards = [env.step(random_actions(env.action_mask(), rng))[1] for _ in range(50)]
+        runs.append(np.stack(rewards))
+    assert (runs[0] == runs[1]).all()
+
+def test_invalid_actions_are_rejected():
+    env = VecEnv(8, 3, seed=0)
+    env.reset()
+    actions = np.zeros(8, dtype=np.int64)
+    with pytest.raises(ValueError):
+        env.step(actions[:4])
+    with pytest.raises(ValueError):
+        env.step(actions + ACTIONS)
+    unavailable = np.flatnonzero(~env.action_mask()[0])
+    if unavailable.size:
+        actions[0] = unavailable[0]
+        with pytest.raises(ValueError):
+            env.step(actions)
@@ -0,0 +1,170 @@
+import copy
+import multiprocessing
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from engine import GameEngine, GameIO
+from policies import CountingPolicy, Policy, RandomDealer, RandomPlayer
+from solver import SolverPolicy
+from streams import game_streams
+
+class TournamentStats:
+    """
+    Итоги серии игр одной пары стратегий.
+
+    Attributes:
+        games (int): Количество игр.
+        player_wins (int): Победы игрока.
+        dealer_wins (int): Победы дилера.
+        draws (int): Ничьи.
+        rounds (Counter): Распределение длины этапа в раундах.
+    """
+
+    __slots__ = ("games", "player_wins", "dealer_wins", "draws", "rounds")
+
+    def __init__(self):
+        self.games: int = 0
+        self.player_wins: int = 0
+        self.dealer_wins: int = 0
+        self.draws: int = 0
+        self.rounds: Counter = Counter()
+
+    def record(self, result: Optional[bool], rounds: int) -> None:
+        """Учитывает одну игру."""
+        self.games += 1
+        if result is True:
+            self.player_wins += 1
+        elif result is False:
+            self.dealer_wins += 1
+        else:
+            self.draws += 1
+        self.rounds[rounds] += 1
+
+    def merge(self, other: "TournamentStats") -> None:
+        """Добавляет итоги другой серии."""
+        self.games += other.games
+        self.player_wins += other.player_wins
+        self.dealer_wins += other.dealer_wins
+        self.draws += other.draws
+        self.rounds.update(other.rounds)
+
+    @property
+    def player_win_rate(self) -> float:
+        """Доля побед игрока."""
+        return self.player_wins / self.games if self.games else 0.0
+
+    @property
+    def mean_rounds(self) -> float:
+        """Средняя длина этапа в раундах."""
+        return sum(rounds * count for rounds, count in self.rounds.items()) / self.games if self.games else 0.0
+
+    def __repr__(self) -> str:
+        return (f"TournamentStats(games={self.games}, player_wins={self.player_wins}, "
+                f"dealer_wins={self.dealer_wins}, draws={self.draws}, mean_rounds={self.mean_rounds:.2f})")
+
+Shard = Tuple[Policy, Policy, int, int, int, int]
+
+def play_shard(shard: Shard) -> TournamentStats:
+    """
+    Играет одну порцию игр.
+
+    Каждая игра берет выборки из счетчиковых потоков (streams.game_streams)
+    по общему зерну и своему номеру и играется свежими копиями стратегий:
+    состояние стратегий (дерево MCTS, таблица решателя, известный патрон)
+    не переходит из игры в игру, поэтому итоги не зависят ни от числа
+    процессов, ни от размера порций.
+
+    Args:
+        shard (Shard): (стратегия игрока, стратегия дилера, этап, зерно, номер первой игры, игр в порции).
+
+    Returns:
+        TournamentStats: Итоги порции.
+    """
+    player_policy, dealer_policy, stage, seed, first_game, games = shard
+    io = GameIO.headless()
+    stats = TournamentStats()
+    for game in range(first_game, first_game + games):
+        rng, policy_rng = game_streams(seed, game)
+        engine = GameEngine(io, copy.deepcopy(player_policy), copy.deepcopy(dealer_policy), seed, rng=rng,
+                            policy_rng=policy_rng)
+        engine.stage = stage
+        result = engine.play_stage()
+        stats.record(result, engine.round)
+    return stats
+
+def make_shards(player_policy: Policy, dealer_policy: Policy, games: int, stage: int,
+                seed: int, shard_size: int) -> List[Shard]:
+    """Делит игры на порции фиксированного размера."""
+    shards = []
+    for start in range(0, games, shard_size):
+        shards.append((player_policy, dealer_policy, stage, seed, start, min(shard_size, games - start)))
+    return shards
+
+def run_tournament(player_policy: Policy, dealer_policy: Policy, games: int, stage: int = 1,
+                   seed: int = 0, workers: Optional[int] = None, shard_size: int = 10000) -> TournamentStats:
+    """
+    Играет серию игр пары стратегий на всех ядрах.
+
+    Args:
+        player_policy (Policy): Стратегия игрока.
+        dealer_policy (Policy): Стратегия дилера.
+        games (int): Количество игр.
+        stage (int): Номер этапа.
+        seed (int): Общее зерно.
+        workers (Optional[int]): Количество процессов, по умолчанию по числу ядер.
+        shard_size (int): Игр в одной порции.
+
+    Returns:
+        TournamentStats: Итоги серии.
+    """
+    shards = make_shards(player_policy, dealer_policy, games, stage, seed, shard_size)
+    workers = workers or multiprocessing.cpu_count()
+    stats = TournamentStats()
+    if workers == 1:
+        for shard in shards:
+            stats.merge(play_shard(shard))
+        return stats
+    with multiprocessing.Pool(workers) as pool:
+        for shard_stats in pool.imap_unordered(play_shard, shards):
+            stats.merge(shard_stats)
+    return stats
+
+def round_robin(player_policies: Dict[str, Policy], dealer_policies: Dict[str, Policy], games: int,
+                stage: int = 1, seed: int = 0, workers: Optional[int] = None,
+                shard_size: int = 10000) -> Dict[Tuple[str, str], TournamentStats]:
+    """
+    Играет каждую стратегию игрока против каждой стратегии дилера.
+
+    Returns:
+        Dict[Tuple[str, str], TournamentStats]: Итоги по парам (игрок, дилер).
+    """
+    results = {}
+    for player_name, player_policy in player_policies.items():
+        for dealer_name, dealer_policy in dealer_policies.items():
+            results[player_name, dealer_name] = run_tournament(
+                player_policy, dealer_policy, games, stage, seed, workers, shard_size)
+    return results
+
+def measure_scaling(games: int = 200000, stage: int = 1, max_workers: Optional[int] = None) -> List[Tuple[int, float]]:
+    """
+    Замеряет скорость турнира при разном числе процессов.
+
+    Returns:
+        List[Tuple[int, float]]: Пары (процессов, игр в секунду).
+    """
+    max_workers = max_workers or multiprocessing.cpu_count()
+    timings = []
+    for workers in range(1, max_workers + 1):
+        start = time.perf_counter()
+        run_tournament(RandomPlayer(), RandomDealer(), games, stage, workers=workers)
+        timings.append((workers, games / (time.perf_counter() - start)))
+    return timings
+
+if __name__ == "__main__":
+    players = {"random": RandomPlayer(), "counting": CountingPolicy()}
+    dealers = {"random": RandomDealer(), "counting": CountingPolicy(), "solver": SolverPolicy()}
+    for (player_name, dealer_name), stats in round_robin(players, dealers, 100000).items():
+        print(f"{player_name:>10} vs {dealer_name:<10} {stats.player_win_rate:.4f} {stats}")
+    for workers, rate in measure_scaling():
+        print(f"{workers} процессов: {rate:.0f} игр/с")
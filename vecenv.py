@@ -0,0 +1,269 @@
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from batchsim import DEALER, NO_RESULT, PLAYER, SKIP_TURN, BatchState
+from items import BEER, BURNER_PHONE, INVERTER, ITEM_COUNT, MAGNIFYING_GLASS, PHONE
+from rules import MAX_SHELLS, Rules
+
+# Действия дилера: выстрел в игрока, выстрел в себя и ITEM_ACTIONS + идентификатор предмета.
+SHOOT_OPPONENT = 0
+SHOOT_SELF = 1
+ITEM_ACTIONS = 2
+ACTIONS = ITEM_ACTIONS + ITEM_COUNT
+
+UNKNOWN = -1
+
+# Наблюдение: словарь массивов, первая ось - номер игры.
+Observation = Dict[str, np.ndarray]
+
+_POPCOUNT = np.array([bin(value).count("1") for value in range(1 << MAX_SHELLS)], dtype=np.int8)
+
+class EnvState(BatchState):
+    """
+    BatchState, который помнит, какие патроны раскрыты дилеру.
+
+    Attributes:
+        seen (np.ndarray): Битовые маски известных дилеру патронов, сдвигаются вместе с bits.
+        dealer_box (bool): Выдавать коробочку этапа и дилеру.
+    """
+
+    __slots__ = ("seen", "dealer_box")
+
+    def __init__(self, games: int, stage: int = 1, rng: Optional[np.random.Generator] = None,
+                 rules: Optional[Rules] = None, dealer_box: bool = False):
+        super().__init__(games, stage, rng, rules)
+        self.seen = np.zeros(games, dtype=np.uint8)
+        self.dealer_box = dealer_box
+
+    def reload(self, mask: np.ndarray) -> None:
+        super().reload(mask)
+        idx = np.flatnonzero(mask)
+        self.seen[idx] = 0
+        if self.dealer_box and idx.size and self.rules.box_size(self.stage):
+            self.deal_box(DEALER, idx)
+
+    def use_items(self, side: int, idx: np.ndarray, item: np.ndarray) -> np.ndarray:
+        loaded = self.size[idx] > 0
+        # Инвертор раскрывает ближайший патрон обеим сторонам, Лупа и телефоны - только дилеру.
+        public = loaded & ((item == INVERTER) | (side == DEALER) & (item == MAGNIFYING_GLASS))
+        self.seen[idx[public]] |= 1
+        if side == DEALER:
+            phones = idx[loaded & ((item == PHONE) | (item == BURNER_PHONE))]
+            if phones.size:
+                position = self.below(phones, self.size[phones])
+                self.seen[phones] |= np.left_shift(1, position).astype(np.uint8)
+        beer = idx[loaded & (item == BEER)]
+        result = super().use_items(side, idx, item)
+        self.seen[beer] >>= 1
+        return result
+
+class VecEnv:
+    """
+    Пачка из K игр одного этапа в стиле Gym, где агент играет за дилера.
+
+    Правила те же, что у BatchState и GameEngine.play_stage: игрок (AutoInput)
+    стреляет в случайную цель, ход переходит после каждого выстрела, предмет
+    с результатом завершает ход дилера, а после Наручников дилер ходит еще раз.
+    Ходы игрока и вынужденные перезарядки доигрываются внутри step, поэтому
+    каждое наблюдение - момент решения дилера. Законченные игры сразу
+    начинаются заново.
+
+    Наблюдение:
+        lives (K, 2): Жизни игрока и дилера.
+        shells (K, 2): Оставшиеся боевые и холостые патроны, их видят обе стороны.
+        known (K, rules.shells): Раскрытые дилеру патроны от ближайшего, UNKNOWN - неизвестен.
+        items (K, 2, ITEM_COUNT): Предметы игрока и дилера.
+        skip (K,): Игрок пропускает ход после Наручников дилера, это дополнительный ход.
+
+    Ножовка в движке не удваивает урон, а завершает ход, поэтому отдельного
+    признака двойного урона в наблюдении нет.
+
+    Attributes:
+        games (int): Количество игр K.
+        max_steps (int): Решений дилера в игре, после которых она обрывается.
+        state (EnvState): Состояние игр.
+        skip (np.ndarray): Признак дополнительного хода дилера.
+        length (np.ndarray): Решений дилера в текущей игре.
+    """
+
+    __slots__ = ("games", "max_steps", "rng", "state", "skip", "length", "positions")
+
+    def __init__(self, games: int, stage: int = 1, seed: Optional[int] = None, dealer_box: bool = False,
+                 max_steps: int = 1000, rules: Optional[Rules] = None):
+        self.games: int = games
+        self.max_steps: int = max_steps
+        self.rng = np.random.default_rng(seed)
+        self.state: EnvState = EnvState(games, stage, self.rng, rules, dealer_box)
+        self.positions = np.arange(self.state.rules.shells, dtype=np.uint8)
+        self.skip: np.ndarray = np.zeros(games, dtype=bool)
+        self.length: np.ndarray = np.zeros(games, dtype=np.int32)
+
+    def reset(self) -> Observation:
+        """
+        Начинает все игры заново.
+
+        Returns:
+            Observation: Первое наблюдение.
+        """
+        self._restart(np.arange(self.games))
+        return self.observe()
+
+    def step(self, actions: np.ndarray) -> Tuple[Observation, np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Выполняет по одному решению дилера во всех играх.
+
+        Args:
+            actions (np.ndarray): Действия по играм, допустимые по action_mask.
+
+        Returns:
+            Tuple[Observation, np.ndarray, np.ndarray, Dict[str, np.ndarray]]: Наблюдение, награда
+            (1 - победа дилера, -1 - поражение), признак конца игры и сведения: truncated - игра
+            оборвана по max_steps, length - ее длина. Для законченных игр наблюдение уже из новой игры.
+        """
+        actions = np.asarray(actions)
+        if actions.shape != (self.games,) or actions.min() < 0 or actions.max() >= ACTIONS \
+                or not self.action_mask()[np.arange(self.games), actions].all():
+            raise ValueError("недопустимые действия")
+        state = self.state
+
+        users = np.flatnonzero(actions >= ITEM_ACTIONS)
+        if users.size:
+            item = actions[users] - ITEM_ACTIONS
+            state.items[DEALER, users, item] -= 1
+            state.totals[DEALER, users] -= 1
+            result = state.use_items(DEALER, users, item)
+            self.skip[users[result == SKIP_TURN]] = True
+            ended = users[(result != NO_RESULT) & (result != SKIP_TURN)]
+            state.turn[ended] = PLAYER
+            self.skip[ended] = False
+            state.done[users] |= (state.lives[PLAYER, users] <= 0) | (state.lives[DEALER, users] <= 0)
+
+        shooters = np.flatnonzero(actions < ITEM_ACTIONS)
+        self._fire(shooters, np.where(actions[shooters] == SHOOT_SELF, DEALER, PLAYER))
+        self.skip[shooters] = False
+        self._advance(~state.done)
+
+        self.length += 1
+        done = state.done.copy()
+        reward = np.where(state.lives[PLAYER] <= 0, 1.0, np.where(state.lives[DEALER] <= 0, -1.0, 0.0))
+        reward = np.where(done, reward, 0.0).astype(np.float32)
+        truncated = ~done & (self.length >= self.max_steps)
+        done |= truncated
+        info = {"truncated": truncated, "length": np.where(done, self.length, 0)}
+        restart = np.flatnonzero(done)
+        if restart.size:
+            self._restart(restart)
+        return self.observe(), reward, done, info
+
+    def action_mask(self) -> np.ndarray:
+        """
+        Допустимые действия: выстрелы всегда, предметы - если они есть у дилера.
+
+        Returns:
+            np.ndarray: Маска формы (K, ACTIONS).
+        """
+        mask = np.ones((self.games, ACTIONS), dtype=bool)
+        mask[:, ITEM_ACTIONS:] = self.state.items[DEALER] > 0
+        return mask
+
+    def observe(self) -> Observation:
+        """
+        Наблюдение дилера; массивы копируются и не меняются следующими ходами.
+
+        Returns:
+            Observation: Наблюдение по играм.
+        """
+        state = self.state
+        live = _POPCOUNT[state.bits]
+        seen = (state.seen[:, None] >> self.positions) & 1
+        shells = ((state.bits[:, None] >> self.positions) & 1).astype(np.int8)
+        return {
+            "lives": state.lives.T.copy(),
+            "shells": np.stack((live, state.size - live), axis=1),
+            "known": np.where(seen.astype(bool), shells, np.int8(UNKNOWN)),
+            "items": state.items.transpose(1, 0, 2).copy(),
+            "skip": self.skip.copy(),
+        }
+
+    def _restart(self, idx: np.ndarray) -> None:
+        state = self.state
+        # При малом запасе жизней игра может закончиться еще до первого решения дилера.
+        while idx.size:
+            state.lives[:, idx] = state.rules.lives(state.stage)
+            state.items[:, idx] = 0
+            state.totals[:, idx] = 0
+            state.hits[:, idx] = 0
+            state.rounds[idx] = 0
+            state.turn[idx] = PLAYER
+            state.done[idx] = False
+            self.skip[idx] = False
+            self.length[idx] = 0
+            mask = np.zeros(self.games, dtype=bool)
+            mask[idx] = True
+            state.reload(mask)
+            self._advance(mask)
+            idx = idx[state.done[idx]]
+
+    def _advance(self, active: np.ndarray) -> None:
+        """Доигрывает ходы игрока и перезарядки в играх active, пока не понадобится решение дилера."""
+        state = self.state
+        while True:
+            pending = active & ~state.done & ((state.turn == PLAYER) | (state.size == 0))
+            if not pending.any():
+                return
+            # Пустой дробовик перезаряжается дважды: start_new_round в *_turn и в play_stage.
+            # После этого ходит игрок, даже если дробовик был пуст на ходу дилера.
+            empty = pending & (state.size == 0)
+            state.reload(empty)
+            state.reload(empty)
+            state.turn[empty] = PLAYER
+            self.skip[empty] = False
+            shooters = np.flatnonzero(pending & ~empty)
+            coin = state.uniform(shooters)[:, 0] < 0.5
+            self._fire(shooters, np.where(coin, PLAYER, DEALER))
+
+    def _fire(self, idx: np.ndarray, target: np.ndarray) -> None:
+        state = self.state
+        live = (state.bits[idx] & 1).astype(np.int16)
+        state.lives[target, idx] -= live
+        state.hits[target, idx] += live
+        state.bits[idx] >>= 1
+        state.seen[idx] >>= 1
+        state.size[idx] -= 1
+        state.turn[idx] ^= 1
+        state.done[idx] |= (state.lives[PLAYER, idx] <= 0) | (state.lives[DEALER, idx] <= 0)
+
+def random_actions(mask: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Случайное допустимое действие в каждой игре.
+
+    Args:
+        mask (np.ndarray): Маска из VecEnv.action_mask.
+        rng (np.random.Generator): Генератор случайных чисел.
+
+    Returns:
+        np.ndarray: Действия по играм.
+    """
+    scores = rng.random(mask.shape)
+    scores[~mask] = -1.0
+    return scores.argmax(axis=1)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    stage_number = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    env = VecEnv(count, stage_number, seed=0, dealer_box=True)
+    env.reset()
+    generator = np.random.default_rng(1)
+    steps = episodes = wins = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < 5.0:
+        _, rewards, finished, _ = env.step(random_actions(env.action_mask(), generator))
+        steps += count
+        episodes += int(finished.sum())
+        wins += int((rewards > 0).sum())
+    elapsed = time.perf_counter() - start
+    print(f"{steps / elapsed * 60 / 1e6:.1f} млн шагов/мин, {episodes} игр, "
+          f"доля побед случайного дилера {wins / max(episodes, 1):.3f}")